@@ -1,11 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
-from storage import (
-    load_data, save_data, load_client_data, save_client_data,
-    load_event_data, save_event_data, load_supplier_data, save_supplier_data,
-    load_guest_data, save_guest_data, load_venue_data, save_venue_data
-)
-from classes import Employee, Client, Event, Supplier, Guest, Venue
+import metrics
+import storage
+from change_feed import ChangeFeed
+from persistence import PersistenceWorker
+from service import create_services
+from table_view import make_paged_table
 
 
 class ManagementApp:
@@ -14,13 +14,23 @@ class ManagementApp:
         # Constructor
         self.root = root  # Storing the root window object
         self.root.title("The Best Events Company Management System")  # Setting the title of the main window
-        # Loading existing data from pickle files for different categories
-        self.employees = load_data()
-        self.events = load_event_data()
-        self.suppliers = load_supplier_data()
-        self.guests = load_guest_data()
-        self.clients = load_client_data()
-        self.venues = load_venue_data()
+        # Showing storage problems in message boxes instead of printing them
+        storage.error_handler = lambda message: messagebox.showerror("Error", message)
+        storage.info_handler = lambda message: messagebox.showinfo("Information", message)
+        # Changes are written by a background thread so that saving never makes the window hang
+        self.persistence = PersistenceWorker()
+        # The services hold the business logic (ID allocation, validation, persistence) for each category
+        self.services = create_services(self.persistence)
+        # Changes made by other programs to the data of an open table are shown without reloading it
+        self.changes = ChangeFeed(self.services)
+        # The data of each category is only loaded when its system is opened, so the main window appears
+        # without waiting for datasets the user may not need
+        self.employees = None
+        self.events = None
+        self.suppliers = None
+        self.guests = None
+        self.clients = None
+        self.venues = None
 
         # Creating a label widget and placing it at the top of the window
         ttk.Label(root, text="Welcome to the Management System").grid(row=0, column=0, columnspan=2)
@@ -36,20 +46,47 @@ class ManagementApp:
         # Creating a button to confirm user selection
         ttk.Button(root, text="Enter", command=self.enter_system).grid(row=2, column=0, columnspan=2)
 
+        # New IDs come from the ID counters persisted by the storage layer, so no scan of the data is needed here
 
-        # Initializing ID counters
-        self.employee_id_counter = self.initialize_id_counter(self.employees, "employeeID", 2)
-        self.supplier_id_counter = self.initialize_id_counter(self.suppliers, "supplier_id", 2)
-        self.event_id_counter = self.initialize_id_counter(self.events, "event_id", 2)
-        self.guest_id_counter = self.initialize_id_counter(self.guests, "guestID", 1)
-        self.client_id_counter = self.initialize_id_counter(self.clients, "clientID", 1)
-        self.venue_id_counter = self.initialize_id_counter(self.venues, "venue_id", 1)
+        # Checking the results of the background saves and making sure everything is saved when the window closes
+        self.root.after(200, self.check_saves)
+        self.root.after(1000, self.check_changes)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
 
-    def initialize_id_counter(self, items, id_attr, slice_start):
-        if items:
-            return max(int(getattr(item, id_attr)[slice_start:]) for item in items.values()) + 1
-        return 1
+    # A function that reports saves that failed in the background, it runs every 200 ms on the Tk event loop
+    def check_saves(self):
+        while not self.persistence.results.empty():
+            collection, error = self.persistence.results.get()
+            if error is not None:
+                messagebox.showerror("Error", error)
+        self.root.after(200, self.check_saves)
+
+
+    # A function that applies the changes other programs made to the open tables, it runs every second
+    def check_changes(self):
+        try:
+            self.changes.poll()
+        except Exception as e:
+            print("An error occurred while checking for changes:", e)
+        self.root.after(1000, self.check_changes)
+
+
+    # A function that keeps the table of a collection up to date with the changes made by other programs
+    def watch(self, collection, table):
+        def show_changes(changes, previous):
+            records = self.services[collection].records
+            setattr(self, collection, records)
+            table.apply_changes(changes, previous, records)
+        self.changes.unsubscribe(collection)
+        self.changes.subscribe(collection, show_changes)
+
+
+    # A function that waits for all pending changes to be written before closing the window
+    def on_close(self):
+        self.persistence.stop()
+        metrics.write_all()
+        self.root.destroy()
 
     # A function to navigate to the selected system interface based on user input from the OptionMenu
     def enter_system(self):
@@ -75,7 +112,7 @@ class ManagementApp:
         # Opening the Employee management system interface if the user selects 'Employee' from the main menu setting up the GUI elements for employee management
 
         # Reloading the employee data from the storage file to ensure the data is up to date
-        self.employees = load_data()
+        self.employees = self.services['employees'].reload()
 
         # Creating a Treeview widget for displaying the list of employees in a tabular format
         self.tree = ttk.Treeview(self.root, columns=("ID", "Name", "Department", "Job Title", "Salary"),
@@ -87,6 +124,8 @@ class ManagementApp:
         self.tree.heading("Job Title", text="Job Title")
         self.tree.heading("Salary", text="Salary")
         self.tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.employee_table = make_paged_table(self.root, self.tree, self.employee_row)
+        self.watch('employees', self.employee_table)
 
         # Creating and placing a button to add new employee
         ttk.Button(self.root, text="Add Employee", command=self.open_add_employee_form).grid(row=4, column=0)
@@ -96,27 +135,42 @@ class ManagementApp:
         ttk.Button(self.root, text="Remove Employee", command=self.remove_employee).grid(row=5, column=0)
         # Creating and placing a button to find an employee by their ID
         ttk.Button(self.root, text="Find by ID", command=self.find_employee).grid(row=5, column=1)
+        # Creating a button to search employees by name, phone number, department or job title
+        ttk.Button(self.root, text="Search Employees",
+                   command=lambda: self.search_records('employees', self.employee_table, "name, phone number, department or job title")).grid(row=6, column=0)
 
         # Refreshing the table to display the current data in the Treeview
         self.refresh_table()
 
 
-    # A function to refreshes the data displayed in the Treeview widget by first clearing all existing entries and then repopulating it with updated data from the employees dictionary
+    # A function that shows only the records matching the text entered by the user, an empty search shows all records again
+    def search_records(self, collection, table, hint):
+        text = simpledialog.askstring("Search", f"Enter the start of a {hint} (leave blank to show all):")
+        service = self.services[collection]
+        if not text:
+            table.set_records(service.all())
+            return
+        # Prefix search first, falling back to a search anywhere in the text
+        matches = service.find(text) or service.find(text, mode='substring')
+        if not matches:
+            messagebox.showinfo("Search", "No matching records found")
+            return
+        table.set_records({getattr(record, service.id_attribute): record for record in matches})
+
+
+    # A function to refreshes the data displayed in the Treeview widget, only the first page of employees is inserted and the rest are loaded while scrolling
     def refresh_table(self):
-        # Clearing all existing entries in the Treeview.
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        self.employee_table.set_records(self.employees)
 
-        # Looping through the employees dictionary and inserting each employee's data into the Treeview
-        for emp_id, emp in self.employees.items():
-            employee_id = getattr(emp, 'employeeID', 'No ID')
-            name = emp.get_full_name()
-            department = getattr(emp, 'department', 'No Department')
-            job_title = getattr(emp, 'jobTitle', 'No Job Title')
-            salary = getattr(emp, 'salary', 'No Salary')
 
-            # Inserting the employee's data into the Treeview
-            self.tree.insert("", "end", values=(employee_id, name, department, job_title, salary))
+    # A function that returns the values shown in the Treeview row of an employee
+    def employee_row(self, emp):
+        employee_id = getattr(emp, 'employeeID', 'No ID')
+        name = emp.get_full_name()
+        department = getattr(emp, 'department', 'No Department')
+        job_title = getattr(emp, 'jobTitle', 'No Job Title')
+        salary = getattr(emp, 'salary', 'No Salary')
+        return (employee_id, name, department, job_title, salary)
 
 
     # A function to open a new window to add a new employee
@@ -161,39 +215,23 @@ class ManagementApp:
     # A function that collects the data from the form, validates it, creates a new Employee object, saves the data,and refreshes the employee list
     def add_employee(self):
         try:
-            # Attempting to retrieve data from entries with validation
-            first_name = self.entries['First Name:'].get()
-            last_name = self.entries['Last Name:'].get()
-            phone_number = self.entries['Phone Number:'].get()
-            gender = self.entries['Gender:'].get()
-            department = self.entries['Department:'].get()
-            job_title = self.entries['Job Title:'].get()
-            salary = self.entries['Salary:'].get()
-
-            # Checking for empty fields
-            if not (first_name and last_name and gender and phone_number and department and job_title and salary):
-                tk.messagebox.showerror("Input Error", "All fields must be filled out.")
-                return
-
-            # Validating salary as a float
-            salary = float(salary)
-
-            # Assigning a unique employee ID and incrementing the counter
-            employee_id = f"EP{self.employee_id_counter}"
-            self.employee_id_counter += 1
-
-            # Creating a new Employee object
-            emp = Employee(first_name, last_name, gender, phone_number, employee_id, department, job_title, salary)
-            self.employees[emp.employeeID] = emp
-            save_data(self.employees)
-
-            # Refreshing the employee table and closing the form
-            self.refresh_table()
+            # Creating a new Employee object, the service validates the fields and assigns a unique employee ID
+            emp = self.services['employees'].create(
+                firstName=self.entries['First Name:'].get(),
+                lastName=self.entries['Last Name:'].get(),
+                phoneNumber=self.entries['Phone Number:'].get(),
+                gender=self.entries['Gender:'].get(),
+                department=self.entries['Department:'].get(),
+                jobTitle=self.entries['Job Title:'].get(),
+                salary=self.entries['Salary:'].get())
+
+            # Adding the new row to the employee table and closing the form
+            self.employee_table.insert_row(emp.employeeID)
             self.add_window.destroy()
 
-        except ValueError:
-            # Handling the error specifically if salary is not a valid numeric value
-            tk.messagebox.showerror("Input Error", "Invalid salary input. Salary must be a numeric value.")
+        except ValueError as e:
+            # Handling empty fields and a salary that is not a valid numeric value
+            tk.messagebox.showerror("Input Error", str(e))
 
 
     # A function that allows modification for an existing employee's details
@@ -205,31 +243,20 @@ class ManagementApp:
         if emp_id in self.employees:
             emp = self.employees[emp_id]
 
-            # Asking user for new department and update if provided
+            # Asking user for new department, job title and salary, blank answers keep the current value
             new_dept = simpledialog.askstring("Modify Employee",
                                               f"Current Department: {emp.department}. Enter new department (leave blank to keep current):")
-            if new_dept:
-                emp.department = new_dept
-
-            # Asking user for new job title and update if provided
             new_job = simpledialog.askstring("Modify Employee",
                                              f"Current Job Title: {emp.jobTitle}. Enter new job title (leave blank to keep current):")
-            if new_job:
-                emp.jobTitle = new_job
-
-            # Asking user for new salary and update if provided, handling conversion errors
             new_salary = simpledialog.askstring("Modify Employee",
                                                 f"Current Salary: {emp.salary}. Enter new salary (leave blank to keep current):")
-            if new_salary:
-                try:
-                    emp.salary = float(new_salary)
-                except ValueError:
-                    messagebox.showerror("Error", "Invalid salary input. Salary must be a number.")
-                    return
-
-                    # Saving the modified employee data
-            save_data(self.employees)
-            self.refresh_table()
+            try:
+                # Saving the modified employee data
+                self.services['employees'].update(emp_id, department=new_dept, jobTitle=new_job, salary=new_salary)
+            except ValueError:
+                messagebox.showerror("Error", "Invalid salary input. Salary must be a number.")
+                return
+            self.employee_table.update_row(emp_id)
         else:
             messagebox.showerror("Error", "Employee not found")
 
@@ -239,13 +266,9 @@ class ManagementApp:
         # Asking the user to enter the ID of the employee they wish to remove
         emp_id = simpledialog.askstring("Remove Employee", "Enter the ID of the employee to remove")
 
-        # Checking if the employee ID exists
-        if emp_id in self.employees:
-            # deleting the employee entry using their ID if found
-            del self.employees[emp_id]
-            # Saving the updated data
-            save_data(self.employees)
-            self.refresh_table()
+        # Deleting the employee entry using their ID if found and saving the updated data
+        if self.services['employees'].delete(emp_id):
+            self.employee_table.delete_row(emp_id)
         else:
             messagebox.showerror("Error", "Employee not found")
 
@@ -253,27 +276,20 @@ class ManagementApp:
     # A function that searches for and displays the details of an employee by their ID
     def find_employee(self):
         emp_id = simpledialog.askstring("Find Employee", "Enter the ID of the employee to find")
-        try:
-            # Loading the current set of employee data from storage
-            self.employees = load_data()
-
-            # Checiking if the entered employee ID exists in the loaded data
-            if emp_id in self.employees:
-                # Retrieving the employee object based on the provided ID
-                emp = self.employees[emp_id]
-                details = emp.get_details()
-                # Displaying the employee details in an information messagebox
-                messagebox.showinfo("Employee Details", details)
-            else:
-                messagebox.showerror("Error", "Employee not found")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while loading the data: {e}")
+        # Retrieving the employee object based on the provided ID
+        emp = self.services['employees'].get(emp_id)
+        if emp is not None:
+            details = emp.get_details()
+            # Displaying the employee details in an information messagebox
+            messagebox.showinfo("Employee Details", details)
+        else:
+            messagebox.showerror("Error", "Employee not found")
 
 
     # A functions that initializes and displays the event management system interface
     def open_event_system(self):
         # Loading event data into the application
-        self.events = load_event_data()
+        self.events = self.services['events'].reload()
 
         # Setting up a Treeview widget to display event details in a tabular format
         self.event_tree = ttk.Treeview(self.root, columns=("Event ID", "Type", "Date", "Time", "Duration"),
@@ -284,26 +300,42 @@ class ManagementApp:
         self.event_tree.heading("Time", text="Time")
         self.event_tree.heading("Duration", text="Duration")
         self.event_tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.event_table = make_paged_table(self.root, self.event_tree, self.event_row)
+        self.watch('events', self.event_table)
 
         # Creating buttons for adding, modifying, removing, and finding events
         ttk.Button(self.root, text="Add Event", command=self.open_add_event_form).grid(row=4, column=0)
         ttk.Button(self.root, text="Modify Event", command=self.modify_event).grid(row=4, column=1)
         ttk.Button(self.root, text="Remove Event", command=self.remove_event).grid(row=5, column=0)
         ttk.Button(self.root, text="Find Event by ID", command=self.find_event).grid(row=5, column=1)
+        # Creating a button to search events by event type or date
+        ttk.Button(self.root, text="Search Events",
+                   command=lambda: self.search_records('events', self.event_table, "event type or date")).grid(row=6, column=0)
+        # Creating a button to check all events for venues, suppliers or guests booked twice at the same time
+        ttk.Button(self.root, text="Check Conflicts", command=self.check_conflicts).grid(row=6, column=1)
 
         # Refreshing the displayed event data
         self.refresh_event_table()
 
 
+    # A function that shows the double bookings found in the whole calendar
+    def check_conflicts(self):
+        result = self.services['events'].check_calendar()
+        lines = [str(conflict) for conflict in result.conflicts[:20]]
+        lines += [f"{event_id}: {message}" for event_id, message in result.errors[:20]]
+        if len(result.conflicts) > 20 or len(result.errors) > 20:
+            lines.append("...")
+        messagebox.showinfo("Schedule Conflicts", "\n".join([str(result)] + lines))
+
+
     # A function to clear and update the event table with the latest event data.
     def refresh_event_table(self):
-        # Removing all existing entries from the Treeview widget
-        for i in self.event_tree.get_children():
-            self.event_tree.delete(i)
-        # Inserting updated data for each event into the Treeview widget
-        for event_id, event in self.events.items():
-            self.event_tree.insert("", "end", values=(
-                event.event_id, event.event_type, event.date, event.time, event.duration))
+        # Only the first page of events is inserted, the rest are loaded while scrolling
+        self.event_table.set_records(self.events)
+
+    # A function that returns the values shown in the Treeview row of an event
+    def event_row(self, event):
+        return (event.event_id, event.event_type, event.date, event.time, event.duration)
 
     # A function that opens a new window for adding a new event
     def open_add_event_form(self):
@@ -334,23 +366,13 @@ class ManagementApp:
     #  and refreshes the event table
     def add_event(self):
         try:
-            event_type = self.event_entries['Type:'].get().strip()
-            date = self.event_entries['Date:'].get().strip()
-            time = self.event_entries['Time:'].get().strip()
-            duration = self.event_entries['Duration:'].get().strip()
-
-            # Validating all fields are filled
-            if not (event_type and date and time and duration):
-                raise ValueError("All fields must be completed.")
-
-            event_id = f"EV{self.event_id_counter}"
-            self.event_id_counter += 1
-
             # Creating and saving the new event
-            event = Event(event_id, event_type, date, time, duration)
-            self.events[event.event_id] = event
-            save_event_data(self.events)
-            self.refresh_event_table()
+            event = self.services['events'].create(
+                event_type=self.event_entries['Type:'].get(),
+                date=self.event_entries['Date:'].get(),
+                time=self.event_entries['Time:'].get(),
+                duration=self.event_entries['Duration:'].get())
+            self.event_table.insert_row(event.event_id)
             self.add_event_window.destroy()
 
         except Exception as e:
@@ -367,24 +389,18 @@ class ManagementApp:
 
             # Asking for new event details
             new_type = simpledialog.askstring("Modify Event",  f"Current Type: {event.event_type}. Enter new type (leave blank to keep current):")
-            if new_type:
-                event.event_type = new_type
-
             new_date = simpledialog.askstring("Modify Event", f"Current Date: {event.date}. Enter new date (leave blank to keep current):")
-            if new_date:
-                event.date = new_date
-
             new_time = simpledialog.askstring("Modify Event", f"Current Time: {event.time}. Enter new time (leave blank to keep current):")
-            if new_time:
-                event.time = new_time
-
             new_duration = simpledialog.askstring("Modify Event",  f"Current Duration: {event.duration}. Enter new duration (leave blank to keep current):")
-            if new_duration:
-                event.duration = new_duration
 
-            # Saving the updated event data back to the storage
-            save_event_data(self.events)
-            self.refresh_event_table()
+            try:
+                # Saving the updated event data back to the storage
+                self.services['events'].update(event_id, event_type=new_type, date=new_date, time=new_time,
+                                               duration=new_duration)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.event_table.update_row(event_id)
 
         else:
             messagebox.showerror("Error", "Event not found")
@@ -393,13 +409,9 @@ class ManagementApp:
     #  A function to remove an event from the system after the user inputs the event's ID
     def remove_event(self):
         event_id = simpledialog.askstring("Remove Event", "Enter the ID of the event to remove")
-        # Checking if the entered event ID exists
-        if event_id in self.events:
-            # If the event ID exists, delete the event from the dictionary
-            del self.events[event_id]
-            # Saving the updated events details
-            save_event_data(self.events)
-            self.refresh_event_table()
+        # Deleting the event and saving the updated events details if the event ID exists
+        if self.services['events'].delete(event_id):
+            self.event_table.delete_row(event_id)
         else:
             messagebox.showerror("Error", "Event not found")
 
@@ -407,25 +419,19 @@ class ManagementApp:
     # A function that prompts the user to enter an event ID and displays the event details if found
     def find_event(self):
         event_id = simpledialog.askstring("Find Event", "Enter the ID of the event to find")
-        try:
-            # Loading the current set of event data from storage
-            self.events = load_event_data()
-            # Checking if the entered event ID exists in the events dictionary
-            if event_id in self.events:
-                event = self.events[event_id]
-                details = event.get_details()
-                # Displaying the details in an informational message box
-                messagebox.showinfo("Event Details", details)
-            else:
-                messagebox.showerror("Error", "Event not found")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while loading the event data: {e}")
+        event = self.services['events'].get(event_id)
+        if event is not None:
+            details = event.get_details(self.services['guests'].all())
+            # Displaying the details in an informational message box
+            messagebox.showinfo("Event Details", details)
+        else:
+            messagebox.showerror("Error", "Event not found")
 
 
     # A function that Initializes and displays the supplier management interface.
     def open_supplier_system(self):
         # Loading supplier data from storage
-        self.suppliers = load_supplier_data()
+        self.suppliers = self.services['suppliers'].reload()
 
         # Setting up a Treeview widget to display supplier details in a structured tabular format
         self.supplier_tree = ttk.Treeview(self.root, columns=("Supplier ID", "Name", "Service Type"), show="headings")
@@ -433,23 +439,28 @@ class ManagementApp:
         self.supplier_tree.heading("Name", text="Name")
         self.supplier_tree.heading("Service Type", text="Service Type")
         self.supplier_tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.supplier_table = make_paged_table(self.root, self.supplier_tree, self.supplier_row)
+        self.watch('suppliers', self.supplier_table)
 
         # Creating buttons for different functions
         ttk.Button(self.root, text="Add Supplier", command=self.open_add_supplier_form).grid(row=4, column=0)
         ttk.Button(self.root, text="Modify Supplier", command=self.modify_supplier).grid(row=4, column=1)
         ttk.Button(self.root, text="Remove Supplier", command=self.remove_supplier).grid(row=5, column=0)
         ttk.Button(self.root, text="Find Supplier by ID", command=self.find_supplier).grid(row=5, column=1)
+        # Creating a button to search suppliers by name or service type
+        ttk.Button(self.root, text="Search Suppliers",
+                   command=lambda: self.search_records('suppliers', self.supplier_table, "name or service type")).grid(row=6, column=0)
 
         self.refresh_supplier_table()
 
 
     # A function that clears and refreshes the supplier table with the latest supplier data
     def refresh_supplier_table(self):
-        for i in self.supplier_tree.get_children():
-            self.supplier_tree.delete(i)
-        for supplier_id, supplier in self.suppliers.items():
-            self.supplier_tree.insert("", "end", values=(
-                supplier.supplier_id, supplier.name, supplier.service_type))
+        self.supplier_table.set_records(self.suppliers)
+
+    # A function that returns the values shown in the Treeview row of a supplier
+    def supplier_row(self, supplier):
+        return (supplier.supplier_id, supplier.name, supplier.service_type)
 
 
     # A function to open a new window for adding a new supplier
@@ -480,25 +491,12 @@ class ManagementApp:
     # A function to collects data from the form, validates it, creates a new Supplier object, saves the data, and refreshes the supplier table.
     def add_supplier(self):
         try:
-            name = self.supplier_entries['Name:'].get().strip()
-            service_type = self.service_type_var.get().strip()
-
-            # Checking if any of the fields are empty
-            if not name or not service_type:
-                raise ValueError("All fields must be completed.")
-
-            # Validating that a service type is selected
-            if service_type == 'Select Service Type':
-                raise ValueError("Please select a valid service type.")
-
-            # Generating a unique supplier ID and creating a new Supplier object
-            supplier_id = f"SP{self.supplier_id_counter}"
-            self.supplier_id_counter += 1
-            supplier = Supplier(supplier_id, name, service_type)
-
-            self.suppliers[supplier.supplier_id] = supplier
-            save_supplier_data(self.suppliers)
-            self.refresh_supplier_table()
+            # Generating a unique supplier ID and creating a new Supplier object, the service checks that
+            # both fields are completed and a valid service type is selected
+            supplier = self.services['suppliers'].create(
+                name=self.supplier_entries['Name:'].get(),
+                service_type=self.service_type_var.get())
+            self.supplier_table.insert_row(supplier.supplier_id)
             self.add_supplier_window.destroy()
 
         except Exception as e:
@@ -515,14 +513,10 @@ class ManagementApp:
             supplier = self.suppliers[supplier_id]
 
             new_name = simpledialog.askstring("Modify Supplier", f"Current Name: {supplier.name}. Enter new name (leave blank to keep current):")
-            if new_name:
-                supplier.name = new_name
             new_service_type = simpledialog.askstring("Modify Supplier", f"Current Service Type: {supplier.service_type}. Enter new service type (leave blank to keep current):")
-            if new_service_type:
-                supplier.service_type = new_service_type
             # Saving the updated supplier data and refreshing the supplier table
-            save_supplier_data(self.suppliers)
-            self.refresh_supplier_table()
+            self.services['suppliers'].update(supplier_id, name=new_name, service_type=new_service_type)
+            self.supplier_table.update_row(supplier_id)
         else:
             messagebox.showerror("Error", "Supplier not found")
 
@@ -530,32 +524,25 @@ class ManagementApp:
     # A function that removes a supplier from the system based on the entered ID
     def remove_supplier(self):
         supplier_id = simpledialog.askstring("Remove Supplier", "Enter the ID of the supplier to remove")
-        # Checking if the supplier ID exists in the list of suppliers
-        if supplier_id in self.suppliers:
-            del self.suppliers[supplier_id]
-            save_supplier_data(self.suppliers)
-            self.refresh_supplier_table()
+        if self.services['suppliers'].delete(supplier_id):
+            self.supplier_table.delete_row(supplier_id)
         else:
             messagebox.showerror("Error", "Supplier not found")
 
     # A function that finds and displays details of a supplier based on the entered ID
     def find_supplier(self):
         supplier_id = simpledialog.askstring("Find Supplier", "Enter the ID of the supplier to find")
-        try:
-            self.suppliers = load_supplier_data()
-            if supplier_id in self.suppliers:
-                supplier = self.suppliers[supplier_id]
-                details = str(supplier)
-                messagebox.showinfo("Supplier Details", details)
-            else:
-                messagebox.showerror("Error", "Supplier not found")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while loading the supplier data: {e}")
+        supplier = self.services['suppliers'].get(supplier_id)
+        if supplier is not None:
+            details = str(supplier) + self.events_line('suppliers', supplier_id)
+            messagebox.showinfo("Supplier Details", details)
+        else:
+            messagebox.showerror("Error", "Supplier not found")
 
 
     # A function that initializes and displays the guest management system interface
     def open_guest_system(self):
-        self.guests = load_guest_data()
+        self.guests = self.services['guests'].reload()
         # Setting up a Treeview widget to display guest details in a tabular format
         self.guest_tree = ttk.Treeview(self.root, columns=("Guest ID", "Name", "Phone Number", "Gender"),
                                        show="headings")
@@ -564,23 +551,28 @@ class ManagementApp:
         self.guest_tree.heading("Phone Number", text="Phone Number")
         self.guest_tree.heading("Gender", text="Gender")
         self.guest_tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.guest_table = make_paged_table(self.root, self.guest_tree, self.guest_row)
+        self.watch('guests', self.guest_table)
 
         # Creating buttons for adding, modifying, removing, and finding guests
         ttk.Button(self.root, text="Add Guest", command=self.open_add_guest_form).grid(row=4, column=0)
         ttk.Button(self.root, text="Modify Guest", command=self.modify_guest).grid(row=4, column=1)
         ttk.Button(self.root, text="Remove Guest", command=self.remove_guest).grid(row=5, column=0)
         ttk.Button(self.root, text="Find Guest by ID", command=self.find_guest).grid(row=5, column=1)
+        # Creating a button to search guests by name or phone number
+        ttk.Button(self.root, text="Search Guests",
+                   command=lambda: self.search_records('guests', self.guest_table, "name or phone number")).grid(row=6, column=0)
 
         self.refresh_guest_table()
 
 
     # A function that clears and updates the guest table with the latest guest data
     def refresh_guest_table(self):
-        for i in self.guest_tree.get_children():
-            self.guest_tree.delete(i)
-        for guest_id, guest in self.guests.items():
-            self.guest_tree.insert("", "end",
-                                   values=(guest.guestID, guest.get_full_name(), guest._phoneNumber, guest._gender))
+        self.guest_table.set_records(self.guests)
+
+    # A function that returns the values shown in the Treeview row of a guest
+    def guest_row(self, guest):
+        return (guest.guestID, guest.get_full_name(), guest._phoneNumber, guest._gender)
 
 
     # A function that opens a new window for adding a new guest
@@ -610,23 +602,13 @@ class ManagementApp:
     # A function that collects data from the form, creates a new Guest object, saves the data,and refreshes the guest table.
     def add_guest(self):
         try:
-            first_name = self.guest_entries['First Name:'].get().strip()
-            last_name = self.guest_entries['Last Name:'].get().strip()
-            gender = self.guest_entries['Gender:'].get().strip()
-            phone_number = self.guest_entries['Phone Number:'].get().strip()
-
-            # Validating all fields are filled
-            if not (first_name and last_name and gender and phone_number):
-                raise ValueError("All fields must be completed.")
-
-            guest_id = f"G{self.guest_id_counter}"
-            self.guest_id_counter += 1
-
-            # Creating and saving the new guest
-            guest = Guest(first_name, last_name, gender, phone_number, guest_id)
-            self.guests[guest.guestID] = guest
-            save_guest_data(self.guests)
-            self.refresh_guest_table()
+            # Creating and saving the new guest, the service checks that all fields are filled
+            guest = self.services['guests'].create(
+                firstName=self.guest_entries['First Name:'].get(),
+                lastName=self.guest_entries['Last Name:'].get(),
+                gender=self.guest_entries['Gender:'].get(),
+                phoneNumber=self.guest_entries['Phone Number:'].get())
+            self.guest_table.insert_row(guest.guestID)
             self.add_guest_window.destroy()
 
         except Exception as e:
@@ -640,20 +622,13 @@ class ManagementApp:
             guest = self.guests[guest_id]
 
             new_firstName = simpledialog.askstring("Modify Guest", f"Current First Name: {guest._firstName}. Enter new first name (leave blank to keep current):")
-            if new_firstName:
-                guest._firstName = new_firstName
-
             new_lastName = simpledialog.askstring("Modify Guest", f"Current Last Name: {guest._lastName}. Enter new last name (leave blank to keep current):")
-            if new_lastName:
-                guest._lastName = new_lastName
-
             new_phoneNumber = simpledialog.askstring("Modify Guest", f"Current Phone Number: {guest._phoneNumber}. Enter new phone number (leave blank to keep current):")
-            if new_phoneNumber:
-                guest._phoneNumber = new_phoneNumber
 
             # Saving changes and updating the guest table
-            save_guest_data(self.guests)
-            self.refresh_guest_table()
+            self.services['guests'].update(guest_id, firstName=new_firstName, lastName=new_lastName,
+                                           phoneNumber=new_phoneNumber)
+            self.guest_table.update_row(guest_id)
         else:
             messagebox.showerror("Error", "Guest not found")
 
@@ -661,10 +636,8 @@ class ManagementApp:
     # A function that removes a guest from the guest list based on user input
     def remove_guest(self):
         guest_id = simpledialog.askstring("Remove Guest", "Enter the ID of the guest to remove")
-        if guest_id in self.guests:
-            del self.guests[guest_id]
-            save_guest_data(self.guests)
-            self.refresh_guest_table()
+        if self.services['guests'].delete(guest_id):
+            self.guest_table.delete_row(guest_id)
         else:
             messagebox.showerror("Error", "Guest not found")
 
@@ -672,9 +645,9 @@ class ManagementApp:
     # A function that finds and displays guest details based on user input
     def find_guest(self):
         guest_id = simpledialog.askstring("Find Guest", "Enter the ID of the guest to find")
-        if guest_id in self.guests:
-            guest = self.guests[guest_id]
-            details = guest.get_details()
+        guest = self.services['guests'].get(guest_id)
+        if guest is not None:
+            details = guest.get_details() + self.events_line('guests', guest_id)
             messagebox.showinfo("Guest Details", details)
         else:
             messagebox.showerror("Error", "Guest not found")
@@ -682,7 +655,7 @@ class ManagementApp:
     # A function that opens the client management system interface
     def open_client_system(self):
         # Loading client data
-        self.clients = load_client_data()
+        self.clients = self.services['clients'].reload()
         # Initializing client treeview
         self.client_tree = ttk.Treeview(self.root, columns=("Client ID", "Name", "Phone", "Budget", "Events"),
                                         show="headings")
@@ -692,25 +665,29 @@ class ManagementApp:
         self.client_tree.heading("Budget", text="Budget")
         self.client_tree.heading("Events", text="Events")
         self.client_tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.client_table = make_paged_table(self.root, self.client_tree, self.client_row)
+        self.watch('clients', self.client_table)
 
         # Setting up buttons for client management
         ttk.Button(self.root, text="Add Client", command=self.open_add_client_form).grid(row=4, column=0)
         ttk.Button(self.root, text="Modify Client", command=self.modify_client).grid(row=4, column=1)
         ttk.Button(self.root, text="Remove Client", command=self.remove_client).grid(row=5, column=0)
         ttk.Button(self.root, text="Find Client by ID", command=self.find_client).grid(row=5, column=1)
+        # Creating a button to search clients by name or phone number
+        ttk.Button(self.root, text="Search Clients",
+                   command=lambda: self.search_records('clients', self.client_table, "name or phone number")).grid(row=6, column=0)
 
         self.refresh_client_table()
 
 
     # A function to refreshe the client table with the latest client data
     def refresh_client_table(self):
-        # Clearing existing entries in the client treeview
-        for i in self.client_tree.get_children():
-            self.client_tree.delete(i)
-        # Inserting updated client data into the treeview
-        for client_id, client in self.clients.items():
-            self.client_tree.insert("", "end", values=(
-            client.clientID, client.get_full_name(), client._phoneNumber, client.budget, client.numOf_events))
+        # Clearing the client treeview and inserting the first page of clients
+        self.client_table.set_records(self.clients)
+
+    # A function that returns the values shown in the Treeview row of a client
+    def client_row(self, client):
+        return (client.clientID, client.get_full_name(), client._phoneNumber, client.budget, client.numOf_events)
 
     # A function that opens a new window for adding a new client
     def open_add_client_form(self):
@@ -740,37 +717,21 @@ class ManagementApp:
 
     # A function that collects data from the form, validates it, creates a new Client object, saves the data, and refreshes the client table.
     def add_client(self):
-        # Extracting data from the input fields
-        first_name = self.client_entries['First Name:'].get()
-        last_name = self.client_entries['Last Name:'].get()
-        gender = self.gender_var.get()
-        phone_number = self.client_entries['Phone Number:'].get()
-        budget = self.client_entries['Budget:'].get()
-        num_of_events = self.client_entries['Number of Events:'].get()
-
-        # Validating and converting budget and number of events
+        # Creating and saving the new client, the service converts the budget and number of events
+        # and generates a unique client ID
         try:
-            budget = float(budget) if budget.strip() else 0
-            num_of_events = int(num_of_events) if num_of_events.strip() else 0
-        except ValueError:
-            messagebox.showerror("Invalid Input",
-                                 "Please ensure budget is a number and number of events is an integer.")
-            return
-
-        # Handling empty inputs
-        if not (first_name and last_name and phone_number and gender and budget and num_of_events):
-            messagebox.showerror("Invalid Input", "All fields must be filled.")
+            client = self.services['clients'].create(
+                firstName=self.client_entries['First Name:'].get(),
+                lastName=self.client_entries['Last Name:'].get(),
+                gender=self.gender_var.get(),
+                phoneNumber=self.client_entries['Phone Number:'].get(),
+                budget=self.client_entries['Budget:'].get(),
+                numOf_events=self.client_entries['Number of Events:'].get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", str(e))
             return
 
-        # Generating a unique client ID
-        client_id = f"C{self.client_id_counter}"
-        self.client_id_counter += 1
-
-        # Creating and saving the new client
-        client = Client(first_name, last_name, gender, phone_number, client_id, budget, num_of_events)
-        self.clients[client.clientID] = client
-        save_client_data(self.clients)
-        self.refresh_client_table()
+        self.client_table.insert_row(client.clientID)
         self.add_client_window.destroy()
 
 
@@ -782,27 +743,16 @@ class ManagementApp:
             client = self.clients[client_id]
 
             new_budget = simpledialog.askstring("Modify Client",  f"Current Budget: {client.budget}. Enter new budget (leave blank to keep current):")
-            if new_budget:
-                try:
-                    # Attempting to convert the input to float and update the budget
-                    client.update_budget(float(new_budget))
-                except ValueError:
-                    messagebox.showerror("Error", "Invalid budget input. Budget must be a number.")
-                    return
-
             # Prompt for a new number of events, only update if a new value is provided
             new_num_of_events = simpledialog.askstring("Modify Client",  f"Current Number of Events: {client.numOf_events}. Enter new number of events (leave blank to keep current):")
-            if new_num_of_events:
-                try:
-                    # Attempting to convert the input to integer and update the number of events
-                    client.update_num_of_events(int(new_num_of_events))
-                except ValueError:
-                    messagebox.showerror("Error", "Invalid input. Number of events must be an integer.")
-                    return
-
-            # Saving the updated client data to storage
-            save_client_data(self.clients)
-            self.refresh_client_table()
+
+            try:
+                # Converting the inputs and saving the updated client data to storage
+                self.services['clients'].update(client_id, budget=new_budget, numOf_events=new_num_of_events)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.client_table.update_row(client_id)
         else:
             messagebox.showerror("Error", "Client not found")
 
@@ -810,13 +760,9 @@ class ManagementApp:
     # A function that removes a client from the system based on their ID
     def remove_client(self):
         client_id = simpledialog.askstring("Remove Client", "Enter the ID of the client to remove")
-        # Checking if the client exists in the database
-        if client_id in self.clients:
-            # Removing the client from the dictionary
-            del self.clients[client_id]
-            # Saving the updated client data to the database
-            save_client_data(self.clients)
-            self.refresh_client_table()
+        # Removing the client from the dictionary and the database if the client exists
+        if self.services['clients'].delete(client_id):
+            self.client_table.delete_row(client_id)
         else:
             messagebox.showerror("Error", "Client not found")
 
@@ -825,8 +771,8 @@ class ManagementApp:
     def find_client(self):
         client_id = simpledialog.askstring("Find Client", "Enter the ID of the client to find")
         # Checking if the client exists in the database
-        if client_id in self.clients:
-            client = self.clients[client_id]
+        client = self.services['clients'].get(client_id)
+        if client is not None:
             details = client.display_details()
             messagebox.showinfo("Client Details", details)
         else:
@@ -835,7 +781,7 @@ class ManagementApp:
 
     # A function that opens the venue management system interface
     def open_venue_system(self):
-        self.venues = load_venue_data()
+        self.venues = self.services['venues'].reload()
         self.venue_tree = ttk.Treeview(self.root, columns=("Venue ID", "Address", "Min Guests", "Max Guests"),
                                        show="headings")
         self.venue_tree.heading("Venue ID", text="Venue ID")
@@ -843,22 +789,27 @@ class ManagementApp:
         self.venue_tree.heading("Min Guests", text="Min Guests")
         self.venue_tree.heading("Max Guests", text="Max Guests")
         self.venue_tree.grid(row=3, column=0, columnspan=2, sticky='nsew')
+        self.venue_table = make_paged_table(self.root, self.venue_tree, self.venue_row)
+        self.watch('venues', self.venue_table)
 
         ttk.Button(self.root, text="Add Venue", command=self.open_add_venue_form).grid(row=4, column=0)
         ttk.Button(self.root, text="Modify Venue", command=self.modify_venue).grid(row=4, column=1)
         ttk.Button(self.root, text="Remove Venue", command=self.remove_venue).grid(row=5, column=0)
         ttk.Button(self.root, text="Find Venue by ID", command=self.find_venue).grid(row=5, column=1)
+        # Creating a button to search venues by address
+        ttk.Button(self.root, text="Search Venues",
+                   command=lambda: self.search_records('venues', self.venue_table, "address")).grid(row=6, column=0)
 
         self.refresh_venue_table()
 
 
     # A function that refreshes the venue table with the latest venue data
     def refresh_venue_table(self):
-        for i in self.venue_tree.get_children():
-            self.venue_tree.delete(i)
-        for venue_id, venue in self.venues.items():
-            self.venue_tree.insert("", "end",
-                                   values=(venue.venue_id, venue.address, venue.min_guests, venue.max_guests))
+        self.venue_table.set_records(self.venues)
+
+    # A function that returns the values shown in the Treeview row of a venue
+    def venue_row(self, venue):
+        return (venue.venue_id, venue.address, venue.min_guests, venue.max_guests)
 
 
     # A function that opens a new window for adding a new venue.
@@ -880,25 +831,16 @@ class ManagementApp:
 
     # A function that collects data from the form, validates it, creates a new Venue object, saves the data, and refreshes the venue table
     def add_venue(self):
-        address = self.venue_entries['Address:'].get()
-        min_guests = self.venue_entries['Min Guests:'].get()
-        max_guests = self.venue_entries['Max Guests:'].get()
         try:
-            min_guests = int(min_guests)
-            max_guests = int(max_guests)
-            if not address:
-                raise ValueError("Address cannot be empty.")
+            venue = self.services['venues'].create(
+                address=self.venue_entries['Address:'].get(),
+                min_guests=self.venue_entries['Min Guests:'].get(),
+                max_guests=self.venue_entries['Max Guests:'].get())
         except ValueError as e:
             messagebox.showerror("Input Error", str(e))
             return
 
-        venue_id = f"V{self.venue_id_counter}"
-        self.venue_id_counter += 1
-
-        venue = Venue(venue_id, address, min_guests, max_guests)
-        self.venues[venue.venue_id] = venue
-        save_venue_data(self.venues)
-        self.refresh_venue_table()
+        self.venue_table.insert_row(venue.venue_id)
         self.add_venue_window.destroy()
 
 
@@ -910,29 +852,18 @@ class ManagementApp:
 
             new_address = simpledialog.askstring("Modify Venue",
                                                  f"Current Address: {venue.address}. Enter new address (leave blank to keep current):")
-            if new_address:
-                venue.address = new_address
-
             new_min_guests = simpledialog.askstring("Modify Venue",
                                                     f"Current Min Guests: {venue.min_guests}. Enter new minimum guests (leave blank to keep current):")
-            if new_min_guests:
-                try:
-                    venue.min_guests = int(new_min_guests)
-                except ValueError:
-                    messagebox.showerror("Error", "Minimum guests must be a number.")
-                    return
-
             new_max_guests = simpledialog.askstring("Modify Venue",
                                                     f"Current Max Guests: {venue.max_guests}. Enter new maximum guests (leave blank to keep current):")
-            if new_max_guests:
-                try:
-                    venue.max_guests = int(new_max_guests)
-                except ValueError:
-                    messagebox.showerror("Error", "Maximum guests must be a number.")
-                    return
-
-            save_venue_data(self.venues)
-            self.refresh_venue_table()
+            try:
+                self.services['venues'].update(venue_id, address=new_address, min_guests=new_min_guests,
+                                               max_guests=new_max_guests)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            self.venue_table.update_row(venue_id)
         else:
             messagebox.showerror("Error", "Venue not found")
 
@@ -940,10 +871,8 @@ class ManagementApp:
     # A function that removes a venue from the system based on its ID
     def remove_venue(self):
         venue_id = simpledialog.askstring("Remove Venue", "Enter the ID of the venue to remove")
-        if venue_id in self.venues:
-            del self.venues[venue_id]
-            save_venue_data(self.venues)
-            self.refresh_venue_table()
+        if self.services['venues'].delete(venue_id):
+            self.venue_table.delete_row(venue_id)
         else:
             messagebox.showerror("Error", "Venue not found")
 
@@ -951,15 +880,30 @@ class ManagementApp:
     # A functions that finds and displays venue details based on the venue ID
     def find_venue(self):
         venue_id = simpledialog.askstring("Find Venue", "Enter the ID of the venue to find")
-        if venue_id in self.venues:
-            venue = self.venues[venue_id]
-            details = str(venue)
+        venue = self.services['venues'].get(venue_id)
+        if venue is not None:
+            details = str(venue) + self.events_line('venues', venue_id)
             messagebox.showinfo("Venue Details", details)
         else:
             messagebox.showerror("Error", "Venue not found")
 
+    # A function that returns the line listing the events a supplier, guest or venue belongs to
+    def events_line(self, collection, record_id):
+        events = self.services[collection].events(record_id)
+        if not events:
+            return "\nEvents: none"
+        return "\nEvents: " + ', '.join(f"{event.event_id} ({event.event_type}, {event.date})" for event in events)
+
+
+# Timing the callbacks of the GUI that open a system or refresh a table when the instrumentation is switched on
+# (see metrics.py). The other callbacks wait for the user's input, the operations they run are timed by the
+# services instead
+metrics.instrument(ManagementApp, ('open_', 'refresh_'), 'gui')
 
 
-root = tk.Tk()
-app = ManagementApp(root)
-root.mainloop()
+if __name__ == "__main__":
+    metrics.configure_from_environment()
+    storage.use_backend_from_environment()
+    root = tk.Tk()
+    app = ManagementApp(root)
+    root.mainloop()
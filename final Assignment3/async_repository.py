@@ -0,0 +1,194 @@
+"""Asyncio interface to the event management data, for embedding it in a local web or API service such as
+a booking portal. Every collection is reached as repository.events, repository.guests, ... with the async
+functions get, get_many, put, put_many, delete, create, update, find and search.
+
+The services and the storage module are blocking, so all their work runs in a single worker thread: the
+event loop is never blocked, and the services never run in two threads at once. Requests that arrive
+together are batched, e.g. a hundred concurrent get() calls cost one hop to the worker thread and a hundred
+concurrent put() calls are saved with a single journal write (one fsync) instead of a hundred. Before every
+batch the worker picks up the changes other programs (e.g. the GUI) made to the data directory, which costs
+a few stat calls when nothing changed.
+
+Example:
+    async with AsyncRepository() as repository:
+        event = await repository.events.get('EV1')
+        guests = await repository.guests.get_many(event.guests)
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from service import create_services
+
+
+class _Batcher:
+    """Class to collect the requests made within batch_delay seconds and run them with one call of a
+    function in the worker thread. The function gets the list of request items and returns a list with
+    one result per item; a result that is an exception is raised by the request it belongs to"""
+    def __init__(self, repository, function):
+        # Constructor for _Batcher class
+        self.repository = repository
+        self.function = function
+        self.pending = []  # (item, future) of the requests waiting for the next batch
+
+    def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) == 1:
+            loop.call_later(self.repository.batch_delay, self._flush)
+        elif len(self.pending) >= self.repository.batch_size:
+            self._flush()
+        return future
+
+    def _flush(self):
+        batch, self.pending = self.pending, []
+        if batch:
+            self.repository.track(asyncio.ensure_future(self._run(batch)))
+
+    async def _run(self, batch):
+        try:
+            results = await self.repository.run(self.function, [item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class AsyncCollection:
+    """Class to use one collection (one service) from asyncio code"""
+    def __init__(self, repository, service):
+        # Constructor for AsyncCollection class
+        self.repository = repository
+        self.service = service
+        self._gets = _Batcher(repository, self._get_batch)
+        self._puts = _Batcher(repository, self._put_batch)
+        self._deletes = _Batcher(repository, self._delete_batch)
+
+    # Functions that run in the worker thread
+    def _poll(self):
+        # Picking up the changes other programs made to a loaded collection
+        if self.service.records is not None:
+            self.service.poll_changes()
+
+    def _fresh(self, function, *args):
+        self._poll()
+        return function(*args)
+
+    def _get_batch(self, record_ids):
+        self._poll()
+        records = self.service.all()
+        return [records.get(record_id) for record_id in record_ids]
+
+    def _put_batch(self, records):
+        # The last put of a record in the batch wins, all of them are saved with a single write
+        self._poll()
+        changed = {getattr(record, self.service.id_attribute): record for record in records}
+        try:
+            self.service.save_many(changed)
+        except Exception as e:
+            return [e] * len(records)
+        return records
+
+    def _delete_batch(self, record_ids):
+        self._poll()
+        return [self.service.delete(record_id) for record_id in record_ids]
+
+    async def _run(self, function, *args):
+        # Running a function of the service in the worker thread on up to date data
+        return await self.repository.run(self._fresh, function, *args)
+
+    async def get(self, record_id):
+        # Returning a record, or None if the ID does not exist
+        return await self._gets.submit(record_id)
+
+    async def get_many(self, record_ids):
+        # Returning the records of the given IDs, in the same order, None for the IDs that do not exist
+        return await self.repository.run(self._get_batch, list(record_ids))
+
+    async def put(self, record):
+        # Saving a new or changed record, returns the record once it is written
+        return await self._puts.submit(record)
+
+    async def put_many(self, records):
+        results = await self.repository.run(self._put_batch, list(records))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    async def delete(self, record_id):
+        # Removing a record, returns False if the ID does not exist
+        return await self._deletes.submit(record_id)
+
+    async def create(self, **values):
+        # Validating the values, allocating a new ID and saving the new record (ValueError if a value is invalid)
+        return await self._run(lambda: self.service.create(**values))
+
+    async def update(self, record_id, **values):
+        return await self._run(lambda: self.service.update(record_id, **values))
+
+    async def find(self, text, field=None, mode='prefix'):
+        return await self._run(self.service.find, text, field, mode)
+
+    async def search(self, **criteria):
+        return await self._run(lambda: self.service.search(**criteria))
+
+    async def all(self):
+        # Returning a copy of the dictionary of all records
+        return await self._run(lambda: dict(self.service.all()))
+
+
+class AsyncRepository:
+    """Class to give asyncio code access to all collections, with the blocking work done in a worker thread"""
+    def __init__(self, services=None, batch_delay=0.001, batch_size=500):
+        # Constructor for AsyncRepository class
+        self.services = services or create_services()
+        self.batch_delay = batch_delay  # Seconds to wait for more requests before a batch is run
+        self.batch_size = batch_size  # A batch is run at once when it has this many requests
+        # A single thread, so the services (which are not thread safe) are only used by one thread at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="repository")
+        self.collections = {collection: AsyncCollection(self, service)
+                            for collection, service in self.services.items()}
+        self._tasks = set()  # Batches that are being run
+
+    def __getattr__(self, name):
+        # repository.events, repository.guests, ...
+        collections = self.__dict__.get('collections', {})
+        if name in collections:
+            return collections[name]
+        raise AttributeError(name)
+
+    async def run(self, function, *args):
+        # Running a blocking function in the worker thread
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def load(self, *collections):
+        # Loading collections in the worker thread ahead of the first requests, all of them by default
+        for collection in collections or self.collections:
+            await self.run(self.services[collection].all)
+
+    def track(self, task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        # Running the batches that are still waiting, then stopping the worker thread. The sleep lets the
+        # requests that were just scheduled reach their batch first
+        await asyncio.sleep(0)
+        for collection in self.collections.values():
+            for batcher in (collection._gets, collection._puts, collection._deletes):
+                batcher._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
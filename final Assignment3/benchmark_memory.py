@@ -0,0 +1,99 @@
+"""Memory benchmark: bytes per record of the slotted record classes compared with the previous
+__dict__ based classes. Run with: python benchmark_memory.py [number of records]"""
+import sys
+import tracemalloc
+
+from classes import Employee, Client, Event, Supplier, Guest, Venue
+from synthetic_data import generators
+
+
+# Classes with a per-object __dict__, the same as the record classes were before __slots__ were added
+class DictPerson:
+    def __init__(self, firstName, lastName, gender, phoneNumber):
+        self._firstName = firstName
+        self._lastName = lastName
+        self._gender = gender
+        self._phoneNumber = phoneNumber
+
+class DictEmployee(DictPerson):
+    def __init__(self, firstName, lastName, gender, phoneNumber, employeeID, department, jobTitle, salary):
+        super().__init__(firstName, lastName, gender, phoneNumber)
+        self.employeeID = employeeID
+        self.department = department
+        self.jobTitle = jobTitle
+        self.salary = salary
+
+class DictGuest(DictPerson):
+    def __init__(self, firstName, lastName, gender, phoneNumber, guestID):
+        super().__init__(firstName, lastName, gender, phoneNumber)
+        self.guestID = guestID
+
+class DictClient(DictPerson):
+    def __init__(self, firstName, lastName, gender, phoneNumber, clientID, budget, numOf_events):
+        super().__init__(firstName, lastName, gender, phoneNumber)
+        self.clientID = clientID
+        self.budget = budget
+        self.numOf_events = numOf_events
+
+class DictSupplier:
+    def __init__(self, supplier_id, name, service_type):
+        self.supplier_id = supplier_id
+        self.name = name
+        self.service_type = service_type
+
+class DictVenue:
+    def __init__(self, venue_id, address, min_guests, max_guests):
+        self.venue_id = venue_id
+        self.address = address
+        self.min_guests = min_guests
+        self.max_guests = max_guests
+
+class DictEvent:
+    def __init__(self, event_id, event_type, date, time, duration):
+        self.event_id = event_id
+        self.event_type = event_type
+        self.date = date
+        self.time = time
+        self.duration = duration
+        self.suppliers = []
+        self.venues = []
+        self.guests = []
+
+
+# Constructor arguments of each class, in the order the constructor takes them
+constructor_fields = {
+    Employee: ('_firstName', '_lastName', '_gender', '_phoneNumber', 'employeeID', 'department', 'jobTitle', 'salary'),
+    Guest: ('_firstName', '_lastName', '_gender', '_phoneNumber', 'guestID'),
+    Client: ('_firstName', '_lastName', '_gender', '_phoneNumber', 'clientID', 'budget', 'numOf_events'),
+    Supplier: ('supplier_id', 'name', 'service_type'),
+    Venue: ('venue_id', 'address', 'min_guests', 'max_guests'),
+    Event: ('event_id', 'event_type', 'date', 'time', 'duration'),
+}
+dict_classes = {Employee: DictEmployee, Guest: DictGuest, Client: DictClient, Supplier: DictSupplier,
+                Venue: DictVenue, Event: DictEvent}
+
+
+def bytes_per_record(cls, arguments):
+    # Measuring only the memory allocated for the record objects, the field values already exist
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(*args) for args in arguments]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the records is not part of the records themselves
+    return (after - before - sys.getsizeof(records)) / len(records)
+
+
+def run(count):
+    print(f"{'Class':<10}{'dict (bytes)':>14}{'slots (bytes)':>15}{'saved':>8}")
+    for collection, generate in generators.items():
+        records = list(generate(count).values())
+        cls = type(records[0])
+        arguments = [tuple(getattr(record, name) for name in constructor_fields[cls]) for record in records]
+        before = bytes_per_record(dict_classes[cls], arguments)
+        after = bytes_per_record(cls, arguments)
+        print(f"{cls.__name__:<10}{before:>14.1f}{after:>15.1f}{(1 - after / before):>8.0%}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
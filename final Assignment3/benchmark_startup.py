@@ -0,0 +1,87 @@
+"""Startup benchmark: time from starting the program until the main window is shown, for datasets of
+different sizes, with the collections loaded lazily (when their system is opened) and eagerly (all of
+them before the window is shown, as the program used to do). Every measurement runs in a new process.
+Without a display only the storage part of the startup is measured.
+Run with: python benchmark_startup.py [sizes...], e.g. python benchmark_startup.py 1000 10000 100000"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+program_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def child(mode):
+    # Measuring one startup in this process, the current directory holds the data directory
+    start = time.perf_counter()
+    sys.path.insert(0, program_directory)
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    if root is not None:
+        from GUI import ManagementApp
+        app = ManagementApp(root)
+        services = app.services
+    else:
+        from service import create_services
+        services = create_services()
+    if mode == 'eager':
+        for service in services.values():
+            service.all()
+    if root is not None:
+        root.update()
+    elapsed = time.perf_counter() - start
+    if root is not None:
+        app.persistence.stop()
+        root.destroy()
+    print(elapsed, 'window' if root is not None else 'headless')
+
+
+def write_dataset(directory, count):
+    # Writing count synthetic records of every collection to directory/data
+    sys.path.insert(0, program_directory)
+    import storage
+    from synthetic_data import generators
+    previous_path = storage.data_path
+    storage.data_path = os.path.join(directory, 'data')
+    os.makedirs(storage.data_path, exist_ok=True)
+    try:
+        for collection, generate in generators.items():
+            storage.save_collection(collection, generate(count))
+    finally:
+        storage.data_path = previous_path
+        storage.invalidate_cache()
+
+
+def measure(directory, mode, repeat=3):
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.split()
+        elapsed = float(output[-2]) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output[-1]
+
+
+def run(sizes):
+    print(f"{'Records':>10}{'lazy (ms)':>12}{'eager (ms)':>12}")
+    for count in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            write_dataset(directory, count)
+            lazy, kind = measure(directory, 'lazy')
+            eager = measure(directory, 'eager')[0]
+            print(f"{count:>10}{lazy:>12.1f}{eager:>12.1f}   ({kind})")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+    else:
+        run([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,76 @@
+"""Storage benchmark: saving and loading every collection as a pickle file and as a columnar record_format
+file, and reading a single column or a single record. Run with: python benchmark_storage.py [number of records]"""
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import record_format
+from synthetic_data import generators
+
+# The column read on its own for every collection
+benchmark_columns = {
+    'employees': 'salary',
+    'events': 'date',
+    'suppliers': 'service_type',
+    'guests': '_lastName',
+    'clients': 'budget',
+    'venues': 'max_guests',
+}
+
+
+def best_time(function, repeat=3):
+    # Returning the fastest of a few runs in milliseconds, and the result of the function
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def save_pickle(path, data):
+    with open(path, 'wb') as dumpf:
+        pickle.dump(data, dumpf, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_pickle(path):
+    with open(path, 'rb') as loadf:
+        return pickle.load(loadf)
+
+
+def run(count):
+    directory = tempfile.mkdtemp()
+    print(f"{count} records per collection, times in ms (pickle / columnar)")
+    print(f"{'Collection':<11}{'save':>16}{'load':>16}{'one column':>16}{'one record':>16}{'size (KB)':>16}")
+    for collection, generate in generators.items():
+        data = generate(count)
+        pickle_path = os.path.join(directory, collection + '.pkl')
+        columnar_path = os.path.join(directory, collection + '.emr')
+        key = list(data)[count // 2]
+        column = benchmark_columns[collection]
+
+        pickle_save = best_time(lambda: save_pickle(pickle_path, data))[0]
+        columnar_save = best_time(lambda: record_format.write_file(columnar_path, data))[0]
+        pickle_load, loaded = best_time(lambda: load_pickle(pickle_path))
+        columnar_load, loaded_columnar = best_time(lambda: record_format.read_file(columnar_path))
+        assert list(loaded) == list(loaded_columnar)
+        # With pickle everything has to be loaded to get one column or one record
+        pickle_column = best_time(lambda: [getattr(record, column) for record in load_pickle(pickle_path).values()])[0]
+        columnar_column = best_time(lambda: record_format.read_column(columnar_path, column))[0]
+        pickle_record = best_time(lambda: load_pickle(pickle_path)[key])[0]
+        columnar_record = best_time(lambda: record_format.read_record(columnar_path, key))[0]
+        sizes = os.path.getsize(pickle_path) / 1024, os.path.getsize(columnar_path) / 1024
+
+        print(f"{collection:<11}{pickle_save:>8.1f}/{columnar_save:<7.1f}{pickle_load:>8.1f}/{columnar_load:<7.1f}"
+              f"{pickle_column:>8.1f}/{columnar_column:<7.1f}{pickle_record:>8.1f}/{columnar_record:<7.1f}"
+              f"{sizes[0]:>8.0f}/{sizes[1]:<7.0f}")
+        os.remove(pickle_path)
+        os.remove(columnar_path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,217 @@
+"""Benchmark suite for the storage functions and the record classes at different data sizes.
+
+For every storage backend and dataset size it measures, per collection: saving and loading it with the
+save_*/load_* functions of storage.py, allocating an ID with and without the counters file (the second
+one rebuilds the counter from the IDs of the collection), and Event.get_details. Every operation reports
+the 50th, 95th and 99th percentile latency, the throughput in records per second and the peak memory
+allocated while it ran. Results can be written as JSON and compared with an earlier run.
+
+Run with: python benchmark_suite.py [--sizes 1000 100000 1000000] [--backends columnar pickle sqlite]
+                                    [--repeat 5] [--json results.json] [--compare baseline.json]"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import storage
+from synthetic_data import make_dataset
+
+# The save and load functions of every collection
+storage_functions = {
+    'employees': (storage.save_data, storage.load_data),
+    'events': (storage.save_event_data, storage.load_event_data),
+    'suppliers': (storage.save_supplier_data, storage.load_supplier_data),
+    'guests': (storage.save_guest_data, storage.load_guest_data),
+    'clients': (storage.save_client_data, storage.load_client_data),
+    'venues': (storage.save_venue_data, storage.load_venue_data),
+}
+# Number of events whose details are built in every run of the get_details benchmark
+details_sample = 1000
+
+
+def percentile(samples, percent):
+    # Nearest rank percentile of a list of numbers, with few samples the high percentiles are the maximum
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def peak_memory(function):
+    # Returning the peak memory in KB allocated while the function runs, measured in a separate run
+    # because tracing the allocations slows the function down
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def measure(function, records, repeat, prepare=None, samples_per_run=1):
+    # Running the function repeat times and summarizing the latencies. prepare is called before every run
+    # without being timed; samples_per_run > 1 means the function returns its own list of latencies in seconds
+    latencies = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        if samples_per_run > 1:
+            latencies.extend(function())
+        else:
+            start = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start)
+    if prepare is not None:
+        prepare()
+    memory = peak_memory(function)
+    median = percentile(latencies, 50)
+    return {
+        'records': records,
+        'runs': len(latencies),
+        'p50_ms': median * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'throughput': (records / samples_per_run) / median if median else None,
+        'peak_kb': memory,
+    }
+
+
+def raise_error(message):
+    # Storage reports errors through its handlers, a failed operation must not be measured as a fast one
+    raise RuntimeError(message)
+
+
+def details_latencies(events, guests):
+    # Building the details of a sample of events, returning the latency of every call
+    latencies = []
+    for event in list(events.values())[:details_sample]:
+        start = time.perf_counter()
+        event.get_details(guests)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def benchmark_backend(backend, count, dataset, repeat):
+    # Measuring every operation of one backend in a new data directory, returning a list of result dictionaries
+    results = []
+    directory = tempfile.mkdtemp()
+    previous = storage.data_path, storage.backend, storage.error_handler, storage.info_handler
+    storage.data_path = directory
+    storage._sqlite_store = None
+    storage.error_handler = raise_error
+    storage.info_handler = lambda message: None
+    storage.use_backend(backend)
+    counters_path = os.path.join(directory, storage.counters_file)
+
+    def remove_counters():
+        if os.path.exists(counters_path):
+            os.remove(counters_path)
+        if backend == "sqlite":
+            storage.get_sqlite_store().set_counter(collection, 0)
+
+    try:
+        for collection, (save, load) in storage_functions.items():
+            data = dataset[collection]
+            operations = {
+                'save': measure(lambda: save(data), len(data), repeat),
+                'load': measure(load, len(data), repeat, prepare=storage.invalidate_cache),
+                'allocate_id': measure(lambda: storage.allocate_id(collection), 1, repeat),
+                'allocate_id (rebuild counter)': measure(lambda: storage.allocate_id(collection), 1, repeat,
+                                                         prepare=remove_counters),
+            }
+            if collection == 'events':
+                operations['get_details'] = measure(lambda: details_latencies(data, dataset['guests']),
+                                                    min(details_sample, len(data)), repeat,
+                                                    samples_per_run=min(details_sample, len(data)))
+            for operation, result in operations.items():
+                results.append({'backend': backend, 'size': count, 'collection': collection,
+                                'operation': operation, **result})
+                print_result(results[-1])
+    finally:
+        if storage._sqlite_store is not None:
+            storage._sqlite_store.close()
+        storage.data_path, backend_name, storage.error_handler, storage.info_handler = previous
+        storage._sqlite_store = None
+        storage.use_backend(backend_name)
+        shutil.rmtree(directory)
+    return results
+
+
+def print_header():
+    print(f"{'Backend':<9}{'Size':>9} {'Collection':<11}{'Operation':<30}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'p99 (ms)':>10}{'records/s':>12}{'peak (KB)':>11}")
+
+
+def print_result(result):
+    throughput = f"{result['throughput']:>12.0f}" if result['throughput'] else f"{'-':>12}"
+    print(f"{result['backend']:<9}{result['size']:>9} {result['collection']:<11}{result['operation']:<30}"
+          f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{throughput}"
+          f"{result['peak_kb']:>11.0f}")
+
+
+def compare(results, baseline_path, tolerance):
+    # Printing the operations whose median latency grew by more than the tolerance compared with an earlier
+    # run, returns the number of such regressions
+    with open(baseline_path, encoding='utf-8') as baselinef:
+        baseline = {(r['backend'], r['size'], r['collection'], r['operation']): r
+                    for r in json.load(baselinef)['results']}
+    regressions = 0
+    for result in results:
+        before = baseline.get((result['backend'], result['size'], result['collection'], result['operation']))
+        if before is None or not before['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms']
+        if ratio > tolerance:
+            regressions += 1
+            print(f"Slower: {result['backend']} {result['size']} {result['collection']} {result['operation']}: "
+                  f"{before['p50_ms']:.2f} ms -> {result['p50_ms']:.2f} ms ({ratio:.2f}x)")
+    print(f"{regressions} regressions compared with {baseline_path}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the storage functions and record classes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--backends', nargs='+', default=['columnar', 'pickle', 'sqlite'],
+                        choices=['columnar', 'pickle', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs of every operation")
+    parser.add_argument('--guests-per-event', type=int, default=20)
+    parser.add_argument('--json', help="file to write the results to")
+    parser.add_argument('--compare', help="results file of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help="a median latency this many times the earlier one is reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    print_header()
+    for count in args.sizes:
+        # The same data is used for every backend, the generator is seeded so runs are reproducible
+        dataset = make_dataset(count, args.guests_per_event)
+        for backend in args.backends:
+            results.extend(benchmark_backend(backend, count, dataset, args.repeat))
+
+    if args.json:
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'guests_per_event': args.guests_per_event,
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as jsonf:
+            json.dump(report, jsonf, indent=2)
+        print(f"Results written to {args.json}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
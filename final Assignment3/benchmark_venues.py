@@ -0,0 +1,69 @@
+"""Venue matching benchmark: finding the smallest venue that fits an event with the capacity index compared
+with checking every venue, and a batch allocation of venues to events.
+Run with: python benchmark_venues.py [number of venues] [number of events]"""
+import random
+import sys
+import time
+
+from service import EventService, VenueService
+from synthetic_data import make_events, make_venues
+from venue_allocation import allocate_venues
+
+
+class MemoryWriter:
+    # Writer that does not save anything, so only the matching itself is measured
+    def save_record(self, collection, key, record):
+        pass
+
+    def save_records(self, collection, records):
+        pass
+
+    def delete_record(self, collection, key):
+        pass
+
+
+def make_services(venue_count, event_count):
+    venue_service = VenueService(MemoryWriter())
+    venue_service.records = make_venues(venue_count)
+    event_service = EventService(MemoryWriter())
+    event_service.records = make_events(event_count)
+    # Every event gets between 10 and 1500 guests, events only keep the guest IDs
+    rng = random.Random(7)
+    for event in event_service.records.values():
+        event.guests = dict.fromkeys(f"G{i}" for i in range(rng.randrange(10, 1500)))
+    return venue_service, event_service
+
+
+def run(venue_count, event_count, queries=2000):
+    venue_service, event_service = make_services(venue_count, event_count)
+    venues = venue_service.all()
+    rng = random.Random(8)
+    guest_counts = [rng.randrange(10, 5000) for _ in range(queries)]
+
+    start = time.perf_counter()
+    venue_service.capacity_index()
+    build = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for count in guest_counts:
+        next(venue_service.venues_for(count), None)
+    indexed = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    for count in guest_counts:
+        min((venue for venue in venues.values() if venue.min_guests <= count <= venue.max_guests),
+            key=lambda venue: (venue.max_guests, venue.min_guests), default=None)
+    scanned = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    result = allocate_venues(event_service, venue_service)
+    allocation = (time.perf_counter() - start) * 1000
+
+    print(f"{venue_count} venues, {event_count} events")
+    print(f"Building the capacity index: {build:.1f} ms")
+    print(f"Smallest venue fitting N guests: {indexed:.3f} ms with the index, {scanned:.3f} ms checking every venue")
+    print(f"Batch allocation: {allocation:.1f} ms ({result})")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
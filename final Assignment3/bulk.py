@@ -0,0 +1,150 @@
+import csv
+import json
+import os
+
+import storage
+from service import member_kinds
+
+
+# Functions that read the rows of an import file one at a time as dictionaries
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as csvf:
+        for row in csv.DictReader(csvf):
+            yield row
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as jsonf:
+        for line in jsonf:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_rows(path):
+    # Choosing the reader from the file extension (.csv or .jsonl)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv(path)
+    if extension in ('.jsonl', '.ndjson'):
+        return read_jsonl(path)
+    raise ValueError(f"Unsupported file type: {extension} (expected .csv or .jsonl)")
+
+
+class ImportResult:
+    """Class to represent the outcome of a bulk import"""
+    def __init__(self):
+        # Constructor for ImportResult class
+        self.imported = []  # IDs of the records that were added
+        self.errors = []  # (row number, error message) for every rejected row
+
+    def __str__(self):
+        return f"Imported {len(self.imported)} records, rejected {len(self.errors)} rows"
+
+
+def import_rows(service, rows, batch_size=1000):
+    # Validating the rows batch by batch, allocating IDs for each batch with a single counter update
+    # and saving all new records with a single commit at the end. Invalid rows are skipped and reported
+    result = ImportResult()
+    new_records = {}
+    batch = []
+    for row_number, row in enumerate(rows, start=1):
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            _import_batch(service, batch, new_records, result)
+            batch = []
+    if batch:
+        _import_batch(service, batch, new_records, result)
+
+    if new_records:
+        service.save_many(new_records)
+    return result
+
+
+def _import_batch(service, batch, new_records, result):
+    valid = []
+    for row_number, row in batch:
+        values = {name: row.get(name) for name in service.fields}
+        try:
+            service.validate_new(values)
+            members = _member_records(service, row)
+        except ValueError as e:
+            result.errors.append((row_number, str(e)))
+            continue
+        valid.append((row_number, values, members))
+    if not valid:
+        return
+    first_number = storage.allocate_ids(service.collection, len(valid))
+    prefix = storage.id_prefixes[service.collection]
+    for number, (row_number, values, members) in enumerate(valid, start=first_number):
+        record = service.build(f"{prefix}{number}", values)
+        try:
+            for collection, member_records in members.items():
+                for member in member_records:
+                    getattr(record, 'add_' + member_kinds[collection])(member)
+        except ValueError as e:
+            # A venue too small for the guests of the event
+            result.errors.append((row_number, str(e)))
+            continue
+        new_records[getattr(record, service.id_attribute)] = record
+        result.imported.append(getattr(record, service.id_attribute))
+
+
+# A function that returns the IDs of a list of members in an import file: a JSON list, or "G1;G2" in a CSV cell
+def member_ids(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [member_id.strip() for member_id in value.split(';') if member_id.strip()]
+    return [str(member_id) for member_id in value]
+
+
+def _member_records(service, row):
+    # Looking up the members a row refers to (e.g. the guests of an event) in their registries
+    members = {}
+    for collection in service.member_collections:
+        registry = service.services[collection]
+        members[collection] = []
+        for member_id in member_ids(row.get(collection)):
+            record = registry.get(member_id)
+            if record is None:
+                raise ValueError(f"{member_kinds[collection].capitalize()} {member_id} does not exist.")
+            members[collection].append(record)
+    return members
+
+
+def import_file(service, path, batch_size=1000):
+    return import_rows(service, read_rows(path), batch_size)
+
+
+# A function that returns the column values of a record for export, the ID first and the IDs of its members
+# (e.g. the guests of an event) last, as a list
+def export_values(service, record):
+    values = {service.id_attribute: getattr(record, service.id_attribute)}
+    for name, attribute in service.fields.items():
+        values[name] = getattr(record, attribute, None)
+    for collection in service.member_collections:
+        values[collection] = list(getattr(record, collection))
+    return values
+
+
+def export_file(service, path):
+    # Writing every record to a .csv or .jsonl file one at a time, returns the number of records written
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.csv', '.jsonl', '.ndjson'):
+        raise ValueError(f"Unsupported file type: {extension} (expected .csv or .jsonl)")
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as outf:
+        if extension == '.csv':
+            writer = csv.DictWriter(outf, fieldnames=[service.id_attribute] + list(service.fields)
+                                    + list(service.member_collections))
+            writer.writeheader()
+        for record_id, record in storage.iter_records(service.collection):
+            if extension == '.csv':
+                values = export_values(service, record)
+                for collection in service.member_collections:
+                    values[collection] = ';'.join(values[collection])
+                writer.writerow(values)
+            else:
+                outf.write(json.dumps(export_values(service, record)) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,38 @@
+class ChangeFeed:
+    """Class to pass the changes other programs make to the data (e.g. another planner or a bulk import
+    writing to the same data directory) on to the parts of the program showing it. A subscriber is called
+    with the list of (action, record ID, record) changes of its collection and the dictionary of records the
+    service held before, see EntityService.poll_changes. poll() has to be called regularly, e.g. from the
+    Tk event loop; it only looks at the collections that have subscribers."""
+    def __init__(self, services):
+        # Constructor for ChangeFeed class
+        self.services = services
+        self.subscribers = {}  # collection -> list of callbacks
+
+    def subscribe(self, collection, callback):
+        self.subscribers.setdefault(collection, []).append(callback)
+
+    def unsubscribe(self, collection, callback=None):
+        # Removing one callback, or all callbacks of the collection
+        callbacks = self.subscribers.get(collection, [])
+        if callback is None:
+            callbacks.clear()
+        elif callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.subscribers.pop(collection, None)
+
+    def poll(self):
+        # Checking the subscribed collections for changes and calling their subscribers, returns the number
+        # of changes that were delivered
+        delivered = 0
+        for collection, callbacks in list(self.subscribers.items()):
+            service = self.services[collection]
+            previous = service.records
+            changes = service.poll_changes()
+            if not changes:
+                continue
+            for callback in list(callbacks):
+                callback(changes, previous)
+            delivered += len(changes)
+        return delivered
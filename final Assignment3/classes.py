@@ -1,5 +1,50 @@
-class Person:
+import sys
+import weakref
+
+from schedule import parse_date, parse_time, parse_duration
+
+# Suppliers, venues and guests that were stored inside events before events referred to them by ID, keyed by
+# the Event attribute. They are collected while such events are loaded, so that migrate.py can add the ones
+# missing from the registries
+legacy_records = {'suppliers': {}, 'venues': {}, 'guests': {}}
+
+# Objects told about every supplier, venue or guest added to or removed from an event through the Event
+# functions, such as membership_index.MembershipIndex. They must have member_added and member_removed functions
+# and are removed automatically when they are no longer used
+membership_listeners = weakref.WeakSet()
+
+
+class Record:
+    """Base class for all record classes. Attributes are stored in __slots__ instead of a per-object
+    __dict__, which makes every record much smaller in memory"""
+    __slots__ = ()
+
+    @classmethod
+    def slot_names(cls):
+        # Returning the names of all slots of the class, including the ones of its base classes
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(getattr(klass, '__slots__', ()))
+        return names
+
+    def __getstate__(self):
+        # Pickling the attributes as a plain dictionary, the same state as before __slots__ were used
+        return {name: getattr(self, name) for name in self.slot_names() if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        # Accepting the dictionary state of records pickled with or without __slots__
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        slots = set(self.slot_names())
+        for name, value in state.items():
+            if name in slots:
+                setattr(self, name, value)
+
+
+class Person(Record):
     """Class to represent a Person"""
+    __slots__ = ('_firstName', '_lastName', '_gender', '_phoneNumber')
+
     def __init__(self, firstName, lastName, gender, phoneNumber):
         # Constructor for Person class
         self._firstName = firstName
@@ -17,6 +62,8 @@ class Person:
 
 class Employee(Person):
     """Class to represent an Employee"""
+    __slots__ = ('employeeID', 'department', 'jobTitle', 'salary')
+
     def __init__(self, firstName, lastName, gender, phoneNumber, employeeID, department, jobTitle, salary):
         # Constructor for Employee class
         super().__init__(firstName, lastName, gender, phoneNumber)
@@ -34,6 +81,8 @@ class Employee(Person):
 
 class Guest(Person):
     """""Class to represent a Guest"""
+    __slots__ = ('guestID',)
+
     def __init__(self, firstName, lastName, gender, phoneNumber, guestID):
         # Constructor for Guest class
         super().__init__(firstName, lastName, gender, phoneNumber)
@@ -45,6 +94,8 @@ class Guest(Person):
 
 class Client(Person):
     """Class representing a client"""
+    __slots__ = ('clientID', 'budget', 'numOf_events')
+
     def __init__(self, firstName, lastName, gender, phoneNumber, clientID, budget, numOf_events):
         # Constructor for Client class
         super().__init__(firstName, lastName, gender, phoneNumber)
@@ -64,8 +115,10 @@ class Client(Person):
 
 
 
-class Supplier:
+class Supplier(Record):
     """Class to represent a supplier for an event."""
+    __slots__ = ('supplier_id', 'name', 'service_type')
+
     def __init__(self, supplier_id, name, service_type):
         # Constructor for Supplier class
         self.supplier_id = supplier_id
@@ -76,8 +129,10 @@ class Supplier:
         return f"Supplier ID: {self.supplier_id}, Name: {self.name}, Service Type: {self.service_type}"
 
 
-class Venue:
+class Venue(Record):
     """Class to represent a venue for an event"""
+    __slots__ = ('venue_id', 'address', 'min_guests', 'max_guests')
+
     def __init__(self, venue_id, address, min_guests, max_guests):
         # Constructor for Venue class
         self.venue_id = venue_id
@@ -89,8 +144,10 @@ class Venue:
         return f"Venue ID: {self.venue_id}, Address: {self.address}, Min Guests: {self.min_guests}, Max Guests: {self.max_guests}"
 
 
-class Event:
+class Event(Record):
     """Class to represent an event, which includes multiple suppliers and venues"""
+    __slots__ = ('event_id', 'event_type', 'date', 'time', 'duration', 'suppliers', 'venues', 'guests')
+
     def __init__(self, event_id, event_type, date, time, duration):
         # Constructor for Event class
         self.event_id = event_id
@@ -98,41 +155,99 @@ class Event:
         self.date = date
         self.time = time
         self.duration = duration
-        self.suppliers = []
-        self.venues = []
-        self.guests = []
+        # Suppliers, venues and guests are kept in dictionaries keyed by their ID, so adding, removing and
+        # checking a member is O(1) while the insertion order is still kept for display.
+        # They are only referenced by their ID (the values are None), the records themselves are kept once
+        # in the supplier, venue and guest registries (suppliers.pkl, venues.pkl and guests.pkl)
+        self.suppliers = {}
+        self.venues = {}
+        self.guests = {}
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        for name, id_attribute in (('suppliers', 'supplier_id'), ('venues', 'venue_id'), ('guests', 'guestID')):
+            members = getattr(self, name, None) or {}
+            # Events pickled before the dictionaries were used store their members in lists
+            if isinstance(members, list):
+                members = {getattr(member, id_attribute): member for member in members}
+            # Events saved before members were referenced by ID hold their own copies of the records. The IDs
+            # are interned, so an ID used by thousands of events is a single string in memory
+            member_ids = {}
+            for member_id, member in members.items():
+                if member is not None:
+                    legacy_records[name].setdefault(member_id, member)
+                member_ids[sys.intern(member_id)] = None
+            setattr(self, name, member_ids)
+
+    # The date, time and duration are kept as the text that was entered, these properties return them as
+    # datetime values and raise a ValueError if the text cannot be read
+    @property
+    def starts_at(self):
+        return parse_date(self.date) + parse_time(self.time)
+
+    @property
+    def length(self):
+        return parse_duration(self.duration)
+
+    @property
+    def ends_at(self):
+        return self.starts_at + self.length
 
-    def add_supplier(self, supplier_id, name, service_type):
-        # Add a supplier to the event
-        new_supplier = Supplier(supplier_id, name, service_type)
-        self.suppliers.append(new_supplier)
-        return new_supplier
+    # Functions that add and remove members, every change is passed on to the membership listeners
+    def _add_member(self, kind, members, member_id):
+        if member_id not in members:
+            members[sys.intern(member_id)] = None
+            for listener in membership_listeners:
+                listener.member_added(self, kind, member_id)
+
+    def _remove_member(self, kind, members, member_id):
+        if members.pop(member_id, False) is None:
+            for listener in membership_listeners:
+                listener.member_removed(self, kind, member_id)
+
+    def add_supplier(self, supplier):
+        # Add a supplier (a Supplier or its ID) to the event, only the ID is stored
+        self._add_member('supplier', self.suppliers, getattr(supplier, 'supplier_id', supplier))
 
     def remove_supplier(self, supplier_id):
         # Remove a supplier from the event
-        self.suppliers = [supplier for supplier in self.suppliers if supplier.supplier_id != supplier_id]
+        self._remove_member('supplier', self.suppliers, supplier_id)
+
+    def has_supplier(self, supplier_id):
+        return supplier_id in self.suppliers
 
     def add_venue(self, venue):
-        # Add a venue to the event
-        if venue not in self.venues:
-            self.venues.append(venue)
+        # Add a venue to the event, the venue must be big enough for the guests already invited
+        if len(self.guests) > int(venue.max_guests):
+            raise ValueError(f"Venue {venue.venue_id} holds at most {venue.max_guests} guests, "
+                             f"event {self.event_id} has {len(self.guests)}.")
+        self._add_member('venue', self.venues, venue.venue_id)
 
     def remove_venue(self, venue):
-        # Remove a venue from the event
-        self.venues = [v for v in self.venues if v.venue_id != venue.venue_id]
+        # Remove a venue (a Venue or its ID) from the event
+        self._remove_member('venue', self.venues, getattr(venue, 'venue_id', venue))
+
+    def has_venue(self, venue_id):
+        return venue_id in self.venues
 
     def add_guest(self, guest):
-        # Add a guest to the event
-        self.guests.append(guest)
+        # Add a guest (a Guest or its ID) to the event, adding the same guest twice keeps a single entry
+        self._add_member('guest', self.guests, getattr(guest, 'guestID', guest))
 
     def remove_guest(self, guestID):
         # Remove a guest from the event
-        self.guests = [guest for guest in self.guests if guest.guestID != guestID]
+        self._remove_member('guest', self.guests, guestID)
 
-    def get_details(self):
-        # Return details of the event
+    def has_guest(self, guestID):
+        return guestID in self.guests
+
+    def get_details(self, guests=None):
+        # Return details of the event, with the details of every guest if the guest registry is given
         details = f"Event ID: {self.event_id}, Type: {self.event_type}, Date: {self.date}, Time: {self.time}, Duration: {self.duration}"
-        guest_details = ', '.join([guest.get_details() for guest in self.guests])
+        if guests is None:
+            guest_details = ', '.join(self.guests)
+        else:
+            guest_details = ', '.join([guests[guest_id].get_details() for guest_id in self.guests if guest_id in guests])
         return f"{details}\nGuests: {guest_details}"
 
 
@@ -141,11 +256,9 @@ class Event:
 """This file includes a set of classes for managing the event management system. 
 The Person class serves as a base class for Employee, Guest, and Client classes, 
 each representing a different entity with specific attributes and behaviors. 
-The Event class has an aggregation relationship with the Guest and Venue classes. 
-This means that an event can have multiple guests and venues associated with it, 
-and these guests and venues can exist independently of the event. 
-The Event class has a composition relationship with the Supplier class. 
-This means that an event can have multiple suppliers, and their lifetime is tightly
- bound to the event. The Event class owns and manages the Supplier objects,
-facilitating coordination and payment with suppliers.
+The Event class has an aggregation relationship with the Guest, Venue and Supplier classes. 
+This means that an event can have multiple guests, venues and suppliers associated with it, 
+and these can exist independently of the event. Every guest, venue and supplier is stored 
+once in its registry and an event keeps only their IDs, so a record used by many events 
+is not copied into each of them and a change to the record is seen by all of its events.
 """
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Command line interface for the event management system, for scripts and batch jobs that run without a display.
+
+Examples:
+    python cli.py guests list
+    python cli.py guests add firstName=Sara lastName=Khalid gender=Female phoneNumber=0564453223
+    python cli.py employees update EP2 salary=27000
+    python cli.py venues search address=ADNEC
+    python cli.py guests find Khal
+    python cli.py guests find 4453 --substring
+    python cli.py guests find Khalid --field lastName --exact
+    python cli.py events get EV1
+    python cli.py clients delete C3
+    python cli.py guests import conference_guests.csv
+    python cli.py events export events.jsonl
+    python cli.py venues fit 250
+    python cli.py events allocate
+    python cli.py events conflicts
+    python cli.py events book EV1 guests G1
+    python cli.py guests events G1
+    python cli.py --backend sqlite events get EV1
+
+The storage backend is columnar unless --backend or the EMS_BACKEND environment variable names another one.
+Copy the data to a backend with migrate.py before using it, e.g. python migrate.py --to sqlite
+"""
+import argparse
+import sys
+
+import metrics
+import storage
+from bulk import import_file, export_file
+from service import create_services, describe
+from venue_allocation import allocate_venues
+
+
+def parse_fields(pairs):
+    # Turning a list of name=value arguments into a dictionary
+    fields = {}
+    for pair in pairs:
+        name, separator, value = pair.partition('=')
+        if not separator:
+            raise ValueError(f"Expected name=value, got: {pair}")
+        fields[name] = value
+    return fields
+
+
+def main(argv=None):
+    services = create_services()
+    parser = argparse.ArgumentParser(description="Manage employees, events, suppliers, guests, clients and venues.")
+    parser.add_argument('collection', choices=sorted(services))
+    parser.add_argument('action', choices=['list', 'get', 'add', 'update', 'delete', 'search', 'find',
+                                           'import', 'export', 'fit', 'allocate', 'conflicts', 'events', 'book'])
+    parser.add_argument('arguments', nargs='*', help="record ID and/or name=value fields, or the file to import/export")
+    parser.add_argument('--substring', action='store_true', help="find: match anywhere in a field, not only the start")
+    parser.add_argument('--exact', action='store_true', help="find: match the whole value of the --field")
+    parser.add_argument('--field', help="find: the field to look in, all searchable fields by default")
+    parser.add_argument('--backend', choices=['columnar', 'pickle', 'sqlite'],
+                        help="storage backend, EMS_BACKEND or columnar by default")
+    args = parser.parse_args(argv)
+    if args.backend:
+        storage.use_backend(args.backend)
+    service = services[args.collection]
+
+    try:
+        if args.action == 'list':
+            for _, record in service.items():
+                print(describe(record))
+        elif args.action == 'search':
+            for record in service.search(**parse_fields(args.arguments)):
+                print(describe(record))
+        elif args.action == 'add':
+            record = service.create(**parse_fields(args.arguments))
+            print(describe(record))
+        elif args.action == 'allocate':
+            if args.collection != 'events':
+                parser.error("allocate is only available for events")
+            result = allocate_venues(service, services['venues'], args.arguments or None)
+            for event_id, venue_id in result.assignments.items():
+                print(f"{event_id}: {venue_id}")
+            for event_id in result.unplaced:
+                print(f"{event_id}: no free venue fits its number of guests", file=sys.stderr)
+            for event_id, message in result.errors:
+                print(f"{event_id}: {message}", file=sys.stderr)
+            print(result)
+        elif args.action == 'conflicts':
+            if args.collection != 'events':
+                parser.error("conflicts is only available for events")
+            result = service.check_calendar()
+            for conflict in result.conflicts:
+                print(conflict)
+            for event_id, message in result.errors:
+                print(f"{event_id}: {message}", file=sys.stderr)
+            print(result)
+        elif not args.arguments:
+            parser.error(f"{args.action} needs a record ID or file name")
+        elif args.action == 'find':
+            if args.exact and not args.field:
+                parser.error("find --exact needs a --field")
+            mode = 'exact' if args.exact else 'substring' if args.substring else 'prefix'
+            for record in service.find(' '.join(args.arguments), args.field, mode):
+                print(describe(record))
+        elif args.action == 'import':
+            result = import_file(service, args.arguments[0])
+            for row_number, message in result.errors:
+                print(f"Row {row_number}: {message}", file=sys.stderr)
+            print(result)
+        elif args.action == 'export':
+            count = export_file(service, args.arguments[0])
+            print(f"Exported {count} records to {args.arguments[0]}")
+        elif args.action == 'fit':
+            if args.collection != 'venues':
+                parser.error("fit is only available for venues")
+            try:
+                guest_count = int(args.arguments[0])
+            except ValueError:
+                raise ValueError("The number of guests must be a whole number.")
+            for venue in service.venues_for(guest_count):
+                print(describe(venue))
+        elif args.action == 'book':
+            # Adding a supplier, venue or guest to an event and reporting the bookings it overlaps with
+            if args.collection != 'events' or len(args.arguments) != 3:
+                parser.error("book is used as: events book EVENT_ID suppliers|venues|guests MEMBER_ID")
+            event_id, collection, member_id = args.arguments
+            if collection not in ('suppliers', 'venues', 'guests'):
+                parser.error("book adds suppliers, venues or guests")
+            conflicts = service.add_member(event_id, collection, member_id)
+            if conflicts is None:
+                print(f"{event_id} not found", file=sys.stderr)
+                return 1
+            for conflict in conflicts:
+                print(f"Warning: {conflict}", file=sys.stderr)
+            print(f"Added {member_id} to {event_id}, {len(conflicts)} conflicts")
+        elif args.action == 'events':
+            for event in service.events(args.arguments[0]):
+                print(describe(event))
+        elif args.action == 'get':
+            record = service.get(args.arguments[0])
+            if record is None:
+                print(f"{args.arguments[0]} not found", file=sys.stderr)
+                return 1
+            print(describe(record))
+        elif args.action == 'update':
+            record = service.update(args.arguments[0], **parse_fields(args.arguments[1:]))
+            if record is None:
+                print(f"{args.arguments[0]} not found", file=sys.stderr)
+                return 1
+            print(describe(record))
+        elif args.action == 'delete':
+            if not service.delete(args.arguments[0]):
+                print(f"{args.arguments[0]} not found", file=sys.stderr)
+                return 1
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    metrics.configure_from_environment()
+    storage.use_backend_from_environment()
+    status = main()
+    metrics.write_all()
+    sys.exit(status)
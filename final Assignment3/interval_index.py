@@ -0,0 +1,205 @@
+import random
+from bisect import bisect_left
+
+
+class CapacityIndex:
+    """Class to find the ranges (e.g. the minimum and maximum guests of the venues) that contain a number,
+    smallest range end first. The ranges are sorted by their end and a segment tree over that order keeps
+    the smallest start of every block of ranges, so the next range containing the number is found in
+    O(log n) time: a binary search skips the ranges that end too early and the tree skips the blocks
+    that start too late. Adding or removing ranges only marks the index for rebuilding, which happens once
+    on the next query. Ranges are closed: (low, high) contains every number n with low <= n <= high."""
+    def __init__(self):
+        # Constructor for CapacityIndex class
+        self.ranges = {}  # key -> (low, high)
+        self._keys = []  # Keys sorted by the end of their range
+        self._highs = []
+        self._size = 0  # Number of leaves of the segment tree, a power of two
+        self._tree = []  # Smallest start of every node, the leaves start at position self._size
+        self._dirty = False
+
+    def add(self, key, low, high):
+        # Adding a range, or replacing the range of an existing key
+        if high < low:
+            raise ValueError(f"The range of {key} ends before it starts")
+        self.ranges[key] = (low, high)
+        self._dirty = True
+
+    def remove(self, key):
+        if self.ranges.pop(key, None) is not None:
+            self._dirty = True
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __contains__(self, key):
+        return key in self.ranges
+
+    def _build(self):
+        items = sorted(self.ranges.items(), key=lambda item: (item[1][1], item[1][0]))
+        self._keys = [key for key, _ in items]
+        self._highs = [high for _, (low, high) in items]
+        size = 1
+        while size < len(items):
+            size *= 2
+        tree = [float('inf')] * (2 * size)
+        for position, (_, (low, high)) in enumerate(items):
+            tree[size + position] = low
+        for node in range(size - 1, 0, -1):
+            tree[node] = min(tree[2 * node], tree[2 * node + 1])
+        self._size = size
+        self._tree = tree
+        self._dirty = False
+
+    def _next_containing(self, position, number):
+        # Returning the first position from the given one whose range starts at or before the number, or None
+        if position >= len(self._keys):
+            return None
+        tree = self._tree
+        node = position + self._size
+        while tree[node] > number:
+            # Moving to the next block to the right: up while this node is a right child, then to its sibling
+            while node & 1:
+                node >>= 1
+            if node == 0:
+                return None
+            node += 1
+        # Going down to the leftmost range in this block that starts early enough
+        while node < self._size:
+            node = 2 * node if tree[2 * node] <= number else 2 * node + 1
+        return node - self._size
+
+    def containing(self, number):
+        # Yielding the keys of the ranges that contain the number, smallest range end first
+        if self._dirty:
+            self._build()
+        keys = self._keys
+        position = self._next_containing(bisect_left(self._highs, number), number)
+        while position is not None:
+            yield keys[position]
+            position = self._next_containing(position + 1, number)
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, key, priority):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    # Recomputing the largest end in the subtree of a node from its children
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+class IntervalTree:
+    """Class to keep half-open intervals [start, end), e.g. the times of events, that are added and removed
+    one at a time and searched for overlaps. It is a treap: a binary search tree ordered by start whose
+    random priorities keep it balanced, so adding and removing an interval take O(log n) expected time.
+    Every node also stores the largest end in its subtree, so a search skips the subtrees that end too early."""
+    def __init__(self):
+        # Constructor for IntervalTree class
+        self.intervals = {}  # key -> (start, end)
+        self._root = None
+        self._random = random.Random()
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __contains__(self, key):
+        return key in self.intervals
+
+    def add(self, key, start, end):
+        # Adding an interval, or moving the interval of an existing key
+        if not start < end:
+            raise ValueError(f"The interval of {key} must end after it starts")
+        self.remove(key)
+        self.intervals[key] = (start, end)
+        self._root = self._insert(self._root, _Node(start, end, key, self._random.random()))
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if (new.start, new.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        _update(node)
+        return node
+
+    @staticmethod
+    def _rotate_right(node):
+        top = node.left
+        node.left = top.right
+        top.right = node
+        _update(node)
+        return top
+
+    @staticmethod
+    def _rotate_left(node):
+        top = node.right
+        node.right = top.left
+        top.left = node
+        _update(node)
+        return top
+
+    def remove(self, key):
+        interval = self.intervals.pop(key, None)
+        if interval is not None:
+            self._root = self._delete(self._root, interval[0], key)
+
+    def _delete(self, node, start, key):
+        if node is None:
+            return None
+        if (start, key) < (node.start, node.key):
+            node.left = self._delete(node.left, start, key)
+        elif (start, key) > (node.start, node.key):
+            node.right = self._delete(node.right, start, key)
+        else:
+            return self._merge(node.left, node.right)
+        _update(node)
+        return node
+
+    def _merge(self, left, right):
+        # Joining two subtrees where every start in left comes before every start in right
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            _update(left)
+            return left
+        right.left = self._merge(left, right.left)
+        _update(right)
+        return right
+
+    def overlapping(self, start, end):
+        # Returning the keys of the intervals that overlap [start, end), intervals that only touch do not overlap
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= start:
+                continue
+            stack.append(node.left)
+            if node.start < end:
+                if node.end > start:
+                    results.append(node.key)
+                # Intervals to the right start later, so they are only checked if this one starts in time
+                stack.append(node.right)
+        return results
@@ -0,0 +1,55 @@
+import classes
+from schedule import resource_kinds
+
+
+class MembershipIndex:
+    """Class to keep the reverse index of event members: for every supplier, venue and guest the set of
+    events it belongs to, so the events of a record are found without looking at every event.
+    Once an event is added, suppliers, venues and guests added to or removed from it with the Event
+    functions (add_guest, remove_venue, ...) are indexed straight away, before the event is saved."""
+    def __init__(self):
+        # Constructor for MembershipIndex class
+        self.events = {}  # (kind, member ID) -> set of event IDs
+        self.members = {}  # event ID -> set of (kind, member ID) the event is indexed under
+        classes.membership_listeners.add(self)
+
+    def add(self, event):
+        # Adding an event, or replacing what was indexed for it before
+        self.remove(event.event_id)
+        members = {(kind, member_id) for kind, attribute in resource_kinds for member_id in getattr(event, attribute)}
+        for member in members:
+            self.events.setdefault(member, set()).add(event.event_id)
+        self.members[event.event_id] = members
+
+    def add_all(self, items):
+        # Adding (event ID, event) pairs. Only IDs are kept, so the events of a memory mapped collection
+        # can be dropped from memory once they are indexed
+        for _, event in items:
+            self.add(event)
+
+    def remove(self, event_id):
+        for member in self.members.pop(event_id, ()):
+            self._unlink(member, event_id)
+
+    def _unlink(self, member, event_id):
+        event_ids = self.events[member]
+        event_ids.discard(event_id)
+        if not event_ids:
+            del self.events[member]
+
+    # Functions called by the Event functions, changes of events that are not indexed here are ignored
+    def member_added(self, event, kind, member_id):
+        members = self.members.get(event.event_id)
+        if members is not None:
+            members.add((kind, member_id))
+            self.events.setdefault((kind, member_id), set()).add(event.event_id)
+
+    def member_removed(self, event, kind, member_id):
+        members = self.members.get(event.event_id)
+        if members is not None and (kind, member_id) in members:
+            members.discard((kind, member_id))
+            self._unlink((kind, member_id), event.event_id)
+
+    def events_with(self, kind, member_id):
+        # Returning the IDs of the events a supplier, venue or guest belongs to
+        return set(self.events.get((kind, member_id), ()))
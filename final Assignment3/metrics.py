@@ -0,0 +1,257 @@
+"""Instrumentation for finding out where the program spends its time: timers and counters around loading,
+saving and the operations of the GUI, exported as a metrics snapshot (JSON), a trace file that can be opened
+in chrome://tracing or Perfetto, and an optional sampling profile in the collapsed stack format used by
+flame graph tools.
+
+Everything is off by default and a disabled timer costs a single check. It is switched on with the
+EMS_METRICS environment variable, a comma separated list of: metrics, trace, profile, e.g.
+    EMS_METRICS=metrics,trace python GUI.py
+The files are written to the directory in EMS_METRICS_DIR (default: metrics) when the program ends."""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+enabled = False  # Timers and counters are recorded
+tracing = False  # Every timed operation is also kept as an event of the trace file
+output_path = "metrics"
+
+# Number of recent durations kept per timer to compute the percentiles, and maximum events in the trace
+recent_samples = 1000
+max_trace_events = 100000
+
+_lock = threading.Lock()
+_timers = {}  # name -> TimerStats
+_counters = Counter()
+_trace = deque(maxlen=max_trace_events)
+_started = time.perf_counter()
+_profiler = None
+
+
+class TimerStats:
+    """Class to represent the durations recorded for one timer"""
+    def __init__(self):
+        # Constructor for TimerStats class
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=recent_samples)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000,
+            'p50_ms': ordered[len(ordered) // 2] * 1000,
+            'p95_ms': ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)] * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+def configure(options=(), path=None):
+    # Switching the instrumentation on, options is a collection of 'metrics', 'trace' and 'profile'
+    global enabled, tracing, output_path
+    options = set(options)
+    unknown = options - {'metrics', 'trace', 'profile'}
+    if unknown:
+        raise ValueError(f"Unknown instrumentation options: {', '.join(sorted(unknown))}")
+    enabled = bool(options)
+    tracing = 'trace' in options
+    if path:
+        output_path = path
+    if 'profile' in options:
+        start_profiler()
+
+
+def configure_from_environment():
+    options = [option.strip() for option in os.environ.get('EMS_METRICS', '').split(',') if option.strip()]
+    if options:
+        configure(options, os.environ.get('EMS_METRICS_DIR'))
+
+
+def record(name, seconds, start=None):
+    # Adding one duration to a timer, start (a perf_counter value) places it in the trace
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            stats = _timers[name] = TimerStats()
+        stats.add(seconds)
+        if tracing and start is not None:
+            _trace.append({'name': name, 'ph': 'X', 'ts': (start - _started) * 1e6, 'dur': seconds * 1e6,
+                           'pid': os.getpid(), 'tid': threading.get_ident()})
+
+
+def count(name, amount=1):
+    if enabled:
+        with _lock:
+            _counters[name] += amount
+
+
+class _Timer:
+    """Class to time the block of a with statement"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        # Constructor for _Timer class
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start, self.start)
+
+
+class _NoTimer:
+    """Class to represent the timer used while the instrumentation is off, it does nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_no_timer = _NoTimer()
+
+
+def timer(name):
+    # Returning a context manager timing its block, e.g. with metrics.timer("storage.load.guests"): ...
+    return _Timer(name) if enabled else _no_timer
+
+
+def timed(name):
+    # Decorator timing every call of a function under the given name
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start, start)
+        return wrapper
+    return decorate
+
+
+def instrument(cls, prefixes, group):
+    # Wrapping every function of a class whose name starts with one of the prefixes in a timer named
+    # group.function_name, e.g. all refresh_ and add_ functions of the GUI
+    for name, value in list(vars(cls).items()):
+        if callable(value) and name.startswith(tuple(prefixes)):
+            setattr(cls, name, timed(f"{group}.{name}")(value))
+    return cls
+
+
+def snapshot():
+    # Returning the current timers and counters as a dictionary
+    with _lock:
+        return {
+            'uptime_s': time.perf_counter() - _started,
+            'timers': {name: stats.summary() for name, stats in sorted(_timers.items())},
+            'counters': dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _trace.clear()
+
+
+def write_snapshot(path):
+    with open(path, 'w', encoding='utf-8') as snapshotf:
+        json.dump(snapshot(), snapshotf, indent=2)
+
+
+def write_trace(path):
+    # Writing the trace in the Trace Event format of chrome://tracing and Perfetto
+    with _lock:
+        events = list(_trace)
+    with open(path, 'w', encoding='utf-8') as tracef:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, tracef)
+
+
+class SamplingProfiler:
+    """Class to sample the call stack of a thread at a fixed interval from a background thread.
+    Unlike cProfile it does not slow down every function call, so it can run while the program is used."""
+    def __init__(self, thread_id=None, interval=0.005):
+        # Constructor for SamplingProfiler class, by default the thread that creates it is sampled
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()  # "outer;...;inner" -> number of samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        # Writing the samples in the collapsed stack format, one "stack count" line per distinct stack
+        with open(path, 'w', encoding='utf-8') as profilef:
+            for stack, samples in self.stacks.most_common():
+                profilef.write(f"{stack} {samples}\n")
+
+
+def start_profiler(interval=0.005):
+    # Sampling the calling thread (normally the main thread running the GUI) until stop_profiler is called
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval=interval).start()
+    return _profiler
+
+
+def stop_profiler():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def write_all():
+    # Writing the snapshot, the trace and the profile that were switched on to the output directory
+    if not enabled:
+        return []
+    os.makedirs(output_path, exist_ok=True)
+    written = [os.path.join(output_path, 'metrics.json')]
+    write_snapshot(written[0])
+    if tracing:
+        written.append(os.path.join(output_path, 'trace.json'))
+        write_trace(written[-1])
+    profiler = stop_profiler()
+    if profiler is not None:
+        written.append(os.path.join(output_path, 'profile.txt'))
+        profiler.write(written[-1])
+    return written
@@ -0,0 +1,55 @@
+import argparse
+
+import storage
+
+
+class MigrationResult:
+    """Class to represent the outcome of a data migration"""
+    def __init__(self):
+        # Constructor for MigrationResult class
+        self.added = {}  # collection -> IDs of the records that were added to its registry
+        self.rewritten = 0  # Number of records that were saved again in the new format
+
+    def __str__(self):
+        added = sum(len(ids) for ids in self.added.values())
+        return f"Added {added} records to the registries, rewrote {self.rewritten} records"
+
+
+def migrate_event_references():
+    # Moving the suppliers, venues and guests stored inside events into their registries and saving the events
+    # again without the copies. Loading the events already does this (see storage._move_legacy_members), so
+    # this only reads them again and reports what was moved
+    before = {collection: len(ids) for collection, ids in storage.migrated_members.items()}
+    # The .pkl files are kept when a collection is converted to another format, so the records of events
+    # that were converted before this migration existed are picked up from there
+    if storage.backend != "pickle" and storage._has_pickle_files('events'):
+        storage._read_pickle_files('events')
+    signature = storage._file_signature('events')
+    storage.invalidate_cache('events')
+    events = storage.load_event_data()
+
+    result = MigrationResult()
+    for collection, ids in storage.migrated_members.items():
+        if ids[before.get(collection, 0):]:
+            result.added[collection] = ids[before.get(collection, 0):]
+    if storage._file_signature('events') != signature:
+        result.rewritten = len(events)
+    return result
+
+
+if __name__ == "__main__":
+    # python migrate.py: moving the suppliers, venues and guests stored inside events into their own files
+    # python migrate.py --to sqlite: copying the data of the current backend (EMS_BACKEND, columnar by
+    # default) to another backend, which is then used with EMS_BACKEND=sqlite or cli.py --backend sqlite
+    parser = argparse.ArgumentParser(description="Migrate the event management data.")
+    parser.add_argument('--to', choices=['columnar', 'pickle', 'sqlite'], help="backend to copy the data to")
+    args = parser.parse_args()
+    storage.use_backend_from_environment()
+    if args.to:
+        try:
+            copied = storage.copy_to_backend(args.to)
+        except ValueError as e:
+            parser.exit(1, f"Error: {e}\n")
+        print(f"Copied to {args.to}: {', '.join(copied)}" if copied else "Nothing to copy")
+    else:
+        print(migrate_event_references())
@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+
+import metrics
+import storage
+
+
+class PersistenceWorker:
+    """Class to write changes to storage in a background thread, so that saving never blocks the GUI.
+    Changes submitted in quick succession are coalesced: for each collection only the latest full save
+    and the latest change of every record are written. It offers the same save_record, delete_record,
+    save_records and save_collection functions as the storage module, so a service can use either.
+    The outcome of every write is put in the results queue as (collection, error message or None)."""
+    def __init__(self, delay=0.05):
+        # Constructor for PersistenceWorker class
+        self.delay = delay  # Seconds to wait for more changes before writing, so rapid saves are coalesced
+        self.results = queue.Queue()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopping = False
+        self._pending = {}  # collection -> {'full': dictionary or None, 'changes': {key: (action, record)}}
+        # A daemon thread does not keep the program alive, so call stop() before exiting to write pending changes
+        self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+        self._thread.start()
+
+    def _pending_for(self, collection):
+        return self._pending.setdefault(collection, {'full': None, 'changes': {}})
+
+    def save_record(self, collection, key, record):
+        self._submit_change(collection, 'put', key, record)
+
+    def delete_record(self, collection, key):
+        self._submit_change(collection, 'delete', key, None)
+
+    def save_records(self, collection, records):
+        with self._lock:
+            changes = self._pending_for(collection)['changes']
+            for key, record in records.items():
+                changes.pop(key, None)
+                changes[key] = ('put', record)
+            self._idle.clear()
+        self._wakeup.set()
+
+    def save_collection(self, collection, data):
+        # A full save replaces all pending changes of the collection, the data is copied so that
+        # later changes made by the GUI are not written half way through
+        with self._lock:
+            pending = self._pending_for(collection)
+            pending['full'] = dict(data)
+            pending['changes'] = {}
+            self._idle.clear()
+        self._wakeup.set()
+
+    def _submit_change(self, collection, action, key, record):
+        with self._lock:
+            changes = self._pending_for(collection)['changes']
+            # Moving the key to the end keeps the changes in the order they were last made
+            changes.pop(key, None)
+            changes[key] = (action, record)
+            self._idle.clear()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            if not self._stopping:
+                # Waiting a moment so that changes arriving right after each other are written together
+                time.sleep(self.delay)
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._wakeup.clear()
+            for collection, work in pending.items():
+                self._write(collection, work)
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+                    if self._stopping:
+                        return
+
+    def _write(self, collection, work):
+        metrics.count("persistence.writes")
+        try:
+            if work['full'] is not None:
+                storage.save_collection(collection, work['full'])
+            if work['changes']:
+                storage.apply_changes(collection, [(action, key, record)
+                                                   for key, (action, record) in work['changes'].items()])
+            self.results.put((collection, None))
+        except Exception as e:
+            self.results.put((collection, f"An error occurred while saving {collection} data: {e}"))
+
+    def flush(self, timeout=None):
+        # Waiting until every submitted change has been written, returns False if the timeout ran out
+        self._wakeup.set()
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        # Writing everything that is still pending and ending the thread
+        with self._lock:
+            self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
@@ -0,0 +1,502 @@
+"""Compact, versioned binary format for the record collections.
+
+A collection file stores one column per record attribute, so a single column (e.g. the dates of all events)
+or a single record can be read without decoding the rest of the file. Reading never runs code from the file:
+only the record classes listed in record_classes can be created. Layout (all numbers little endian):
+
+    magic b'EMCOL\\0', format version (u16), header length (u32), header CRC-32 (u32), header (JSON),
+    then one block per column, each with its own CRC-32 in the header.
+
+Column types: "str" (u32 end offsets followed by the UTF-8 text), "float" (f64 values), "int" (i64 values)
+and "value" (u32 end offsets followed by tagged values, for anything else such as None or nested records).
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from classes import Record, Employee, Client, Event, Supplier, Guest, Venue
+
+magic = b'EMCOL\x00'
+format_version = 1
+_prefix_format = '<6sHII'
+_prefix_size = struct.calcsize(_prefix_format)
+
+# The only classes that can be created when reading a file
+record_classes = {cls.__name__: cls for cls in (Employee, Client, Event, Supplier, Guest, Venue)}
+
+
+class FormatError(ValueError):
+    """Class to represent a file that is damaged or was not written in this format"""
+
+
+# Functions to encode and decode single values with a one byte type tag, used for "value" columns and journal entries
+def encode_value(value, out):
+    if value is None:
+        out += b'N'
+    elif value is True:
+        out += b'T'
+    elif value is False:
+        out += b'F'
+    elif isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            out += b'i' + struct.pack('<q', value)
+        else:
+            _encode_text(b'I', str(value), out)
+    elif isinstance(value, float):
+        out += b'f' + struct.pack('<d', value)
+    elif isinstance(value, str):
+        _encode_text(b's', value, out)
+    elif isinstance(value, (list, tuple)):
+        out += b'l' + struct.pack('<I', len(value))
+        for item in value:
+            encode_value(item, out)
+    elif isinstance(value, dict):
+        out += b'd' + struct.pack('<I', len(value))
+        for key, item in value.items():
+            encode_value(key, out)
+            encode_value(item, out)
+    elif record_classes.get(type(value).__name__) is type(value):
+        _encode_text(b'r', type(value).__name__, out)
+        encode_value(value.__getstate__(), out)
+    else:
+        raise FormatError(f"Values of type {type(value).__name__} cannot be stored")
+
+
+def _encode_text(tag, text, out):
+    data = text.encode('utf-8')
+    out += tag + struct.pack('<I', len(data)) + data
+
+
+def decode_value(data, position=0):
+    # Returning the value starting at position and the position right after it
+    tag = data[position:position + 1]
+    position += 1
+    if tag == b'N':
+        return None, position
+    if tag == b'T':
+        return True, position
+    if tag == b'F':
+        return False, position
+    if tag == b'i':
+        return struct.unpack_from('<q', data, position)[0], position + 8
+    if tag == b'f':
+        return struct.unpack_from('<d', data, position)[0], position + 8
+    if tag in (b's', b'I', b'r'):
+        length = struct.unpack_from('<I', data, position)[0]
+        position += 4
+        text = bytes(data[position:position + length]).decode('utf-8')
+        position += length
+        if tag == b's':
+            return text, position
+        if tag == b'I':
+            return int(text), position
+        cls = record_classes.get(text)
+        if cls is None:
+            raise FormatError(f"Unknown record class: {text}")
+        state, position = decode_value(data, position)
+        record = cls.__new__(cls)
+        record.__setstate__(state)
+        return record, position
+    if tag in (b'l', b'd'):
+        count = struct.unpack_from('<I', data, position)[0]
+        position += 4
+        if tag == b'l':
+            items = []
+            for _ in range(count):
+                item, position = decode_value(data, position)
+                items.append(item)
+            return items, position
+        items = {}
+        for _ in range(count):
+            key, position = decode_value(data, position)
+            items[key], position = decode_value(data, position)
+        return items, position
+    raise FormatError(f"Unknown value tag {tag!r} at position {position - 1}")
+
+
+def _little_endian(values):
+    # The arrays are stored little endian whatever the byte order of the machine
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _column_type(values):
+    kinds = {type(value) for value in values}
+    if kinds == {str}:
+        return 'str'
+    if kinds == {float}:
+        return 'float'
+    if kinds == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in values):
+        return 'int'
+    return 'value'
+
+
+def _encode_column(column_type, values):
+    if column_type == 'float':
+        return _little_endian(array('d', values)).tobytes()
+    if column_type == 'int':
+        return _little_endian(array('q', values)).tobytes()
+    if column_type == 'str':
+        parts = [value.encode('utf-8') for value in values]
+    else:
+        parts = []
+        for value in values:
+            encoded = bytearray()
+            encode_value(value, encoded)
+            parts.append(bytes(encoded))
+    # The end offset of every value, the start of a value is the end of the one before it
+    offsets = array('I')
+    end = 0
+    for part in parts:
+        end += len(part)
+        offsets.append(end)
+    return _little_endian(offsets).tobytes() + b''.join(parts)
+
+
+def _decode_column(column_type, block, count):
+    if column_type in ('float', 'int'):
+        values = array('d' if column_type == 'float' else 'q')
+        values.frombytes(block)
+        return _little_endian(values).tolist()
+    offsets = array('I')
+    offsets.frombytes(block[:4 * count])
+    offsets = [0] + _little_endian(offsets).tolist()
+    data = block[4 * count:]
+    if column_type == 'str':
+        text = bytes(data).decode('utf-8')
+        if len(text) == len(data):
+            # Plain ASCII text: byte offsets are character offsets, so the text is decoded only once
+            return [text[offsets[i]:offsets[i + 1]] for i in range(count)]
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(count)]
+    return [decode_value(data, offsets[i])[0] for i in range(count)]
+
+
+# A function that writes a dictionary of records (all of the same class) to a file and forces it to disk
+def write_file(path, records):
+    # The values are collected column by column in a single pass, without keeping a list of the records
+    cls = None
+    names = []
+    columns = {}
+    keys = []
+    for key, record in records.items():
+        if cls is None:
+            cls = type(record)
+            if record_classes.get(cls.__name__) is not cls:
+                raise FormatError(f"Records of class {cls.__name__} cannot be stored")
+            names = cls.slot_names()
+            columns = {name: [] for name in names}
+        elif type(record) is not cls:
+            raise FormatError("All records of a collection file must have the same class")
+        keys.append(key)
+        for name in names:
+            columns[name].append(getattr(record, name, None))
+    # The dictionary keys are normally the values of the ID attribute, which then is not stored twice
+    key_column = next((name for name in names if columns[name] == keys), None)
+    if key_column is None:
+        key_column = '__key__'
+        columns[key_column] = keys
+
+    header = {'version': format_version, 'class': cls.__name__ if cls is not None else None,
+              'count': len(keys), 'key_column': key_column, 'columns': []}
+    blocks = []
+    offset = 0
+    for name, values in columns.items():
+        column_type = _column_type(values)
+        block = _encode_column(column_type, values)
+        header['columns'].append({'name': name, 'type': column_type, 'offset': offset, 'length': len(block),
+                                  'crc': zlib.crc32(block)})
+        blocks.append(block)
+        offset += len(block)
+    header['size'] = offset
+    header_data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    with open(path, 'wb') as outf:
+        outf.write(struct.pack(_prefix_format, magic, format_version, len(header_data), zlib.crc32(header_data)))
+        outf.write(header_data)
+        for block in blocks:
+            outf.write(block)
+        outf.flush()
+        os.fsync(outf.fileno())
+
+
+class ColumnFile:
+    """Class to read a collection file: whole columns, single values or single records, without
+    decoding the parts of the file that are not needed. Use it with a with statement.
+    With mapped=True the file is memory mapped, so reading a value is a slice of the mapping instead of a system call."""
+    def __init__(self, path, mapped=False):
+        # Constructor for ColumnFile class, reading and checking only the header
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = None
+        try:
+            self._read_header()
+            if mapped:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        self._rows = None
+
+    def _read_header(self):
+        prefix = self.file.read(_prefix_size)
+        if len(prefix) < _prefix_size or prefix[:len(magic)] != magic:
+            raise FormatError(f"{self.path} is not a collection file or is truncated")
+        _, version, header_length, header_crc = struct.unpack(_prefix_format, prefix)
+        if version > format_version:
+            raise FormatError(f"{self.path} was written by a newer version (format {version})")
+        header_data = self.file.read(header_length)
+        if len(header_data) != header_length or zlib.crc32(header_data) != header_crc:
+            raise FormatError(f"{self.path} has a damaged header")
+        self.header = json.loads(header_data)
+        self.data_start = _prefix_size + header_length
+        self.count = self.header['count']
+        self.columns = {column['name']: column for column in self.header['columns']}
+        self.record_class = None
+        if self.header['class'] is not None:
+            self.record_class = record_classes.get(self.header['class'])
+            if self.record_class is None:
+                raise FormatError(f"Unknown record class: {self.header['class']}")
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _column(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise KeyError(f"{self.path} has no column {name}") from None
+
+    def _read_block(self, column, start=0, length=None):
+        length = column['length'] - start if length is None else length
+        position = self.data_start + column['offset'] + start
+        if self.map is not None:
+            block = self.map[position:position + length]
+        else:
+            self.file.seek(position)
+            block = self.file.read(length)
+        if len(block) != length:
+            raise FormatError(f"{self.path} is truncated")
+        return block
+
+    def read_column(self, name):
+        # Returning the values of one attribute for all records, in the order of the records
+        column = self._column(name)
+        block = self._read_block(column)
+        if zlib.crc32(block) != column['crc']:
+            raise FormatError(f"Column {name} of {self.path} does not match its checksum")
+        return _decode_column(column['type'], block, self.count)
+
+    def keys(self):
+        return self.read_column(self.header['key_column'])
+
+    def row_of(self, key):
+        # Position of the record with the given key, or None. The key column is read once and remembered
+        if self._rows is None:
+            self._rows = {record_key: row for row, record_key in enumerate(self.keys())}
+        return self._rows.get(key)
+
+    def read_value(self, name, row):
+        # Returning one value of one record, reading only the bytes of that value
+        column = self._column(name)
+        column_type = column['type']
+        if column_type in ('float', 'int'):
+            block = self._read_block(column, 8 * row, 8)
+            return struct.unpack('<d' if column_type == 'float' else '<q', block)[0]
+        ends = struct.unpack('<II', self._read_block(column, 4 * (row - 1), 8)) if row else \
+            (0, struct.unpack('<I', self._read_block(column, 0, 4))[0])
+        data = self._read_block(column, 4 * self.count + ends[0], ends[1] - ends[0])
+        return data.decode('utf-8') if column_type == 'str' else decode_value(data)[0]
+
+    def read_record(self, key):
+        # Returning the record with the given key, or None, reading one value of every column
+        row = self.row_of(key)
+        if row is None:
+            return None
+        return self.read_row(row)
+
+    def read_row(self, row):
+        # Returning the record at the given position
+        record = self.record_class.__new__(self.record_class)
+        record.__setstate__({name: self.read_value(name, row) for name in self._attribute_names()})
+        return record
+
+    def _attribute_names(self):
+        # Attributes of the class that are stored in the file, attributes added to a class later are left unset
+        # and columns of attributes that were removed are ignored
+        slots = set(self.record_class.slot_names())
+        return [name for name in self.columns if name in slots]
+
+    def read_all(self):
+        # Returning the dictionary of all records, keyed by the key column
+        if self.record_class is None:
+            return {}
+        names = self._attribute_names()
+        columns = [self.read_column(name) for name in names]
+        keys = self.keys() if self.header['key_column'] not in names else columns[names.index(self.header['key_column'])]
+        records = {}
+        new = self.record_class.__new__
+        cls = self.record_class
+        if cls.__setstate__ is not Record.__setstate__:
+            # Classes that convert older data while it is loaded (see Event.__setstate__) get their state as usual
+            for key, values in zip(keys, zip(*columns)):
+                record = new(cls)
+                record.__setstate__(dict(zip(names, values)))
+                records[key] = record
+            return records
+        for key, values in zip(keys, zip(*columns)):
+            record = new(cls)
+            for name, value in zip(names, values):
+                setattr(record, name, value)
+            records[key] = record
+        return records
+
+
+class MappedCollection(MutableMapping):
+    """Class to use a collection file as a dictionary of records without loading it into memory. The file is
+    memory mapped and a record is only decoded when it is accessed; at most max_resident decoded records are
+    kept, the least recently used ones are dropped. Records that are added, changed or removed are kept in
+    memory on top of the file, which itself is never written."""
+    def __init__(self, path, max_resident=10000):
+        # Constructor for MappedCollection class
+        self.max_resident = max_resident
+        self.column_file = ColumnFile(path, mapped=True)
+        if self.column_file.record_class is None:
+            self.rows = {}
+        else:
+            self.rows = {key: row for row, key in enumerate(self.column_file.keys())}  # key -> position in the file
+        self.resident = OrderedDict()  # Decoded records of the file, the least recently used first
+        self.changed = {}  # key -> record added or changed since the file was written
+        self.deleted = set()  # Keys of records of the file removed since it was written
+
+    def __getitem__(self, key):
+        record = self.changed.get(key)
+        if record is not None:
+            return record
+        if key in self.deleted or key not in self.rows:
+            raise KeyError(key)
+        record = self.resident.get(key)
+        if record is None:
+            record = self.column_file.read_row(self.rows[key])
+            self.resident[key] = record
+            if len(self.resident) > self.max_resident:
+                self.resident.popitem(last=False)
+        else:
+            self.resident.move_to_end(key)
+        return record
+
+    def __setitem__(self, key, record):
+        self.changed[key] = record
+        self.deleted.discard(key)
+        self.resident.pop(key, None)
+
+    def __delitem__(self, key):
+        in_file = key in self.rows and key not in self.deleted
+        if self.changed.pop(key, None) is None and not in_file:
+            raise KeyError(key)
+        if key in self.rows:
+            self.deleted.add(key)
+        self.resident.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.changed or (key in self.rows and key not in self.deleted)
+
+    def __iter__(self):
+        # The records of the file in their order, then the ones added since
+        for key in self.rows:
+            if key not in self.deleted:
+                yield key
+        for key in self.changed:
+            if key not in self.rows:
+                yield key
+
+    def __len__(self):
+        return len(self.rows) - len(self.deleted) + sum(1 for key in self.changed if key not in self.rows)
+
+    def iter_items(self):
+        # Yielding every (key, record) without keeping the records it decodes, so going through the whole
+        # collection (e.g. an export) does not push the recently used records out of memory
+        for key, row in self.rows.items():
+            if key in self.deleted:
+                continue
+            record = self.changed.get(key)
+            if record is None:
+                record = self.resident.get(key)
+            if record is None:
+                record = self.column_file.read_row(row)
+            yield key, record
+        for key, record in list(self.changed.items()):
+            if key not in self.rows:
+                yield key, record
+
+    def close(self):
+        self.column_file.close()
+
+
+def read_file(path):
+    with ColumnFile(path) as column_file:
+        return column_file.read_all()
+
+
+def read_column(path, name):
+    # e.g. read_column('data/events.emr', 'date') returns the dates of all events
+    with ColumnFile(path) as column_file:
+        return column_file.read_column(name)
+
+
+def read_record(path, key):
+    with ColumnFile(path) as column_file:
+        return column_file.read_record(key)
+
+
+def file_is_complete(path):
+    # A quick check of the header and the file size, without reading the columns
+    try:
+        with ColumnFile(path) as column_file:
+            size = column_file.data_start + column_file.header['size']
+            column_file.file.seek(0, 2)
+            return column_file.file.tell() == size
+    except (OSError, FormatError, ValueError):
+        return False
+
+
+# Functions to write and read journal entries: a u32 length and a CRC-32 followed by one tagged value
+def encode_entry(value):
+    payload = bytearray()
+    encode_value(value, payload)
+    return struct.pack('<II', len(payload), zlib.crc32(payload)) + payload
+
+
+def iter_entries(inf):
+    # Yielding every complete entry of a journal file, stopping at an entry that was only partly written
+    while True:
+        prefix = inf.read(8)
+        if not prefix:
+            return
+        if len(prefix) < 8:
+            raise FormatError("incomplete entry")
+        length, checksum = struct.unpack('<II', prefix)
+        payload = inf.read(length)
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            raise FormatError("incomplete entry")
+        yield decode_value(payload)[0]
+
+
+if __name__ == "__main__":
+    # python record_format.py: converting every data/*.pkl collection to the columnar format
+    import storage
+    converted = storage.convert_pickles_to_columnar(overwrite='--overwrite' in sys.argv)
+    print(f"Converted: {', '.join(converted)}" if converted else "Nothing to convert")
@@ -0,0 +1,188 @@
+import re
+from datetime import datetime, timedelta
+from heapq import heappop, heappush
+
+from interval_index import IntervalTree
+
+# Functions that turn the date, time and duration text of an event into datetime values
+_date_separators = re.compile(r'[/\-.]')
+_time_pattern = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*(?:m\.?)?', re.IGNORECASE)
+_duration_part = re.compile(r'(\d+(?:\.\d+)?)\s*(days?|d|hours?|hrs?|h|minutes?|mins?|m)?', re.IGNORECASE)
+_duration_units = {'d': timedelta(days=1), 'h': timedelta(hours=1), 'm': timedelta(minutes=1)}
+
+
+def parse_date(text):
+    # Accepting YYYY/MM/DD (also with - or .) and DD/MM/YYYY, returning a datetime at midnight
+    parts = _date_separators.split(str(text).strip())
+    if len(parts) == 3 and all(part.isdigit() for part in parts):
+        if len(parts[0]) == 4:
+            year, month, day = parts
+        else:
+            day, month, year = parts
+        if len(year) == 4:
+            try:
+                return datetime(int(year), int(month), int(day))
+            except ValueError:
+                pass
+    raise ValueError(f"Invalid date: {text}. Please use the format YYYY/MM/DD.")
+
+
+def parse_time(text):
+    # Accepting 24 hour times such as 8:00 or 18:30 and 12 hour times such as 8 pm, returning the time of day
+    match = _time_pattern.fullmatch(str(text).strip())
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        half = (match.group(3) or '').lower()
+        if half and 1 <= hour <= 12:
+            hour = hour % 12 + (12 if half == 'p' else 0)
+        elif half:
+            hour = 24
+        if hour < 24 and minute < 60:
+            return timedelta(hours=hour, minutes=minute)
+    raise ValueError(f"Invalid time: {text}. Please use the format HH:MM.")
+
+
+def parse_duration(text):
+    # Accepting durations such as "7 Hours", "90 minutes", "1.5h" or "2 hours 30 minutes", a number alone is hours
+    text = str(text).strip()
+    total = timedelta()
+    position = 0
+    for match in _duration_part.finditer(text):
+        if text[position:match.start()].strip(' ,') not in ('', 'and'):
+            break
+        unit = (match.group(2) or 'h')[0].lower()
+        total += float(match.group(1)) * _duration_units[unit]
+        position = match.end()
+    else:
+        if position and not text[position:].strip() and total > timedelta():
+            return total
+    raise ValueError(f"Invalid duration: {text}. Please enter a duration such as 2 Hours or 90 Minutes.")
+
+
+def event_period(event):
+    # Returning the start and the end of an event, a ValueError if its schedule cannot be read
+    start = event.starts_at
+    return start, start + event.length
+
+
+# Kinds of resources an event books, with the Event attribute holding the IDs of the booked resources
+resource_kinds = (('venue', 'venues'), ('supplier', 'suppliers'), ('guest', 'guests'))
+
+
+class Conflict:
+    """Class to represent two events that book the same venue, supplier or guest at overlapping times"""
+    def __init__(self, kind, resource_id, event_id, other_event_id):
+        # Constructor for Conflict class
+        self.kind = kind
+        self.resource_id = resource_id
+        self.event_id = event_id
+        self.other_event_id = other_event_id
+
+    def __str__(self):
+        return (f"{self.kind.capitalize()} {self.resource_id} is booked by both {self.other_event_id} "
+                f"and {self.event_id} at overlapping times")
+
+
+class ScheduleConflictError(ValueError):
+    """Class to represent a change of an event that would make it overlap with other bookings"""
+    def __init__(self, conflicts):
+        # Constructor for ScheduleConflictError class
+        super().__init__("The event would overlap with other bookings: " + "; ".join(map(str, conflicts)))
+        self.conflicts = conflicts
+
+
+class ScheduleChecker:
+    """Class to keep the bookings of all events, one interval tree of event times per venue, supplier
+    and guest, so the conflicts of an event are found and the event added in O(log n) time per booking."""
+    def __init__(self, kinds=('venue', 'supplier', 'guest')):
+        # Constructor for ScheduleChecker class, kinds limits the resources that are checked
+        self.kinds = [(kind, attribute) for kind, attribute in resource_kinds if kind in kinds]
+        self.trees = {}  # (kind, resource ID) -> IntervalTree of the events booking the resource
+        self.bookings = {}  # event ID -> list of (kind, resource ID) the event is added under
+
+    def _resources(self, event):
+        for kind, attribute in self.kinds:
+            for resource_id in getattr(event, attribute):
+                yield kind, resource_id
+
+    def conflicts(self, event):
+        # Returning the conflicts an event has with the events already added, without adding it
+        start, end = event_period(event)
+        found = []
+        for kind, resource_id in self._resources(event):
+            tree = self.trees.get((kind, resource_id))
+            if tree is None:
+                continue
+            for other_id in tree.overlapping(start, end):
+                if other_id != event.event_id:
+                    found.append(Conflict(kind, resource_id, event.event_id, other_id))
+        return found
+
+    def is_free(self, kind, resource_id, start, end):
+        # Checking that no added event books the resource between start and end
+        tree = self.trees.get((kind, resource_id))
+        return tree is None or not tree.overlapping(start, end)
+
+    def add(self, event):
+        # Adding an event (or replacing its previous bookings) and returning the conflicts it has
+        found = self.conflicts(event)
+        start, end = event_period(event)
+        self.remove(event.event_id)
+        resources = list(self._resources(event))
+        for resource in resources:
+            self.trees.setdefault(resource, IntervalTree()).add(event.event_id, start, end)
+        self.bookings[event.event_id] = resources
+        return found
+
+    def book(self, kind, resource_id, event_id, start, end):
+        # Adding a single booking of a resource, e.g. while venues are being allocated
+        self.trees.setdefault((kind, resource_id), IntervalTree()).add(event_id, start, end)
+        self.bookings.setdefault(event_id, []).append((kind, resource_id))
+
+    def remove(self, event_id):
+        for resource in self.bookings.pop(event_id, ()):
+            tree = self.trees[resource]
+            tree.remove(event_id)
+            if not tree:
+                del self.trees[resource]
+
+
+class CalendarResult:
+    """Class to represent the outcome of checking a whole calendar"""
+    def __init__(self):
+        # Constructor for CalendarResult class
+        self.conflicts = []
+        self.errors = []  # (event ID, error message) for every event whose schedule cannot be read
+
+    def __str__(self):
+        return f"Found {len(self.conflicts)} conflicts, {len(self.errors)} events have an invalid schedule"
+
+
+def check_calendar(events, kinds=('venue', 'supplier', 'guest')):
+    # Finding every conflict between a dictionary of events at once: the bookings of every resource are
+    # sorted by start and swept in order, keeping a heap of the bookings that are still running
+    result = CalendarResult()
+    bookings = {}  # (kind, resource ID) -> list of (start, end, event ID)
+    kinds = [(kind, attribute) for kind, attribute in resource_kinds if kind in kinds]
+    for event_id, event in events.items():
+        try:
+            start, end = event_period(event)
+        except ValueError as e:
+            result.errors.append((event_id, str(e)))
+            continue
+        for kind, attribute in kinds:
+            for resource_id in getattr(event, attribute):
+                bookings.setdefault((kind, resource_id), []).append((start, end, event_id))
+
+    for (kind, resource_id), intervals in bookings.items():
+        if len(intervals) < 2:
+            continue
+        intervals.sort()
+        running = []  # Heap of (end, event ID) of the bookings that have started
+        for start, end, event_id in intervals:
+            while running and running[0][0] <= start:
+                heappop(running)
+            for _, other_id in running:
+                result.conflicts.append(Conflict(kind, resource_id, event_id, other_id))
+            heappush(running, (end, event_id))
+    return result
@@ -0,0 +1,144 @@
+from bisect import bisect_left, insort
+
+
+def normalize(value):
+    # Searches are case insensitive and ignore surrounding spaces
+    return str(value).strip().lower()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FieldIndex:
+    """Class to index the values of one field: a sorted list of terms for prefix search and a
+    trigram index for substring search. A term is the whole value or one of its words."""
+    def __init__(self):
+        # Constructor for FieldIndex class
+        self.terms = []  # Sorted list of distinct terms
+        self.term_ids = {}  # term -> set of record IDs
+        self.value_ids = {}  # whole value -> set of record IDs
+        self.trigram_values = {}  # trigram -> set of whole values containing it
+
+    def add(self, record_id, value, keep_sorted=True):
+        # keep_sorted=False skips updating the sorted terms, sort_terms() must then be called after the last add
+        for term in self._terms_of(value):
+            ids = self.term_ids.get(term)
+            if ids is None:
+                ids = self.term_ids[term] = set()
+                if keep_sorted:
+                    insort(self.terms, term)
+            ids.add(record_id)
+        ids = self.value_ids.get(value)
+        if ids is None:
+            ids = self.value_ids[value] = set()
+            for gram in trigrams(value):
+                self.trigram_values.setdefault(gram, set()).add(value)
+        ids.add(record_id)
+
+    def sort_terms(self):
+        self.terms = sorted(self.term_ids)
+
+    def remove(self, record_id, value):
+        for term in self._terms_of(value):
+            ids = self.term_ids.get(term)
+            if ids is None:
+                continue
+            ids.discard(record_id)
+            if not ids:
+                del self.term_ids[term]
+                del self.terms[bisect_left(self.terms, term)]
+        ids = self.value_ids.get(value)
+        if ids is not None:
+            ids.discard(record_id)
+            if not ids:
+                del self.value_ids[value]
+                for gram in trigrams(value):
+                    values = self.trigram_values[gram]
+                    values.discard(value)
+                    if not values:
+                        del self.trigram_values[gram]
+
+    def prefix(self, text):
+        # Records with a term starting with the text, found with a binary search in the sorted terms
+        results = set()
+        position = bisect_left(self.terms, text)
+        while position < len(self.terms) and self.terms[position].startswith(text):
+            results |= self.term_ids[self.terms[position]]
+            position += 1
+        return results
+
+    def substring(self, text):
+        # Records whose value contains the text. The trigrams of the text narrow down the candidate values,
+        # which are then checked; texts shorter than three characters have to check every distinct value
+        if len(text) < 3:
+            candidates = self.value_ids
+        else:
+            grams = sorted(trigrams(text), key=lambda gram: len(self.trigram_values.get(gram, ())))
+            candidates = set(self.trigram_values.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self.trigram_values.get(gram, set())
+        results = set()
+        for value in candidates:
+            if text in value:
+                results |= self.value_ids[value]
+        return results
+
+    @staticmethod
+    def _terms_of(value):
+        terms = set(value.split())
+        terms.add(value)
+        return terms
+
+
+class SearchIndex:
+    """Class to search the records of a collection by the text of some of their fields.
+    The index is updated incrementally with add/update/remove whenever a record changes."""
+    def __init__(self, fields):
+        # Constructor for SearchIndex class, fields maps a field name to the attribute it indexes
+        self.fields = fields
+        self.field_indexes = {name: FieldIndex() for name in fields}
+        self.indexed_values = {}  # record_id -> {field name: normalized value}, needed to remove old values
+
+    def add(self, record_id, record, keep_sorted=True):
+        values = {}
+        for name, attribute in self.fields.items():
+            value = getattr(record, attribute, None)
+            if value is None:
+                continue
+            values[name] = normalize(value)
+            self.field_indexes[name].add(record_id, values[name], keep_sorted)
+        self.indexed_values[record_id] = values
+
+    def remove(self, record_id):
+        for name, value in self.indexed_values.pop(record_id, {}).items():
+            self.field_indexes[name].remove(record_id, value)
+
+    def update(self, record_id, record):
+        self.remove(record_id)
+        self.add(record_id, record)
+
+    def add_all(self, items):
+        # Adding many (record ID, record) pairs at once, the sorted terms are built with a single sort at the end
+        for record_id, record in items:
+            self.add(record_id, record, keep_sorted=False)
+        for field_index in self.field_indexes.values():
+            field_index.sort_terms()
+
+    def search(self, text, field=None, mode='prefix'):
+        # Returning the set of record IDs matching the text in the given field, or in any indexed field
+        text = normalize(text)
+        if field is not None and field not in self.field_indexes:
+            raise ValueError(f"{field} is not an indexed field")
+        names = [field] if field is not None else list(self.field_indexes)
+        results = set()
+        for name in names:
+            if mode == 'prefix':
+                results |= self.field_indexes[name].prefix(text)
+            elif mode == 'substring':
+                results |= self.field_indexes[name].substring(text)
+            else:
+                raise ValueError(f"Unknown search mode: {mode}")
+        return results
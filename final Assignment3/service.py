@@ -0,0 +1,614 @@
+import copy
+
+import metrics
+import storage
+from classes import Employee, Client, Event, Supplier, Guest, Venue
+from interval_index import CapacityIndex
+from membership_index import MembershipIndex
+from schedule import ScheduleChecker, ScheduleConflictError, check_calendar, parse_date, parse_duration, parse_time
+from search_index import SearchIndex
+
+
+# Collections whose records are members of events, with the name used by the Event add_ and remove_ functions
+member_kinds = {'suppliers': 'supplier', 'venues': 'venue', 'guests': 'guest'}
+
+
+class EntityService:
+    """Class to create, read, update, delete and search the records of one collection.
+    It does not depend on Tkinter, so it can be used by the GUI as well as by scripts and the CLI."""
+    collection = None
+    id_attribute = None
+    # Keyword arguments accepted by update(), mapped to the attribute they change
+    fields = {}
+    # Fields that can be searched by prefix or substring through the search index
+    search_fields = ()
+    # Collections whose records the records of this collection refer to by ID, e.g. the guests of an event
+    member_collections = ()
+
+    def __init__(self, writer=None):
+        # Constructor for EntityService class. The writer saves the changes: the storage module itself,
+        # or an object with the same save functions such as persistence.PersistenceWorker
+        self.writer = writer or storage
+        self.records = None
+        self._index = None
+        self.services = {self.collection: self}  # Set to all services by create_services
+        self._load = {
+            'employees': storage.load_data,
+            'events': storage.load_event_data,
+            'suppliers': storage.load_supplier_data,
+            'guests': storage.load_guest_data,
+            'clients': storage.load_client_data,
+            'venues': storage.load_venue_data,
+        }[self.collection]
+
+    def all(self):
+        # Returning the dictionary of all records, loaded on first use
+        if self.records is None:
+            self.records = self._load()
+        return self.records
+
+    def items(self):
+        # Returning the (ID, record) pairs of all records. A memory mapped collection is gone through without
+        # keeping the records it decodes, so its cache of recently used records is not pushed out
+        records = self.all()
+        return records.items() if type(records) is dict else records.iter_items()
+
+    def reload(self):
+        # Picking up changes made to the files by other programs, this is a dictionary hit if nothing changed
+        records = self._load()
+        if records is not self.records:
+            # The data was read again, so the indexes are rebuilt the next time they are used
+            self._drop_indexes()
+        self.records = records
+        return self.records
+
+    def poll_changes(self):
+        # Picking up the records other programs have added, changed or deleted since the data was read.
+        # Returns them as a list of (action, record ID, record) with the action 'added', 'updated', 'deleted'
+        # or 'reloaded' (the whole collection was read again and is too large to compare)
+        if self.records is None:
+            return []
+        changes = storage.poll_changes(self.collection)
+        if changes is None:
+            # What changed cannot be read from the journal, so the data is read again and compared
+            previous = self.records
+            return diff_records(previous, self.reload())
+        for action, record_id, record in changes:
+            if action == 'deleted':
+                self.records.pop(record_id, None)
+                self._record_deleted(record_id)
+            else:
+                self.records[record_id] = record
+                self._record_saved(record_id, record)
+        return changes
+
+    def index(self):
+        # Returning the search index, built from all records the first time it is needed
+        if self._index is None:
+            self._index = SearchIndex({name: self.fields[name] for name in self.search_fields})
+            self._index.add_all(self.items())
+        return self._index
+
+    # Functions that keep the indexes of the service in step with the records
+    def _record_saved(self, record_id, record):
+        if self._index is not None:
+            self._index.update(record_id, record)
+
+    def _record_deleted(self, record_id):
+        if self._index is not None:
+            self._index.remove(record_id)
+
+    def _drop_indexes(self):
+        self._index = None
+
+    def get(self, record_id):
+        # Returning a single record, or None if the ID does not exist. Before the records are loaded, the
+        # SQLite backend reads only this one
+        if self.records is None and storage.backend == "sqlite":
+            return storage.get_record(self.collection, record_id)
+        return self.records.get(record_id)
+
+    def events(self, record_id):
+        # Returning the events a supplier, venue or guest belongs to
+        if self.collection not in member_kinds:
+            raise ValueError(f"{self.collection.capitalize()} do not belong to events.")
+        return self.services['events'].events_of(self.collection, record_id)
+
+    def create(self, **values):
+        # Validating the values, allocating a new ID and saving the new record
+        self.validate_new(values)
+        record = self.build(storage.allocate_id(self.collection), values)
+        self.save(record)
+        return record
+
+    def save(self, record):
+        # Saving a new or changed record
+        record_id = getattr(record, self.id_attribute)
+        self.all()[record_id] = record
+        self.writer.save_record(self.collection, record_id, record)
+        self._record_saved(record_id, record)
+
+    def save_many(self, records):
+        # Saving a dictionary of new or changed records with a single write
+        self.writer.save_records(self.collection, records)
+        self.all().update(records)
+        for record_id, record in records.items():
+            self._record_saved(record_id, record)
+
+    def update(self, record_id, **values):
+        # Changing the given fields of a record, blank values keep the current value.
+        # Returns the updated record, or None if the ID does not exist
+        record = self.get(record_id)
+        if record is None:
+            return None
+        changes = {}
+        for name, value in values.items():
+            if name not in self.fields:
+                raise ValueError(f"Unknown field: {name}")
+            if value is None or (isinstance(value, str) and not value.strip()):
+                continue
+            changes[self.fields[name]] = self.convert(name, value)
+        self.validate_update(record, changes)
+        for attribute, value in changes.items():
+            setattr(record, attribute, value)
+        self.save(record)
+        return record
+
+    def delete(self, record_id):
+        # Removing a record, returns False if the ID does not exist
+        records = self.all()
+        if record_id not in records:
+            return False
+        del records[record_id]
+        self.writer.delete_record(self.collection, record_id)
+        self._record_deleted(record_id)
+        if self.collection in member_kinds and 'events' in self.services:
+            # Events refer to suppliers, venues and guests by ID, so the deleted record is removed from them
+            self.services['events'].detach(self.collection, record_id)
+        return True
+
+    def find(self, text, field=None, mode='prefix'):
+        # Returning the records with a field (or the given field) starting with the text, or containing it
+        # when mode is 'substring'. Prefixes match the start of the whole value or of any word in it.
+        # Mode 'exact' returns the records whose given field equals the text
+        if mode == 'exact':
+            return self.find_exact(field, text)
+        records = self.all()
+        ids = self.index().search(text, field, mode)
+        return [records[record_id] for record_id in ids if record_id in records]
+
+    def find_exact(self, field, value):
+        # Returning the records whose field equals the value. Before the records are loaded, a field with a
+        # database index (SQLite backend) is looked up without reading the other records
+        if field not in self.fields:
+            raise ValueError(f"Unknown field: {field}")
+        value = self.convert(field, value)
+        if self.records is None:
+            records = storage.find_records(self.collection, field, value)
+            if records is not None:
+                return list(records.values())
+        attribute = self.fields[field]
+        return [record for _, record in self.items() if getattr(record, attribute, None) == value]
+
+    def search(self, **criteria):
+        # Returning the records whose fields contain all of the given values (case insensitive).
+        # Indexed fields are looked up in the search index, other fields are checked one record at a time
+        records = self.all()
+        ids = None
+        others = {}
+        for name, value in criteria.items():
+            if name in self.search_fields:
+                matches = self.index().search(value, name, 'substring')
+                ids = matches if ids is None else ids & matches
+            else:
+                others[name] = value
+        candidates = records.values() if ids is None else [records[i] for i in ids if i in records]
+        results = []
+        for record in candidates:
+            for name, value in others.items():
+                attribute = self.fields.get(name, name)
+                if str(value).lower() not in str(getattr(record, attribute, '')).lower():
+                    break
+            else:
+                results.append(record)
+        return results
+
+    def convert(self, name, value):
+        # Converting a field value to the type stored in the record
+        return value.strip() if isinstance(value, str) else value
+
+    def validate_new(self, values):
+        pass
+
+    def validate_update(self, record, changes):
+        # Checking the changed attributes of a record together, before any of them is set
+        pass
+
+    def build(self, record_id, values):
+        raise NotImplementedError
+
+
+def _check_capacity(min_guests, max_guests):
+    # A venue that is left out of the capacity index could never be found or allocated, so its range is
+    # checked when it is created or changed
+    if int(min_guests) < 0 or int(max_guests) < 0:
+        raise ValueError("The number of guests cannot be negative.")
+    if int(min_guests) > int(max_guests):
+        raise ValueError("Minimum guests cannot be more than maximum guests.")
+
+
+def _require(values, names, message="All fields must be completed."):
+    # Raising a ValueError if any of the given values is missing or blank
+    for name in names:
+        value = values.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            raise ValueError(message)
+
+
+class EmployeeService(EntityService):
+    collection = 'employees'
+    id_attribute = 'employeeID'
+    fields = {'firstName': '_firstName', 'lastName': '_lastName', 'gender': '_gender',
+              'phoneNumber': '_phoneNumber', 'department': 'department', 'jobTitle': 'jobTitle', 'salary': 'salary'}
+    search_fields = ('firstName', 'lastName', 'phoneNumber', 'department', 'jobTitle')
+
+    def convert(self, name, value):
+        if name == 'salary':
+            try:
+                return float(value)
+            except ValueError:
+                raise ValueError("Invalid salary input. Salary must be a numeric value.")
+        return super().convert(name, value)
+
+    def validate_new(self, values):
+        _require(values, self.fields, "All fields must be filled out.")
+        values['salary'] = self.convert('salary', values['salary'])
+
+    def build(self, record_id, values):
+        return Employee(values['firstName'], values['lastName'], values['gender'], values['phoneNumber'],
+                        record_id, values['department'], values['jobTitle'], values['salary'])
+
+
+class EventService(EntityService):
+    collection = 'events'
+    id_attribute = 'event_id'
+    fields = {'event_type': 'event_type', 'date': 'date', 'time': 'time', 'duration': 'duration'}
+    search_fields = ('event_type', 'date')
+    # The guests come before the venues, a venue is checked against the number of guests when it is added
+    member_collections = ('guests', 'suppliers', 'venues')
+
+    def __init__(self, writer=None):
+        # Constructor for EventService class
+        super().__init__(writer)
+        self._schedule = None
+        self._members = None
+
+    def convert(self, name, value):
+        # The date and time are stored in one format (2024/04/23 and 8:00), the duration as it was entered
+        value = super().convert(name, value)
+        if name == 'date':
+            return parse_date(value).strftime('%Y/%m/%d')
+        if name == 'time':
+            minutes = int(parse_time(value).total_seconds()) // 60
+            return f"{minutes // 60}:{minutes % 60:02d}"
+        if name == 'duration':
+            parse_duration(value)
+        return value
+
+    def validate_new(self, values):
+        _require(values, self.fields)
+        for name in self.fields:
+            values[name] = self.convert(name, values[name])
+
+    def validate_update(self, record, changes):
+        # A new date, time or duration must not make the event overlap with another event booking the same
+        # venue, supplier or guest; the conflicts are raised as a ScheduleConflictError
+        if not {'date', 'time', 'duration'} & set(changes):
+            return
+        moved = copy.copy(record)
+        for attribute, value in changes.items():
+            setattr(moved, attribute, value)
+        found = self.conflicts(moved)
+        if found:
+            raise ScheduleConflictError(found)
+
+    def schedule(self):
+        # Returning the bookings of all events, built the first time they are needed.
+        # Events whose date, time or duration cannot be read are left out
+        if self._schedule is None:
+            self._schedule = ScheduleChecker()
+            for _, event in self.items():
+                self._add_to_schedule(event)
+        return self._schedule
+
+    def _add_to_schedule(self, event):
+        try:
+            self._schedule.add(event)
+        except ValueError:
+            self._schedule.remove(event.event_id)
+
+    def _record_saved(self, record_id, record):
+        super()._record_saved(record_id, record)
+        if self._schedule is not None:
+            self._add_to_schedule(record)
+        if self._members is not None:
+            self._members.add(record)
+
+    def _record_deleted(self, record_id):
+        super()._record_deleted(record_id)
+        if self._schedule is not None:
+            self._schedule.remove(record_id)
+        if self._members is not None:
+            self._members.remove(record_id)
+
+    def _drop_indexes(self):
+        super()._drop_indexes()
+        self._schedule = None
+        self._members = None
+
+    def members(self):
+        # Returning the reverse index of suppliers, venues and guests to their events, built the first time
+        # it is needed
+        if self._members is None:
+            self._members = MembershipIndex()
+            self._members.add_all(self.items())
+        return self._members
+
+    def events_of(self, collection, member_id):
+        # Returning the events a supplier, venue or guest belongs to, found in the reverse index
+        event_ids = self.members().events_with(member_kinds[collection], member_id)
+        return [self.get(event_id) for event_id in sorted(event_ids)]
+
+    def members_of(self, event, collection):
+        # Returning the records of a collection ('suppliers', 'venues' or 'guests') an event refers to,
+        # IDs that are no longer in the registry are left out
+        records = self.services[collection].all()
+        return [records[member_id] for member_id in getattr(event, collection) if member_id in records]
+
+    def add_member(self, event_id, collection, member_id):
+        # Adding a supplier, venue or guest of its registry to an event. A venue must be big enough for the
+        # guests of the event. The booking is saved even if the member is already booked by another event at
+        # the same time; these conflicts are returned (an empty list if there are none), None if the event
+        # does not exist
+        event = self.get(event_id)
+        if event is None:
+            return None
+        record = self.services[collection].get(member_id)
+        if record is None:
+            raise ValueError(f"{member_kinds[collection].capitalize()} {member_id} does not exist.")
+        if collection == 'guests' and member_id not in event.guests:
+            self._check_venues_hold(event, len(event.guests) + 1)
+        getattr(event, 'add_' + member_kinds[collection])(record)
+        try:
+            found = [conflict for conflict in self.conflicts(event) if conflict.resource_id == member_id]
+        except ValueError:
+            # The schedule of the event cannot be read, so it cannot overlap with anything
+            found = []
+        self.save(event)
+        return found
+
+    def _check_venues_hold(self, event, guest_count):
+        # Every venue of the event must hold its guests (Event.add_venue checks this when a venue is added).
+        # min_guests is not checked: guests are invited one by one, so an event is below it while it fills up
+        venues = self.services['venues'].all()
+        for venue_id in event.venues:
+            venue = venues.get(venue_id)
+            if venue is not None and guest_count > int(venue.max_guests):
+                raise ValueError(f"Venue {venue_id} holds at most {venue.max_guests} guests, "
+                                 f"event {event.event_id} would have {guest_count}.")
+
+    def remove_member(self, event_id, collection, member_id):
+        # Removing a supplier, venue or guest from an event, returns False if the event does not have it
+        event = self.get(event_id)
+        if event is None or member_id not in getattr(event, collection):
+            return False
+        getattr(event, 'remove_' + member_kinds[collection])(member_id)
+        self.save(event)
+        return True
+
+    def detach(self, collection, member_id):
+        # Removing a deleted supplier, venue or guest from the events it belongs to. Only these events are
+        # looked at and they are saved with a single write. Returns the IDs of the changed events
+        event_ids = self.members().events_with(member_kinds[collection], member_id)
+        changed = {}
+        for event_id in event_ids:
+            event = self.get(event_id)
+            getattr(event, 'remove_' + member_kinds[collection])(member_id)
+            changed[event_id] = event
+        if changed:
+            self.save_many(changed)
+        return list(changed)
+
+    def conflicts(self, event):
+        # Returning the other events that book one of the venues, suppliers or guests of the event at the same time
+        return self.schedule().conflicts(event)
+
+    @metrics.timed("service.events.check_calendar")
+    def check_calendar(self):
+        # Checking all events at once, e.g. when a season is planned
+        return check_calendar(self.all())
+
+    def build(self, record_id, values):
+        return Event(record_id, values['event_type'], values['date'], values['time'], values['duration'])
+
+
+class SupplierService(EntityService):
+    collection = 'suppliers'
+    id_attribute = 'supplier_id'
+    fields = {'name': 'name', 'service_type': 'service_type'}
+    search_fields = ('name', 'service_type')
+
+    def validate_new(self, values):
+        _require(values, self.fields)
+        for name in self.fields:
+            values[name] = self.convert(name, values[name])
+        if values['service_type'] == 'Select Service Type':
+            raise ValueError("Please select a valid service type.")
+
+    def build(self, record_id, values):
+        return Supplier(record_id, values['name'], values['service_type'])
+
+
+class GuestService(EntityService):
+    collection = 'guests'
+    id_attribute = 'guestID'
+    fields = {'firstName': '_firstName', 'lastName': '_lastName', 'gender': '_gender', 'phoneNumber': '_phoneNumber'}
+    search_fields = ('firstName', 'lastName', 'phoneNumber')
+
+    def validate_new(self, values):
+        _require(values, self.fields)
+        for name in self.fields:
+            values[name] = self.convert(name, values[name])
+
+    def build(self, record_id, values):
+        return Guest(values['firstName'], values['lastName'], values['gender'], values['phoneNumber'], record_id)
+
+
+class ClientService(EntityService):
+    collection = 'clients'
+    id_attribute = 'clientID'
+    fields = {'firstName': '_firstName', 'lastName': '_lastName', 'gender': '_gender', 'phoneNumber': '_phoneNumber',
+              'budget': 'budget', 'numOf_events': 'numOf_events'}
+    search_fields = ('firstName', 'lastName', 'phoneNumber')
+
+    def convert(self, name, value):
+        if name == 'budget':
+            try:
+                return float(value)
+            except ValueError:
+                raise ValueError("Invalid budget input. Budget must be a number.")
+        if name == 'numOf_events':
+            try:
+                return int(value)
+            except ValueError:
+                raise ValueError("Invalid input. Number of events must be an integer.")
+        return super().convert(name, value)
+
+    def validate_new(self, values):
+        # A blank budget or number of events counts as 0, which is then rejected like any other missing field
+        for name in ('budget', 'numOf_events'):
+            value = values.get(name)
+            values[name] = self.convert(name, value) if value is not None and str(value).strip() else 0
+        if not all(values.get(name) for name in self.fields):
+            raise ValueError("All fields must be filled.")
+
+    def build(self, record_id, values):
+        return Client(values['firstName'], values['lastName'], values['gender'], values['phoneNumber'],
+                      record_id, values['budget'], values['numOf_events'])
+
+
+class VenueService(EntityService):
+    collection = 'venues'
+    id_attribute = 'venue_id'
+    fields = {'address': 'address', 'min_guests': 'min_guests', 'max_guests': 'max_guests'}
+    search_fields = ('address',)
+
+    def __init__(self, writer=None):
+        # Constructor for VenueService class
+        super().__init__(writer)
+        self._capacity = None
+
+    def capacity_index(self):
+        # Returning the index of the guest capacities (min_guests to max_guests) of the venues,
+        # built from all venues the first time it is needed
+        if self._capacity is None:
+            self._capacity = CapacityIndex()
+            for venue_id, venue in self.all().items():
+                self._add_capacity(venue_id, venue)
+        return self._capacity
+
+    def _add_capacity(self, venue_id, venue):
+        # Venues whose capacity is not a valid range of numbers cannot be matched and are left out
+        try:
+            self._capacity.add(venue_id, int(venue.min_guests), int(venue.max_guests))
+        except (TypeError, ValueError):
+            self._capacity.remove(venue_id)
+
+    def _record_saved(self, record_id, record):
+        super()._record_saved(record_id, record)
+        if self._capacity is not None:
+            self._add_capacity(record_id, record)
+
+    def _record_deleted(self, record_id):
+        super()._record_deleted(record_id)
+        if self._capacity is not None:
+            self._capacity.remove(record_id)
+
+    def _drop_indexes(self):
+        super()._drop_indexes()
+        self._capacity = None
+
+    def venues_for(self, guest_count):
+        # Yielding the venues that can hold the given number of guests, the smallest fitting venue first.
+        # Each next venue is found in logarithmic time, so taking only the first few is cheap
+        records = self.all()
+        for venue_id in self.capacity_index().containing(guest_count):
+            if venue_id in records:
+                yield records[venue_id]
+
+    def convert(self, name, value):
+        if name in ('min_guests', 'max_guests'):
+            try:
+                return int(value)
+            except ValueError:
+                label = "Minimum" if name == 'min_guests' else "Maximum"
+                raise ValueError(f"{label} guests must be a number.")
+        return super().convert(name, value)
+
+    def validate_new(self, values):
+        values['min_guests'] = self.convert('min_guests', values.get('min_guests', ''))
+        values['max_guests'] = self.convert('max_guests', values.get('max_guests', ''))
+        if not values.get('address'):
+            raise ValueError("Address cannot be empty.")
+        _check_capacity(values['min_guests'], values['max_guests'])
+
+    def validate_update(self, record, changes):
+        _check_capacity(changes.get('min_guests', record.min_guests), changes.get('max_guests', record.max_guests))
+
+    def build(self, record_id, values):
+        return Venue(record_id, values['address'], values['min_guests'], values['max_guests'])
+
+
+# A function that compares two versions of a collection and returns the changes between them, the same
+# way as EntityService.poll_changes
+def diff_records(previous, current):
+    if previous is current:
+        return []
+    if type(previous) is not dict or type(current) is not dict:
+        return [('reloaded', None, None)]
+    changes = [('deleted', record_id, None) for record_id in previous if record_id not in current]
+    for record_id, record in current.items():
+        old = previous.get(record_id)
+        if old is None:
+            changes.append(('added', record_id, record))
+        elif old is not record and old.__getstate__() != record.__getstate__():
+            changes.append(('updated', record_id, record))
+    return changes
+
+
+# A function that returns the readable details of any record
+def describe(record):
+    if hasattr(record, 'display_details'):
+        return record.display_details()
+    if hasattr(record, 'get_details'):
+        return record.get_details()
+    return str(record)
+
+
+# Timing the operations of every service when the instrumentation is switched on (see metrics.py), e.g.
+# service.guests.create. Subclasses that override an operation still get their own timer
+for _service_class in (EmployeeService, EventService, SupplierService, GuestService, ClientService, VenueService):
+    for _operation in ('create', 'update', 'delete', 'find', 'search'):
+        setattr(_service_class, _operation, metrics.timed(f"service.{_service_class.collection}.{_operation}")(
+            getattr(_service_class, _operation)))
+
+
+# A function that creates one service per collection, keyed by collection name
+def create_services(writer=None):
+    services = {service.collection: service for service in (
+        EmployeeService(writer), EventService(writer), SupplierService(writer), GuestService(writer),
+        ClientService(writer), VenueService(writer))}
+    # Every service can reach the others, e.g. the event service looks suppliers up in the supplier registry
+    for service in services.values():
+        service.services = services
+    return services
@@ -0,0 +1,167 @@
+import pickle
+import sqlite3
+import threading
+
+# Primary key column of every table, named after the ID attribute of the stored class
+primary_keys = {
+    'employees': 'employeeID',
+    'events': 'event_id',
+    'suppliers': 'supplier_id',
+    'guests': 'guestID',
+    'clients': 'clientID',
+    'venues': 'venue_id',
+}
+
+# Secondary indexed columns of every table, mapped to the attribute they are copied from
+secondary_indexes = {
+    'employees': {'department': 'department', 'jobTitle': 'jobTitle'},
+    'events': {'date': 'date', 'event_type': 'event_type'},
+    'suppliers': {'service_type': 'service_type'},
+    'guests': {'lastName': '_lastName'},
+    'clients': {'lastName': '_lastName'},
+    'venues': {'max_guests': 'max_guests'},
+}
+
+
+class SQLiteStore:
+    """Class to store all six collections in a single local SQLite database file"""
+    def __init__(self, path):
+        # Constructor for SQLiteStore class
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        # Creating one table per collection with its primary key and secondary indexes
+        with self._lock, self._connection:
+            for collection, key in primary_keys.items():
+                columns = ''.join(f", {column}" for column in secondary_indexes[collection])
+                self._connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {collection} ({key} TEXT PRIMARY KEY{columns}, record BLOB NOT NULL)")
+                for column in secondary_indexes[collection]:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {collection}_{column} ON {collection} ({column})")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS counters (collection TEXT PRIMARY KEY, next_number INTEGER NOT NULL)")
+
+    def _row(self, collection, key, record):
+        # Building the column values of a record, the record itself is stored pickled
+        values = [key]
+        for attribute in secondary_indexes[collection].values():
+            values.append(getattr(record, attribute, None))
+        values.append(pickle.dumps(record))
+        return values
+
+    def _upsert_sql(self, collection):
+        key = primary_keys[collection]
+        columns = [key] + list(secondary_indexes[collection]) + ['record']
+        updates = ', '.join(f"{column}=excluded.{column}" for column in columns[1:])
+        placeholders = ', '.join('?' for _ in columns)
+        return (f"INSERT INTO {collection} ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT({key}) DO UPDATE SET {updates}")
+
+    def load_collection(self, collection):
+        # Loading every record of a collection into a dictionary, in insertion order
+        return dict(self.iter_records(collection))
+
+    def iter_records(self, collection, batch_size=1000):
+        # Yielding (ID, record) pairs batch by batch without building the whole dictionary
+        key = primary_keys[collection]
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT rowid, {key}, record FROM {collection} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            for rowid, record_id, blob in rows:
+                yield record_id, pickle.loads(blob)
+            last_rowid = rows[-1][0]
+
+    def save_collection(self, collection, data):
+        # Replacing the whole collection with the given dictionary in a single transaction
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {collection}")
+            self._connection.executemany(self._upsert_sql(collection),
+                                         (self._row(collection, key, record) for key, record in data.items()))
+
+    def save_record(self, collection, key, record):
+        # Inserting or updating a single record
+        with self._lock, self._connection:
+            self._connection.execute(self._upsert_sql(collection), self._row(collection, key, record))
+
+    def save_records(self, collection, records):
+        # Inserting or updating many records in a single transaction
+        with self._lock, self._connection:
+            self._connection.executemany(self._upsert_sql(collection),
+                                         (self._row(collection, key, record) for key, record in records.items()))
+
+    def apply_changes(self, collection, changes):
+        # Applying a list of ('put', key, record) and ('delete', key, None) changes in a single transaction
+        upsert = self._upsert_sql(collection)
+        delete = f"DELETE FROM {collection} WHERE {primary_keys[collection]} = ?"
+        with self._lock, self._connection:
+            for action, key, record in changes:
+                if action == 'put':
+                    self._connection.execute(upsert, self._row(collection, key, record))
+                else:
+                    self._connection.execute(delete, (key,))
+
+    def delete_record(self, collection, key):
+        # Deleting a single record
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {collection} WHERE {primary_keys[collection]} = ?", (key,))
+
+    def get_record(self, collection, key):
+        # Returning a single record by its ID, or None if it does not exist
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT record FROM {collection} WHERE {primary_keys[collection]} = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def find_records(self, collection, column, value):
+        # Returning the records whose indexed column equals the given value
+        if column not in secondary_indexes[collection]:
+            raise ValueError(f"{column} is not an indexed column of {collection}")
+        key = primary_keys[collection]
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {key}, record FROM {collection} WHERE {column} = ? ORDER BY rowid", (value,)).fetchall()
+        return {record_id: pickle.loads(blob) for record_id, blob in rows}
+
+    def keys(self, collection):
+        # Returning the IDs of all records without reading the records themselves
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {primary_keys[collection]} FROM {collection} ORDER BY rowid").fetchall()
+        return [row[0] for row in rows]
+
+    def get_counter(self, collection):
+        # Returning the next number of the ID sequence of a collection, or None if it was never stored
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT next_number FROM counters WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else None
+
+    def set_counter(self, collection, next_number):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO counters (collection, next_number) VALUES (?, ?) "
+                "ON CONFLICT(collection) DO UPDATE SET next_number=excluded.next_number", (collection, next_number))
+
+    def data_version(self):
+        # Number that changes whenever another connection commits to the database
+        with self._lock:
+            return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def count(self, collection):
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {collection}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
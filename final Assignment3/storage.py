@@ -1,26 +1,1105 @@
-from tkinter import messagebox
 import pickle
 import os
+import shutil
+import struct
+import threading
+import zlib
+import classes
+import metrics
+import record_format
+from record_format import FormatError
+from sqlite_storage import SQLiteStore, secondary_indexes
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Defining the path where data files will be stored
 data_path = "data"
 if not os.path.exists(data_path):
     os.makedirs(data_path)
 
+# Functions used to report problems to the user. They only print by default so that this module works
+# without a display; the GUI replaces them with message boxes
+error_handler = print
+info_handler = print
+
+# Storage backend used by all load/save functions: "columnar" for the versioned binary .emr files
+# (see record_format.py), "pickle" for the .pkl files or "sqlite" for a single indexed database file
+# (data/management.db). The columnar backend converts a collection that only exists as .pkl files the
+# first time it is loaded
+backend = "columnar"
+sqlite_file = 'management.db'
+_sqlite_store = None
+
+# Snapshot files start with a header holding these magic bytes, the length of the pickled data and its
+# CRC-32 checksum, so a file cut short by a crash is detected instead of being read as an empty dataset.
+# Files written before the header was added are plain pickles and are still read
+snapshot_magic = b'EMSNAP1\n'
+_header_format = '>QI'
+_header_size = len(snapshot_magic) + struct.calcsize(_header_format)
+# Number of previous snapshots kept next to every snapshot file, e.g. employees.pkl.1 (the newest) to employees.pkl.3
+snapshot_retention = 3
+
+# Collections whose snapshot is memory mapped instead of loaded when it is at least mapped_threshold bytes
+# (columnar backend only). Records are then decoded when they are used and at most mapped_cache_size
+# of them stay in memory, so a very large dataset does not have to fit in memory as Python objects
+mapped_collections = {'guests', 'events'}
+mapped_threshold = 64 * 1024 * 1024
+mapped_cache_size = 10000
+
+# Journal mode: single record changes are appended to a small journal file next to the snapshot
+# (e.g. employees.emr.journal) instead of rewriting the whole snapshot on every change
+journal_mode = True
+# Number of journal entries after which a background thread folds the journal into the snapshot
+compaction_threshold = 1000
+
+# Mapping of collection names to their snapshot files
+collection_files = {
+    'employees': 'employees.pkl',
+    'events': 'events.pkl',
+    'suppliers': 'suppliers.pkl',
+    'guests': 'guests.pkl',
+    'clients': 'clients.pkl',
+    'venues': 'venues.pkl',
+}
+
+# Mapping of collection names to their files when the columnar backend is used
+columnar_files = {
+    'employees': 'employees.emr',
+    'events': 'events.emr',
+    'suppliers': 'suppliers.emr',
+    'guests': 'guests.emr',
+    'clients': 'clients.emr',
+    'venues': 'venues.emr',
+}
+
+# Prefix of the IDs of every collection, e.g. EP12 or G7
+id_prefixes = {
+    'employees': 'EP',
+    'events': 'EV',
+    'suppliers': 'SP',
+    'guests': 'G',
+    'clients': 'C',
+    'venues': 'V',
+}
+
+# File holding the next number of every ID sequence
+counters_file = 'counters.pkl'
+_counters_lock = threading.Lock()
+
+_journal_locks = {name: threading.Lock() for name in collection_files}
+_compaction_locks = {name: threading.Lock() for name in collection_files}
+_journal_counts = {name: 0 for name in collection_files}
+
+# In-process cache of loaded collections: collection name -> (file signature, data dictionary).
+# A cached dictionary is returned as long as the files it was read from have not changed on disk
+_cache = {}
+
+# Journal entries this program appended to a collection while its cache was out of date, as collection ->
+# (cached file signature, list of (start, end) offsets in the journal). They are already part of the cached
+# data and must not be taken for changes made by another program
+_own_entries = {}
+
+# Offset up to which the journal of a collection is known to hold only complete entries, as collection ->
+# (snapshot signature, journal inode, offset). Before appending, only the bytes after it have to be checked
+_complete_journal_ends = {}
+
+# Collections already checked for .pkl files that have to be converted to the columnar format
+_checked_for_pickles = set()
+# Reentrant: converting the events can write records of the guests, which converts the guests first
+_conversion_lock = threading.RLock()
+
+# IDs of the suppliers, venues and guests this program has moved from events saved in the old format (which
+# held copies of them) into their registries, per collection, see _move_legacy_members
+migrated_members = {}
+
+
+class CorruptSnapshotError(ValueError):
+    """Class to represent a snapshot file that is truncated or does not match its checksum"""
+
+
+class StaleDataError(ValueError):
+    """Class to represent a whole collection save based on data that another program has changed in a way
+    that cannot be merged (e.g. it rewrote the snapshot). The data has to be loaded again before saving"""
+
+
+class FileLock:
+    """Class to lock a file between processes, so that programs sharing the data directory take turns
+    changing a collection. Every collection has its own lock files, so writers of different collections
+    never wait for each other. A shared lock lets several readers in at once (exclusive on Windows)"""
+    def __init__(self, path, shared=False):
+        # Constructor for FileLock class
+        self.path = path
+        self.shared = shared
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+# Functions returning the locks of a collection: the write lock is held while its files are changed (e.g. a
+# journal entry is appended), the compaction lock while its snapshot is rewritten and while it is read
+def _write_lock(collection):
+    return FileLock(os.path.join(data_path, f"{collection}.write.lock"))
+
+
+def _compaction_lock(collection, shared=False):
+    return FileLock(os.path.join(data_path, f"{collection}.compact.lock"), shared)
+
+
+def get_sqlite_store():
+    # Opening the SQLite database the first time it is needed
+    global _sqlite_store
+    if _sqlite_store is None:
+        _sqlite_store = SQLiteStore(os.path.join(data_path, sqlite_file))
+    return _sqlite_store
+
+
+def use_backend(name):
+    # Switching the storage backend, e.g. use_backend("sqlite")
+    global backend
+    if name not in ("columnar", "pickle", "sqlite"):
+        raise ValueError(f"Unknown storage backend: {name}")
+    backend = name
+    invalidate_cache()
+    _checked_for_pickles.clear()
+
+
+def use_backend_from_environment():
+    # Switching to the backend named in the EMS_BACKEND environment variable, e.g. EMS_BACKEND=sqlite python GUI.py
+    name = os.environ.get('EMS_BACKEND', '').strip()
+    if name:
+        use_backend(name)
+
+
+def copy_to_backend(target):
+    # Copying every collection and the ID counters of the current backend to another backend, e.g.
+    # copy_to_backend("sqlite") before use_backend("sqlite"). The data of the current backend is kept.
+    # Returns the names of the copied collections
+    source = backend
+    if target == source:
+        raise ValueError(f"The data already uses the {target} backend")
+    datasets = {}
+    for collection in collection_files:
+        try:
+            data = dict(iter_records(collection))
+        except FileNotFoundError:
+            continue
+        if data:
+            datasets[collection] = data
+    with _counters_lock, FileLock(os.path.join(data_path, 'counters.lock')):
+        if source == "sqlite":
+            counters = {collection: get_sqlite_store().get_counter(collection) for collection in collection_files}
+        else:
+            try:
+                counters = _read_counters()
+            except FileNotFoundError:
+                counters = {}
+            except Exception as e:
+                print("The ID counters file could not be read, they are rebuilt from the data:", e)
+                counters = {}
+    use_backend(target)
+    try:
+        for collection, data in datasets.items():
+            _save_collection(collection, data)
+        with _counters_lock, FileLock(os.path.join(data_path, 'counters.lock')):
+            counters = {collection: number for collection, number in counters.items() if isinstance(number, int)}
+            if target == "sqlite":
+                for collection, number in counters.items():
+                    get_sqlite_store().set_counter(collection, number)
+            elif counters:
+                _write_counters(counters)
+    finally:
+        use_backend(source)
+    return list(datasets)
+
+
+def find_records(collection, column, value):
+    # Returning the records whose indexed column equals the value by reading only the matching rows, or None
+    # if the backend has no index on the column (the caller then looks through the loaded records)
+    if backend != "sqlite" or column not in secondary_indexes[collection]:
+        return None
+    return get_sqlite_store().find_records(collection, column, value)
+
+
+def get_record(collection, key):
+    # Returning a single record, or None if the ID does not exist. SQLite reads only its row, the other
+    # backends load the collection
+    if backend == "sqlite":
+        return get_sqlite_store().get_record(collection, key)
+    try:
+        return _load_collection(collection).get(key)
+    except FileNotFoundError:
+        return None
+
+
+def convert_pickles_to_columnar(overwrite=False):
+    # Converting every collection that exists as .pkl files to the columnar format, the .pkl files are kept.
+    # Collections that already have a columnar file are skipped unless overwrite is True
+    converted = []
+    for collection in collection_files:
+        if not _has_pickle_files(collection):
+            continue
+        if not overwrite and _has_columnar_files(collection):
+            continue
+        data = _read_pickle_files(collection)
+        previous_backend = backend
+        use_backend("columnar")
+        try:
+            if collection == 'events':
+                _move_legacy_members(data)
+            _save_collection(collection, data)
+        finally:
+            use_backend(previous_backend)
+        converted.append(collection)
+    return converted
+
+
+def _has_pickle_files(collection):
+    path = os.path.join(data_path, collection_files[collection])
+    return any(os.path.exists(path + suffix) for suffix in ('', '.journal', '.journal.old'))
+
+
+def _has_columnar_files(collection):
+    path = os.path.join(data_path, columnar_files[collection])
+    return any(os.path.exists(path + suffix) for suffix in ('', '.journal', '.journal.old'))
+
+
+def _read_pickle_files(collection):
+    # Reading a collection from the .pkl snapshot (or the newest intact retained one) and journals of the pickle backend
+    path = os.path.join(data_path, collection_files[collection])
+    data = {}
+    for snapshot in [path] + [f"{path}.{number}" for number in range(1, snapshot_retention + 1)]:
+        try:
+            data = _read_checked(snapshot)
+            break
+        except FileNotFoundError:
+            if snapshot == path:
+                break
+        except CorruptSnapshotError as e:
+            print(e)
+    _replay_journal(path + '.journal.old', data, columnar=False)
+    _replay_journal(path + '.journal', data, columnar=False)
+    return data
+
+
+def _legacy_members(events):
+    # Returning the suppliers, venues and guests that events saved in the old format held copies of, as
+    # collection -> {ID: record}. Decoding such events replaces the copies by IDs and collects them in
+    # classes.legacy_records (see Event.__setstate__); only the copies the events still refer to are returned,
+    # so a member removed by a journal entry replayed after the snapshot is not brought back.
+    # classes.legacy_records is emptied
+    if not any(classes.legacy_records.values()):
+        return {}
+    items = events.items() if type(events) is dict else events.iter_items()
+    referenced = {collection: set() for collection in classes.legacy_records}
+    for _, event in items:
+        for collection, member_ids in referenced.items():
+            member_ids.update(getattr(event, collection, ()))
+    members = {}
+    for collection, legacy in classes.legacy_records.items():
+        records = {record_id: record for record_id, record in legacy.items() if record_id in referenced[collection]}
+        legacy.clear()
+        if records:
+            members[collection] = records
+    return members
+
+
+def _move_legacy_members(events):
+    # Adding the members old events held copies of to their registries where they are missing. Called
+    # whenever events were decoded and before they are written again, as the copies are lost once the events
+    # are saved in the new format. Returns True if the events held copies, they should then be rewritten
+    members = _legacy_members(events)
+    for collection, records in members.items():
+        try:
+            existing = set(record_keys(collection))
+        except FileNotFoundError:
+            existing = set()
+        missing = [('put', record_id, record) for record_id, record in records.items() if record_id not in existing]
+        if missing:
+            apply_changes(collection, missing)
+            migrated_members.setdefault(collection, []).extend(record_id for _, record_id, _ in missing)
+            print(f"Moved {len(missing)} {collection} stored inside events to their own file")
+    return bool(members)
+
+
+def _snapshot_path(collection):
+    if backend == "columnar":
+        return os.path.join(data_path, columnar_files[collection])
+    return os.path.join(data_path, collection_files[collection])
+
+
+def _journal_path(collection):
+    return _snapshot_path(collection) + '.journal'
+
+
+def _replay_journal(path, data, columnar=None):
+    # Applying every complete change record in the journal file to the data dictionary. Returns the number of
+    # records applied and the offset where the last of them ends
+    if columnar is None:
+        columnar = backend == "columnar"
+    count = end = 0
+    try:
+        with open(path, 'rb') as journalf:
+            for (action, key, record), end in _journal_entries(journalf, columnar):
+                if action == 'put':
+                    data[key] = record
+                elif action == 'delete':
+                    data.pop(key, None)
+                count += 1
+            complete = end == os.fstat(journalf.fileno()).st_size
+    except FileNotFoundError:
+        return 0, 0
+    if not complete:
+        # A partially written record at the end of the journal (e.g. after a crash) is ignored. It is cut off
+        # before the next change is appended, see _cut_incomplete_entry
+        print(f"Ignoring incomplete record at the end of {path}")
+    return count, end
+
+
+def _journal_entries(journalf, columnar):
+    # Yielding ((action, key, record), end offset) for the entries of an open journal from its current position.
+    # Reading stops at the first entry that cannot be decoded, whatever the error: the bytes of an entry cut
+    # short by a crash can make the decoder fail in many ways
+    entries = _columnar_entries(journalf) if columnar else _pickle_entries(journalf)
+    while True:
+        try:
+            action, key, record = next(entries)
+        except Exception:
+            return
+        yield (action, key, record), journalf.tell()
+
+
+def _pickle_entries(journalf):
+    while True:
+        try:
+            yield pickle.load(journalf)
+        except EOFError:
+            return
+
+
+def _columnar_entries(journalf):
+    return record_format.iter_entries(journalf)
+
+
+def _encode_journal_entry(change):
+    if backend == "columnar":
+        return record_format.encode_entry(list(change))
+    return pickle.dumps(change)
+
+
+def _backup_path(collection, number):
+    return f"{_snapshot_path(collection)}.{number}"
+
+
+# A function that writes data to a temporary file next to path, with the checksum header, and forces it to disk.
+# The temporary file only replaces path afterwards, so a crash leaves either the old or the new file complete
+def _write_temp_file(path, data):
+    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as dumpf:
+        dumpf.write(snapshot_magic + struct.pack(_header_format, len(payload), zlib.crc32(payload)))
+        dumpf.write(payload)
+        dumpf.flush()
+        os.fsync(dumpf.fileno())
+    return temp_path
+
+
+def _replace_file(temp_path, path):
+    os.replace(temp_path, path)
+    # Making the rename itself durable; directories cannot be opened like this on Windows
+    if hasattr(os, 'O_DIRECTORY'):
+        directory = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+# A function that reads a file written by _write_temp_file, checking its length and checksum first
+def _read_checked(path):
+    with open(path, 'rb') as loadf:
+        header = loadf.read(_header_size)
+        if not header.startswith(snapshot_magic):
+            # A plain pickle written before the header was added
+            loadf.seek(0)
+            try:
+                return pickle.load(loadf)
+            except (EOFError, pickle.UnpicklingError, ValueError) as e:
+                raise CorruptSnapshotError(f"{path} is damaged: {e}")
+        if len(header) < _header_size:
+            raise CorruptSnapshotError(f"{path} is truncated")
+        length, checksum = struct.unpack(_header_format, header[len(snapshot_magic):])
+        payload = loadf.read(length + 1)
+    if len(payload) != length:
+        raise CorruptSnapshotError(f"{path} should hold {length} bytes of data but holds {len(payload)}")
+    if zlib.crc32(payload) != checksum:
+        raise CorruptSnapshotError(f"{path} does not match its checksum")
+    return pickle.loads(payload)
+
+
+def _looks_complete(path):
+    # A quick check of the header and the file size, without reading and checksumming the whole file
+    try:
+        with open(path, 'rb') as loadf:
+            header = loadf.read(_header_size)
+    except FileNotFoundError:
+        return False
+    if not header.startswith(snapshot_magic):
+        if header.startswith(record_format.magic):
+            return record_format.file_is_complete(path)
+        # Plain pickles have no header, only an empty file is known to be incomplete
+        return len(header) > 0
+    if len(header) < _header_size:
+        return False
+    length = struct.unpack(_header_format, header[len(snapshot_magic):])[0]
+    return os.path.getsize(path) == _header_size + length
+
+
+def _load_snapshot(collection, report=None):
+    # Loading the snapshot of a collection. If it is damaged, the newest intact retained snapshot is used instead
+    path = _snapshot_path(collection)
+    if _use_mapping(collection):
+        data = _open_mapped(collection)
+        if data is not None:
+            return data
+    try:
+        return _read_snapshot_file(path)
+    except (CorruptSnapshotError, FormatError) as e:
+        error = e
+    for number in range(1, snapshot_retention + 1):
+        try:
+            data = _read_snapshot_file(_backup_path(collection, number))
+        except (FileNotFoundError, CorruptSnapshotError, FormatError):
+            continue
+        (report or error_handler)(f"{error}. The {collection} data was recovered from the previous snapshot "
+                                  f"{_backup_path(collection, number)}; changes saved after it may be missing.")
+        return data
+    raise CorruptSnapshotError(f"{error}, and no intact previous snapshot of the {collection} data was found")
+
+
+def _read_snapshot_file(path):
+    if backend == "columnar":
+        return record_format.read_file(path)
+    return _read_checked(path)
+
+
+def _rotate_snapshots(collection):
+    # Keeping the current snapshot as employees.pkl.1 and shifting the older ones up, the oldest is dropped.
+    # A damaged snapshot is not kept, so it never pushes an intact one out
+    path = _snapshot_path(collection)
+    if snapshot_retention < 1 or not _looks_complete(path):
+        return
+    for number in range(snapshot_retention - 1, 0, -1):
+        if os.path.exists(_backup_path(collection, number)):
+            os.replace(_backup_path(collection, number), _backup_path(collection, number + 1))
+    backup = _backup_path(collection, 1)
+    if os.path.exists(backup):
+        os.remove(backup)
+    try:
+        # A hard link keeps the current file in place, so there is always a snapshot under its usual name
+        os.link(path, backup)
+    except OSError:
+        shutil.copyfile(path, backup)
+
+
+def _write_temp_snapshot(collection, data):
+    # Writing to a temporary file first so that a reader never sees a half written snapshot
+    if backend == "columnar":
+        temp_path = _snapshot_path(collection) + '.tmp'
+        record_format.write_file(temp_path, data)
+        return temp_path
+    return _write_temp_file(_snapshot_path(collection), data)
+
+
+def _install_snapshot(collection, temp_path):
+    _rotate_snapshots(collection)
+    _replace_file(temp_path, _snapshot_path(collection))
+
+
+def _write_snapshot(collection, data):
+    _install_snapshot(collection, _write_temp_snapshot(collection, data))
+
+
+def _file_signature(collection):
+    # Modification time, size and inode of every file a collection is read from, used to notice changes on disk
+    if backend == "sqlite":
+        return get_sqlite_store().data_version()
+    signature = []
+    journal = _journal_path(collection)
+    for path in (_snapshot_path(collection), journal, journal + '.old'):
+        try:
+            info = os.stat(path)
+            signature.append((info.st_mtime_ns, info.st_size, info.st_ino))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _cache_is_fresh(collection, signature):
+    cached = _cache.get(collection)
+    return cached is not None and cached[0] == signature
+
+
+def _apply_to_cache(collection, signature_before, changes):
+    # Keeping the cached dictionary in step with the (action, key, record) changes this process has just written
+    cached = _cache.get(collection)
+    if cached is None:
+        return
+    if cached[0] != signature_before:
+        # Another program changed the files since they were cached. The entry keeps the version it was read
+        # at, so the next load only reads the journal entries written since then (see _refresh_cache)
+        return
+    data = cached[1]
+    for action, key, record in changes:
+        if action == 'put':
+            data[key] = record
+        else:
+            data.pop(key, None)
+    _cache[collection] = (_file_signature(collection), data)
+
+
+def _journal_tail(collection, base_signature, signature):
+    # Returning the (action, key, record) changes written to a collection between two versions (file
+    # signatures), or None if they cannot be told apart because the snapshot was rewritten in between.
+    # The caller holds the write lock, so no entry is being appended while the journal is read
+    if backend == "sqlite" or base_signature[0] != signature[0] or base_signature[2] != signature[2]:
+        return None
+    if signature[1] is None:
+        return [] if base_signature[1] is None else None
+    if base_signature[1] is not None and base_signature[1][2] != signature[1][2]:
+        # The journal was replaced (see _cut_incomplete_entry), the old offset means nothing in the new file
+        return None
+    offset = base_signature[1][1] if base_signature[1] is not None else 0
+    if offset > signature[1][1]:
+        return None
+    own = _own_ranges(collection, base_signature)
+    changes = []
+    try:
+        with open(_journal_path(collection), 'rb') as journalf:
+            journalf.seek(offset)
+            position = offset
+            for change, end in _journal_entries(journalf, backend == "columnar"):
+                if not any(start <= position < own_end for start, own_end in own):
+                    changes.append(change)
+                position = end
+    except FileNotFoundError:
+        return None
+    if position != signature[1][1]:
+        # An entry that cannot be read, e.g. one cut short by a crash
+        return None
+    return changes
+
+
+def _own_ranges(collection, base_signature):
+    base, ranges = _own_entries.get(collection, (None, []))
+    return list(ranges) if base == base_signature else []
+
+
+def _refresh_cache(collection):
+    # Bringing a cached collection up to date by applying only the journal entries that other programs have
+    # written since it was read. Returns a new dictionary, or None if the collection has to be read again
+    cached = _cache.get(collection)
+    if cached is None or type(cached[1]) is not dict:
+        return None
+    with _journal_locks[collection], _write_lock(collection):
+        signature = _file_signature(collection)
+        changes = _journal_tail(collection, cached[0], signature)
+        if changes is None:
+            return None
+        data = dict(cached[1])
+        for action, key, record in changes:
+            if action == 'put':
+                data[key] = record
+            else:
+                data.pop(key, None)
+        _cache[collection] = (signature, data)
+    metrics.count(f"storage.refreshed_entries.{collection}", len(changes))
+    return data
+
+
+def poll_changes(collection):
+    # Returning the changes other programs have made to a cached collection since it was read or last polled,
+    # as a list of (action, key, record) with the action 'added', 'updated' or 'deleted', and applying them to
+    # the cached dictionary. Only the new journal entries are read, an unchanged collection costs three stat
+    # calls. Returns None if the changes cannot be told apart (the snapshot was rewritten, the SQLite backend
+    # or a memory mapped collection), the collection then has to be read again
+    cached = _cache.get(collection)
+    if cached is None:
+        return None
+    if cached[0] == _file_signature(collection):
+        return []
+    if type(cached[1]) is not dict:
+        return None
+    with _journal_locks[collection], _write_lock(collection):
+        signature = _file_signature(collection)
+        changes = _journal_tail(collection, cached[0], signature)
+        if changes is None:
+            return None
+        data = cached[1]
+        events = []
+        for action, key, record in changes:
+            if action == 'put':
+                events.append(('updated' if key in data else 'added', key, record))
+                data[key] = record
+            elif key in data:
+                events.append(('deleted', key, None))
+                del data[key]
+        _cache[collection] = (signature, data)
+    metrics.count(f"storage.polled_entries.{collection}", len(changes))
+    return events
+
+
+def _merge_concurrent_changes(collection, data):
+    # Optimistic concurrency for whole collection saves: the data was read at the version in the cache.
+    # If another program has saved records since then, its changes are applied to the data before it is
+    # written, so they are not lost. A record changed by both keeps the change that was saved first.
+    # Called with the locks held
+    cached = _cache.get(collection)
+    if cached is None:
+        # Nothing of the collection was read by this program, the data replaces it
+        return
+    signature = _file_signature(collection)
+    if cached[0] == signature:
+        return
+    changes = _journal_tail(collection, cached[0], signature)
+    if changes is None:
+        raise StaleDataError(f"The {collection} data was changed by another program, "
+                             f"please load it again before saving all of it")
+    for action, key, record in changes:
+        if action == 'put':
+            data[key] = record
+        else:
+            data.pop(key, None)
+    metrics.count(f"storage.merged_entries.{collection}", len(changes))
+
+
+def invalidate_cache(collection=None):
+    # Forgetting the cached data of one collection, or of all of them
+    if collection is None:
+        _cache.clear()
+    else:
+        _cache.pop(collection, None)
+
+
+def _load_collection(collection):
+    # Returning the cached dictionary if the files have not changed since it was loaded
+    _convert_if_needed(collection)
+    signature = _file_signature(collection)
+    if _cache_is_fresh(collection, signature):
+        metrics.count(f"storage.cache_hit.{collection}")
+        return _cache[collection][1]
+    data = _refresh_cache(collection)
+    if data is not None:
+        return data
+    with metrics.timer(f"storage.load.{collection}"):
+        if backend == "sqlite":
+            data = get_sqlite_store().load_collection(collection)
+        else:
+            data = _load_file_collection(collection)
+    metrics.count(f"storage.records_loaded.{collection}", len(data))
+    _cache[collection] = (signature, data)
+    if collection == 'events' and type(data) is dict and _move_legacy_members(data):
+        # Rewriting the events once without the copies, so they are not collected again at every load
+        _save_collection(collection, data)
+    return data
+
+
+def _convert_if_needed(collection):
+    # The first time a collection is used with the columnar backend, converting it if it only exists as .pkl
+    # files (the .pkl files are kept). Only checked once per collection, so it costs nothing afterwards
+    if backend != "columnar" or collection in _checked_for_pickles:
+        return
+    with _conversion_lock:
+        if collection in _checked_for_pickles:
+            return
+        if not _has_columnar_files(collection) and _has_pickle_files(collection):
+            data = _read_pickle_files(collection)
+            if collection == 'events':
+                _move_legacy_members(data)
+            _save_collection(collection, data)
+            print(f"Converted the {collection} data to {columnar_files[collection]}")
+        _checked_for_pickles.add(collection)
+
+
+def _load_file_collection(collection):
+    # Loading the snapshot of a collection and replaying any journal entries written after it
+    with _compaction_locks[collection], _compaction_lock(collection, shared=True):
+        journal = _journal_path(collection)
+        try:
+            data = _load_snapshot(collection)
+        except FileNotFoundError:
+            if not (os.path.exists(journal) or os.path.exists(journal + '.old')):
+                raise
+            data = {}
+        # The .old journal only exists while a compaction is folding it into the snapshot
+        _replay_journal(journal + '.old', data)
+        _journal_counts[collection], end = _replay_journal(journal, data)
+        signature = _file_signature(collection)
+        if signature[1] is not None:
+            _complete_journal_ends[collection] = (signature[0], signature[1][2], end)
+        return data
+
+
+def _use_mapping(collection):
+    if backend != "columnar" or collection not in mapped_collections:
+        return False
+    try:
+        return os.path.getsize(_snapshot_path(collection)) >= mapped_threshold
+    except FileNotFoundError:
+        return False
+
+
+def _open_mapped(collection):
+    # Returning a memory mapped view of the snapshot, or None if its header is damaged so it is loaded normally
+    try:
+        return record_format.MappedCollection(_snapshot_path(collection), mapped_cache_size)
+    except FormatError as e:
+        print(f"{e}, the {collection} data is loaded without memory mapping")
+        return None
+
+
+@metrics.timed("storage.save_collection")
+def _save_collection(collection, data):
+    metrics.count(f"storage.records_saved.{collection}", len(data))
+    with _compaction_locks[collection], _journal_locks[collection], _compaction_lock(collection), \
+            _write_lock(collection):
+        _merge_concurrent_changes(collection, data)
+        if backend == "sqlite":
+            get_sqlite_store().save_collection(collection, data)
+            _cache[collection] = (_file_signature(collection), data)
+            return
+        # Rewriting the whole snapshot, after which the journal is no longer needed
+        _write_snapshot(collection, data)
+        journal = _journal_path(collection)
+        for path in (journal, journal + '.old'):
+            if os.path.exists(path):
+                os.remove(path)
+        _journal_counts[collection] = 0
+        _cache[collection] = (_file_signature(collection), data)
+
+
+# A function that makes sure the journal of a collection ends with a complete entry before more are appended.
+# New entries written after the bytes of an entry cut short by a crash would never be replayed, because
+# reading stops at the first entry that cannot be decoded. Only the part of the journal that is not known to
+# be complete is read. Called with the write lock held
+def _cut_incomplete_entry(collection):
+    signature = _file_signature(collection)
+    if signature[1] is None:
+        _complete_journal_ends.pop(collection, None)
+        return
+    path = _journal_path(collection)
+    size = signature[1][1]
+    known = _complete_journal_ends.get(collection)
+    if known is not None and known[:2] == (signature[0], signature[1][2]) and known[2] <= size:
+        end = known[2]
+    else:
+        end = 0
+    if end < size:
+        with open(path, 'rb') as journalf:
+            journalf.seek(end)
+            for _, end in _journal_entries(journalf, backend == "columnar"):
+                pass
+    if end < size:
+        print(f"Removing an incomplete record at the end of {path}")
+        fresh = _cache_is_fresh(collection, signature)
+        with open(path, 'rb') as journalf:
+            complete = journalf.read(end)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as tempf:
+            tempf.write(complete)
+            tempf.flush()
+            os.fsync(tempf.fileno())
+        # Replaced instead of truncated, so other programs see a new inode and do not read on from an offset
+        # inside the removed bytes (see _journal_tail)
+        _replace_file(temp_path, path)
+        signature = _file_signature(collection)
+        if fresh:
+            # The removed bytes were never part of the cached data
+            _cache[collection] = (signature, _cache[collection][1])
+    _complete_journal_ends[collection] = (signature[0], signature[1][2], end)
+
+
+# A function that appends (action, key, record) change records to the journal of a collection with a single fsync
+def _append_changes(collection, changes):
+    _convert_if_needed(collection)
+    metrics.count(f"storage.journal_entries.{collection}", len(changes))
+    with _journal_locks[collection], _write_lock(collection):
+        _cut_incomplete_entry(collection)
+        signature_before = _file_signature(collection)
+        with open(_journal_path(collection), 'ab') as journalf:
+            start = journalf.tell()
+            journalf.write(b''.join(_encode_journal_entry(change) for change in changes))
+            journalf.flush()
+            os.fsync(journalf.fileno())
+            end = journalf.tell()
+        signature = _file_signature(collection)
+        _complete_journal_ends[collection] = (signature[0], signature[1][2], end)
+        _journal_counts[collection] += len(changes)
+        cached = _cache.get(collection)
+        if cached is not None and cached[0] != signature_before:
+            # The cache is at a version older than the journal it was appended to. The entries are skipped
+            # when it is brought up to date, so the changes are put into the cached data here (the services
+            # have done this already, the save_* and delete_record functions have not)
+            _own_entries[collection] = (cached[0], _own_ranges(collection, cached[0]) + [(start, end)])
+            for action, key, record in changes:
+                if action == 'put':
+                    cached[1][key] = record
+                else:
+                    cached[1].pop(key, None)
+        _apply_to_cache(collection, signature_before, changes)
+        needs_compaction = _journal_counts[collection] >= compaction_threshold
+    if needs_compaction:
+        start_compaction(collection)
+
+
+@metrics.timed("storage.compact_journal")
+def compact_journal(collection):
+    # Folding the journal of a collection into its snapshot
+    with _compaction_locks[collection], _compaction_lock(collection):
+        journal = _journal_path(collection)
+        old_journal = journal + '.old'
+        # Moving the journal aside so that new changes can keep being appended while the snapshot is rewritten
+        with _journal_locks[collection], _write_lock(collection):
+            if not os.path.exists(journal):
+                return
+            fresh = _cache_is_fresh(collection, _file_signature(collection))
+            if not os.path.exists(old_journal):
+                os.replace(journal, old_journal)
+            _journal_counts[collection] = 0
+            if fresh:
+                # The contents do not change, only the files they are stored in
+                _cache[collection] = (_file_signature(collection), _cache[collection][1])
+        try:
+            # Reported with print, the message boxes of the GUI must not be opened from this thread
+            data = _load_snapshot(collection, report=print)
+        except FileNotFoundError:
+            data = {}
+        _replay_journal(old_journal, data)
+        temp_path = _write_temp_snapshot(collection, data)
+        if collection == 'events':
+            # After writing, as the records of a memory mapped snapshot are only decoded while it is written
+            _move_legacy_members(data)
+        with _journal_locks[collection], _write_lock(collection):
+            fresh = _cache_is_fresh(collection, _file_signature(collection))
+            _install_snapshot(collection, temp_path)
+            os.remove(old_journal)
+            if fresh:
+                _cache[collection] = (_file_signature(collection), _cache[collection][1])
+
+
+def start_compaction(collection):
+    # Running the compaction in a background thread so that saving a record never waits for it
+    if _compaction_locks[collection].locked():
+        return None
+    # Not a daemon thread, so a script that exits right after a bulk save still finishes the compaction
+    thread = threading.Thread(target=_compact_in_background, args=(collection,))
+    thread.start()
+    return thread
+
+
+def _compact_in_background(collection):
+    try:
+        compact_journal(collection)
+    except Exception as e:
+        print(f"An error occurred while compacting the {collection} journal:", e)
+
+
+def record_keys(collection):
+    # Returning the IDs of a collection without loading its records where the backend allows it:
+    # SQLite reads only the ID column and the columnar backend only the key column and the journal
+    if _cache_is_fresh(collection, _file_signature(collection)):
+        return list(_cache[collection][1])
+    if backend == "sqlite":
+        return get_sqlite_store().keys(collection)
+    if backend != "columnar":
+        return list(_load_collection(collection))
+    _convert_if_needed(collection)
+    with _compaction_locks[collection]:
+        try:
+            with record_format.ColumnFile(_snapshot_path(collection)) as column_file:
+                keys = dict.fromkeys(column_file.keys() if column_file.record_class is not None else ())
+        except FileNotFoundError:
+            keys = {}
+        except FormatError:
+            keys = None
+        if keys is not None:
+            journal = _journal_path(collection)
+            _replay_journal(journal + '.old', keys)
+            _replay_journal(journal, keys)
+            return list(keys)
+    # A damaged snapshot is loaded the usual way, which falls back to a retained snapshot. Outside the with
+    # block, because loading takes the same lock
+    return list(_load_collection(collection))
+
+
+def _scan_next_number(collection):
+    # Recovery path: finding the highest number used by the IDs of a collection from its IDs alone
+    try:
+        keys = record_keys(collection)
+    except FileNotFoundError:
+        return 1
+    prefix = id_prefixes[collection]
+    numbers = [int(key[len(prefix):]) for key in keys if key[len(prefix):].isdigit()]
+    return max(numbers) + 1 if numbers else 1
+
+
+def _read_counters():
+    counters = _read_checked(os.path.join(data_path, counters_file))
+    if not isinstance(counters, dict):
+        raise ValueError("counters file does not contain a dictionary")
+    return counters
+
+
+def _write_counters(counters):
+    path = os.path.join(data_path, counters_file)
+    _replace_file(_write_temp_file(path, counters), path)
+
+
+def _id_in_use(collection, record_id):
+    # Only checked against data that is already cached, so allocating an ID never loads a collection
+    signature = _file_signature(collection)
+    return _cache_is_fresh(collection, signature) and record_id in _cache[collection][1]
+
+
+@metrics.timed("storage.allocate_ids")
+def allocate_ids(collection, count=1):
+    # Reserving the next count numbers of the ID sequence of a collection and returning the first ID number.
+    # The counter is persisted before the numbers are used, so an ID is never handed out twice, also not to
+    # another program using the same data directory
+    with _counters_lock, FileLock(os.path.join(data_path, 'counters.lock')):
+        if backend == "sqlite":
+            number = get_sqlite_store().get_counter(collection)
+        else:
+            try:
+                counters = _read_counters()
+            except FileNotFoundError:
+                counters = {}
+            except Exception as e:
+                print("The ID counters file could not be read, rebuilding it from the data:", e)
+                counters = {}
+            number = counters.get(collection)
+        if not isinstance(number, int) or number < 1 or _id_in_use(collection, f"{id_prefixes[collection]}{number}"):
+            number = _scan_next_number(collection)
+        if backend == "sqlite":
+            get_sqlite_store().set_counter(collection, number + count)
+        else:
+            counters[collection] = number + count
+            _write_counters(counters)
+        return number
+
+
+def allocate_id(collection):
+    # Returning a new unique ID for a collection, e.g. allocate_id('guests') -> 'G12'
+    return f"{id_prefixes[collection]}{allocate_ids(collection)}"
+
+
+# Functions to save and remove a single record of a collection
+@metrics.timed("storage.save_record")
+def save_record(collection, key, record):
+    try:
+        if backend == "sqlite":
+            signature_before = _file_signature(collection)
+            get_sqlite_store().save_record(collection, key, record)
+            _apply_to_cache(collection, signature_before, [('put', key, record)])
+        elif journal_mode:
+            _append_changes(collection, [('put', key, record)])
+        else:
+            data = _load_collection(collection)
+            data[key] = record
+            _save_collection(collection, data)
+    except Exception as e:
+        print(f"An error occurred while saving the {collection} record {key}:", e)
+
+@metrics.timed("storage.delete_record")
+def delete_record(collection, key):
+    try:
+        if backend == "sqlite":
+            signature_before = _file_signature(collection)
+            get_sqlite_store().delete_record(collection, key)
+            _apply_to_cache(collection, signature_before, [('delete', key, None)])
+        elif journal_mode:
+            _append_changes(collection, [('delete', key, None)])
+        else:
+            data = _load_collection(collection)
+            data.pop(key, None)
+            _save_collection(collection, data)
+    except Exception as e:
+        print(f"An error occurred while removing the {collection} record {key}:", e)
+
+# A function that writes a list of ('put', key, record) and ('delete', key, None) changes of a collection
+# at once (one journal write or one SQLite transaction). Unlike save_record, errors are raised so that
+# bulk jobs and the background writer know the changes were not saved
+@metrics.timed("storage.apply_changes")
+def apply_changes(collection, changes):
+    if backend == "sqlite":
+        signature_before = _file_signature(collection)
+        get_sqlite_store().apply_changes(collection, changes)
+        _apply_to_cache(collection, signature_before, changes)
+    elif journal_mode:
+        _append_changes(collection, changes)
+    else:
+        data = _load_collection(collection)
+        for action, key, record in changes:
+            if action == 'put':
+                data[key] = record
+            else:
+                data.pop(key, None)
+        _save_collection(collection, data)
+
+
+# A function that saves many records of a collection at once, raising an error if they could not be saved
+def save_records(collection, records):
+    apply_changes(collection, [('put', key, record) for key, record in records.items()])
+
+
+# A function that rewrites a whole collection, raising an error if it could not be saved
+def save_collection(collection, data):
+    _save_collection(collection, data)
+
+
+# A function that yields the (ID, record) pairs of a collection one at a time
+def iter_records(collection):
+    if backend == "sqlite" and not _cache_is_fresh(collection, _file_signature(collection)):
+        # Streaming from the database without building the whole dictionary
+        yield from get_sqlite_store().iter_records(collection)
+        return
+    data = _load_collection(collection)
+    if type(data) is dict:
+        yield from list(data.items())
+    else:
+        # A memory mapped collection, its records are decoded one at a time and not kept
+        yield from data.iter_items()
 
 
 # Functions to save and load employee data
 def save_data(employees):
     try:
-        with open(os.path.join(data_path, 'employees.pkl'), 'wb') as dumpf:
-            pickle.dump(employees, dumpf)
+        _save_collection('employees', employees)
     except Exception as e:
         print("An error occurred while saving the data:", e)
 
 def load_data():
     try:
-        with open(os.path.join(data_path, 'employees.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('employees')
     except FileNotFoundError:
         print("Employee data file not found. Starting with an empty dataset.")
         return {}
@@ -32,98 +1111,88 @@ def load_data():
 # Functions to save and load event data
 def save_event_data(events):
     try:
-        with open(os.path.join(data_path, 'events.pkl'), 'wb') as dumpf:
-            pickle.dump(events, dumpf)
+        _save_collection('events', events)
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while saving event data: {e}")
+        error_handler(f"An error occurred while saving event data: {e}")
 
 def load_event_data():
     try:
-        with open(os.path.join(data_path, 'events.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('events')
     except FileNotFoundError:
-        messagebox.showinfo("Information", "Event data file not found. Starting with an empty event dataset.")
+        info_handler("Event data file not found. Starting with an empty event dataset.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while loading event data: {e}")
+        error_handler(f"An error occurred while loading event data: {e}")
         return {}
 
 
 # Functions to save and load supplier data
 def save_supplier_data(suppliers):
     try:
-        with open(os.path.join(data_path, 'suppliers.pkl'), 'wb') as dumpf:
-            pickle.dump(suppliers, dumpf)
+        _save_collection('suppliers', suppliers)
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while saving supplier data: {e}")
+        error_handler(f"An error occurred while saving supplier data: {e}")
 
 def load_supplier_data():
     try:
-        with open(os.path.join(data_path, 'suppliers.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('suppliers')
     except FileNotFoundError:
-        messagebox.showinfo("Information", "Supplier data file not found. Starting with an empty supplier dataset.")
+        info_handler("Supplier data file not found. Starting with an empty supplier dataset.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while loading supplier data: {e}")
+        error_handler(f"An error occurred while loading supplier data: {e}")
         return {}
 
 
 # Functions to save and load guest data
 def save_guest_data(guests):
     try:
-        with open(os.path.join(data_path, 'guests.pkl'), 'wb') as dumpf:
-            pickle.dump(guests, dumpf)
+        _save_collection('guests', guests)
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while saving guest data: {e}")
+        error_handler(f"An error occurred while saving guest data: {e}")
 
 def load_guest_data():
     try:
-        with open(os.path.join(data_path, 'guests.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('guests')
     except FileNotFoundError:
-        messagebox.showinfo("Information", "Guest data file not found. Starting with an empty guest dataset.")
+        info_handler("Guest data file not found. Starting with an empty guest dataset.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while loading guest data: {e}")
+        error_handler(f"An error occurred while loading guest data: {e}")
         return {}
 
 
 # Functions to save and load client data
 def save_client_data(clients):
     try:
-        with open(os.path.join(data_path, 'clients.pkl'), 'wb') as dumpf:
-            pickle.dump(clients, dumpf)
+        _save_collection('clients', clients)
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while saving client data: {e}")
+        error_handler(f"An error occurred while saving client data: {e}")
 
 def load_client_data():
     try:
-        with open(os.path.join(data_path, 'clients.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('clients')
     except FileNotFoundError:
-        messagebox.showinfo("Information", "Client data file not found. Starting with an empty client dataset.")
+        info_handler("Client data file not found. Starting with an empty client dataset.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while loading client data: {e}")
+        error_handler(f"An error occurred while loading client data: {e}")
         return {}
 
 
 # Functions to save and load venue data
 def save_venue_data(venues):
     try:
-        with open(os.path.join(data_path, 'venues.pkl'), 'wb') as dumpf:
-            pickle.dump(venues, dumpf)
+        _save_collection('venues', venues)
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while saving venue data: {e}")
+        error_handler(f"An error occurred while saving venue data: {e}")
 
 def load_venue_data():
     try:
-        with open(os.path.join(data_path, 'venues.pkl'), 'rb') as loadf:
-            return pickle.load(loadf)
+        return _load_collection('venues')
     except FileNotFoundError:
-        messagebox.showinfo("Information", "Venue data file not found. Starting with an empty venue dataset.")
+        info_handler("Venue data file not found. Starting with an empty venue dataset.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred while loading venue data: {e}")
+        error_handler(f"An error occurred while loading venue data: {e}")
         return {}
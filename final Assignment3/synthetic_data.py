@@ -0,0 +1,85 @@
+import random
+
+from classes import Employee, Client, Event, Supplier, Guest, Venue
+
+first_names = ["Amira", "Omar", "Sara", "Ahmed", "Hasan", "Mira", "Ghaya", "Ismail", "Reem", "Hamad", "Layla", "Yousef"]
+last_names = ["Alshaer", "Saeed", "Khalid", "AlTeniji", "Omar", "Salem", "Adel", "Mohammed", "AlNaumi", "Hassan"]
+genders = ["Male", "Female"]
+departments = ["Marketing", "Operations", "Human Resources", "Finance", "Logistics", "Sales", "Event Planning"]
+job_titles = ["Event Coordinator", "Event Manager", "Marketing Specialist", "Operations Manager", "HR Manager",
+              "Registration Coordinator"]
+event_types = ["Wedding", "Birthday", "Themed Parties", "Graduation", "Conference", "Seminar", "Workshop"]
+service_types = ['Catering', 'Sound System', 'Decoration', 'Photography', 'Security']
+addresses = ["World Trade Centre", "ADNEC", "Expo City", "Yas Island", "Corniche Hall", "Marina Ballroom"]
+
+
+# Functions that generate dictionaries of random records, keyed by ID like the storage files
+def make_employees(count, rng=None):
+    rng = rng or random.Random(1)
+    employees = {}
+    for i in range(1, count + 1):
+        employees[f"EP{i}"] = Employee(rng.choice(first_names), rng.choice(last_names), rng.choice(genders),
+                                       f"05{rng.randrange(10 ** 8):08d}", f"EP{i}", rng.choice(departments),
+                                       rng.choice(job_titles), float(rng.randrange(15000, 90000, 500)))
+    return employees
+
+def make_guests(count, rng=None):
+    rng = rng or random.Random(2)
+    return {f"G{i}": Guest(rng.choice(first_names), rng.choice(last_names), rng.choice(genders),
+                           f"05{rng.randrange(10 ** 8):08d}", f"G{i}") for i in range(1, count + 1)}
+
+def make_clients(count, rng=None):
+    rng = rng or random.Random(3)
+    return {f"C{i}": Client(rng.choice(first_names), rng.choice(last_names), rng.choice(genders),
+                            f"05{rng.randrange(10 ** 8):08d}", f"C{i}", float(rng.randrange(1000, 100000, 500)),
+                            rng.randrange(1, 10)) for i in range(1, count + 1)}
+
+def make_suppliers(count, rng=None):
+    rng = rng or random.Random(4)
+    return {f"SP{i}": Supplier(f"SP{i}", f"{rng.choice(last_names)} {rng.choice(service_types)}",
+                               rng.choice(service_types)) for i in range(1, count + 1)}
+
+def make_venues(count, rng=None):
+    rng = rng or random.Random(5)
+    venues = {}
+    for i in range(1, count + 1):
+        min_guests = rng.randrange(10, 500, 10)
+        venues[f"V{i}"] = Venue(f"V{i}", f"{rng.choice(addresses)} {i}", min_guests,
+                                min_guests + rng.randrange(50, 5000, 50))
+    return venues
+
+def make_events(count, rng=None):
+    rng = rng or random.Random(6)
+    return {f"EV{i}": Event(f"EV{i}", rng.choice(event_types),
+                            f"{rng.randrange(2024, 2027)}/{rng.randrange(1, 13):02d}/{rng.randrange(1, 29):02d}",
+                            f"{rng.randrange(8, 22)}:00", f"{rng.randrange(1, 9)} Hours")
+            for i in range(1, count + 1)}
+
+
+generators = {
+    'employees': make_employees,
+    'events': make_events,
+    'suppliers': make_suppliers,
+    'guests': make_guests,
+    'clients': make_clients,
+    'venues': make_venues,
+}
+
+
+def link_events(events, guests, suppliers, venues, guests_per_event=20, suppliers_per_event=3, rng=None):
+    # Giving every event random guests, suppliers and one venue of the given dictionaries, referenced by ID
+    rng = rng or random.Random(7)
+    guest_ids, supplier_ids, venue_ids = list(guests), list(suppliers), list(venues)
+    for event in events.values():
+        event.guests = dict.fromkeys(rng.sample(guest_ids, min(guests_per_event, len(guest_ids))))
+        event.suppliers = dict.fromkeys(rng.sample(supplier_ids, min(suppliers_per_event, len(supplier_ids))))
+        event.venues = dict.fromkeys(rng.sample(venue_ids, min(1, len(venue_ids))))
+    return events
+
+
+def make_dataset(count, guests_per_event=20):
+    # Returning count records of every collection, keyed by collection name, with the events linked to the
+    # guests, suppliers and venues of the dataset
+    data = {collection: generate(count) for collection, generate in generators.items()}
+    link_events(data['events'], data['guests'], data['suppliers'], data['venues'], guests_per_event)
+    return data
@@ -0,0 +1,90 @@
+from tkinter import ttk
+
+
+class PagedTable:
+    """Class to show a large dictionary of records in a Treeview, one page of rows at a time.
+    Rows are only created when they are about to be scrolled into view, and each row uses
+    the record ID as its iid so that a single record can be inserted, updated or deleted
+    without rebuilding the whole table."""
+    def __init__(self, tree, row_values, page_size=100, scrollbar=None):
+        # Constructor for PagedTable class
+        self.tree = tree
+        self.row_values = row_values  # Function that turns a record into the tuple of column values
+        self.page_size = page_size
+        self.scrollbar = scrollbar
+        self.records = {}
+        self.keys = []  # Record IDs in display order, only the first self.loaded of them are in the tree
+        self.loaded = 0
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        if self.scrollbar is not None:
+            self.scrollbar.configure(command=self.tree.yview)
+
+    def set_records(self, records):
+        # Showing a new dictionary of records, only the first page is materialized
+        for i in self.tree.get_children():
+            self.tree.delete(i)
+        self.records = records
+        self.keys = list(records)
+        self.loaded = 0
+        self.load_more()
+
+    def load_more(self):
+        # Materializing the next page of rows, skipping records that were deleted in the meantime
+        end = min(self.loaded + self.page_size, len(self.keys))
+        for key in self.keys[self.loaded:end]:
+            if key in self.records and not self.tree.exists(key):
+                self.tree.insert("", "end", iid=key, values=self.row_values(self.records[key]))
+        self.loaded = end
+
+    def _on_scroll(self, first, last):
+        # Called by the Treeview whenever its view changes, fetching more rows near the bottom
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if float(last) > 0.9 and self.loaded < len(self.keys):
+            self.tree.after_idle(self.load_more)
+
+    def insert_row(self, key):
+        # Adding the row of a newly added record, it only becomes visible once the rows before it are loaded
+        self.keys.append(key)
+        if self.loaded == len(self.keys) - 1:
+            self.load_more()
+
+    def update_row(self, key):
+        # Redrawing the row of a modified record if it is currently materialized
+        if self.tree.exists(key):
+            self.tree.item(key, values=self.row_values(self.records[key]))
+
+    def delete_row(self, key):
+        # Removing the row of a deleted record, pending keys are skipped when their page is loaded
+        if self.tree.exists(key):
+            self.tree.delete(key)
+
+
+    def apply_changes(self, changes, previous, records):
+        # Applying (action, key, record) changes made by another program, only the affected rows are touched.
+        # previous is the dictionary of the whole collection before the changes and records the one after
+        # them; new records are only shown if the table shows the whole collection (not search results)
+        showing_all = self.records is previous or self.records is records
+        if showing_all:
+            self.records = records
+        for action, key, record in changes:
+            if action == 'reloaded':
+                if showing_all:
+                    self.set_records(records)
+            elif action == 'deleted':
+                if not showing_all:
+                    self.records.pop(key, None)
+                self.delete_row(key)
+            elif action == 'added' and showing_all:
+                self.insert_row(key)
+            elif action == 'updated' and key in self.records:
+                if not showing_all:
+                    self.records[key] = record
+                self.update_row(key)
+
+
+def make_paged_table(parent, tree, row_values, row=3, column=2):
+    # Creating a vertical scrollbar next to the Treeview and wrapping both in a PagedTable
+    scrollbar = ttk.Scrollbar(parent, orient="vertical")
+    scrollbar.grid(row=row, column=column, sticky='ns')
+    return PagedTable(tree, row_values, scrollbar=scrollbar)
@@ -0,0 +1,90 @@
+"""Tests for bulk.py. Run with: python -m unittest test_bulk"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import storage
+from bulk import ImportResult, export_file, import_file, import_rows, member_ids
+from service import create_services
+
+
+class BulkTest(unittest.TestCase):
+    """Class to check that imports save the valid rows, report the others and round-trip through an export"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.previous = storage.data_path, storage.backend
+        storage.data_path = self.directory
+        storage.use_backend("columnar")
+        self.services = create_services()
+
+    def tearDown(self):
+        storage.data_path, backend = self.previous
+        storage.use_backend(backend)
+        shutil.rmtree(self.directory)
+
+    def import_guests(self, count):
+        return import_rows(self.services['guests'], (
+            {'firstName': "Guest", 'lastName': str(number), 'gender': "Female", 'phoneNumber': f"050{number}"}
+            for number in range(1, count + 1)))
+
+    def test_valid_rows_are_saved_with_new_ids(self):
+        result = import_rows(self.services['guests'], [
+            {'firstName': "Ann", 'lastName': "Lee", 'gender': "Female", 'phoneNumber': "0501234567"},
+            {'firstName': "", 'lastName': "Ray", 'gender': "Male", 'phoneNumber': "0507654321"},
+            {'firstName': "Cat", 'lastName': "Fox", 'gender': "Female", 'phoneNumber': "0501112222"},
+        ], batch_size=2)
+        self.assertIsInstance(result, ImportResult)
+        self.assertEqual(result.imported, ['G1', 'G2'])
+        self.assertEqual([row_number for row_number, _ in result.errors], [2])
+        self.assertEqual(str(result), "Imported 2 records, rejected 1 rows")
+        storage.invalidate_cache()
+        self.assertEqual({key: guest._firstName for key, guest in storage.load_guest_data().items()},
+                         {'G1': "Ann", 'G2': "Cat"})
+        # The counter was moved past the imported IDs
+        self.assertEqual(self.services['guests'].create(firstName="Dan", lastName="Roe", gender="Male",
+                                                        phoneNumber="0503334444").guestID, 'G3')
+
+    def test_events_refer_to_existing_members(self):
+        self.import_guests(3)
+        result = import_rows(self.services['events'], [
+            {'event_type': "Wedding", 'date': "2024/04/23", 'time': "8:00", 'duration': "7 Hours", 'guests': "G1;G3"},
+            {'event_type': "Party", 'date': "2024/04/24", 'time': "8:00", 'duration': "2 Hours", 'guests': ["G9"]},
+            {'event_type': "Party", 'date': "not a date", 'time': "8:00", 'duration': "2 Hours"},
+        ])
+        self.assertEqual(result.imported, ['EV1'])
+        self.assertEqual([row_number for row_number, _ in result.errors], [2, 3])
+        self.assertEqual(list(self.services['events'].get('EV1').guests), ['G1', 'G3'])
+
+    def test_export_and_import_round_trip(self):
+        self.import_guests(3)
+        import_rows(self.services['events'], [
+            {'event_type': "Wedding", 'date': "2024/04/23", 'time': "8:00", 'duration': "7 Hours", 'guests': "G2;G3"}])
+        paths = [os.path.join(self.directory, 'events' + extension) for extension in ('.csv', '.jsonl')]
+        for path in paths:
+            self.assertEqual(export_file(self.services['events'], path), 1)
+        for path in paths:
+            with self.subTest(path=path):
+                result = import_file(self.services['events'], path)
+                self.assertEqual(len(result.imported), 1, result.errors)
+                copy = self.services['events'].get(result.imported[0])
+                self.assertEqual((copy.event_type, copy.date, copy.time, copy.duration, list(copy.guests)),
+                                 ("Wedding", "2024/04/23", "8:00", "7 Hours", ['G2', 'G3']))
+        with open(os.path.join(self.directory, 'events.jsonl'), encoding='utf-8') as inf:
+            self.assertEqual(json.loads(inf.readline())['guests'], ['G2', 'G3'])
+
+    def test_unsupported_file_type(self):
+        with self.assertRaises(ValueError):
+            import_file(self.services['guests'], os.path.join(self.directory, 'guests.xlsx'))
+        with self.assertRaises(ValueError):
+            export_file(self.services['guests'], os.path.join(self.directory, 'guests.xlsx'))
+
+    def test_member_ids(self):
+        self.assertEqual(member_ids("G1; G2;;"), ['G1', 'G2'])
+        self.assertEqual(member_ids(['G1', 2]), ['G1', '2'])
+        self.assertEqual(member_ids(None), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Tests for interval_index.py. Run with: python -m unittest test_interval_index"""
+import random
+import unittest
+
+from interval_index import CapacityIndex, IntervalTree
+
+
+class CapacityIndexTest(unittest.TestCase):
+    """Class to check that the capacity index finds the ranges containing a number, smallest end first"""
+    def test_containing_smallest_end_first(self):
+        index = CapacityIndex()
+        index.add('V1', 10, 500)
+        index.add('V2', 50, 100)
+        index.add('V3', 1, 60)
+        index.add('V4', 200, 300)
+        self.assertEqual(list(index.containing(55)), ['V3', 'V2', 'V1'])
+        self.assertEqual(list(index.containing(250)), ['V4', 'V1'])
+        self.assertEqual(list(index.containing(1000)), [])
+
+    def test_ranges_are_closed(self):
+        index = CapacityIndex()
+        index.add('V1', 10, 20)
+        self.assertEqual(list(index.containing(10)), ['V1'])
+        self.assertEqual(list(index.containing(20)), ['V1'])
+        self.assertEqual(list(index.containing(21)), [])
+
+    def test_add_replaces_and_remove(self):
+        index = CapacityIndex()
+        index.add('V1', 10, 20)
+        index.add('V2', 10, 20)
+        list(index.containing(15))
+        index.add('V1', 30, 40)
+        index.remove('V2')
+        index.remove('V9')
+        self.assertEqual(len(index), 1)
+        self.assertNotIn('V2', index)
+        self.assertEqual(list(index.containing(15)), [])
+        self.assertEqual(list(index.containing(35)), ['V1'])
+
+    def test_range_ending_before_it_starts(self):
+        index = CapacityIndex()
+        with self.assertRaises(ValueError):
+            index.add('V1', 20, 10)
+        self.assertNotIn('V1', index)
+
+    def test_matches_a_scan(self):
+        generator = random.Random(7)
+        index = CapacityIndex()
+        ranges = {}
+        for number in range(300):
+            low = generator.randint(0, 500)
+            ranges[f"V{number}"] = (low, low + generator.randint(0, 200))
+            index.add(f"V{number}", *ranges[f"V{number}"])
+        for guests in range(0, 720, 13):
+            expected = sorted((high, low, key) for key, (low, high) in ranges.items() if low <= guests <= high)
+            self.assertEqual(list(index.containing(guests)), [key for _, _, key in expected])
+
+
+class IntervalTreeTest(unittest.TestCase):
+    """Class to check that the interval tree finds the overlapping intervals while they are added and removed"""
+    def test_overlapping(self):
+        tree = IntervalTree()
+        tree.add('EV1', 0, 10)
+        tree.add('EV2', 5, 15)
+        tree.add('EV3', 20, 30)
+        self.assertEqual(sorted(tree.overlapping(8, 21)), ['EV1', 'EV2', 'EV3'])
+        self.assertEqual(sorted(tree.overlapping(15, 20)), [])
+        self.assertEqual(sorted(tree.overlapping(-5, 1)), ['EV1'])
+
+    def test_touching_intervals_do_not_overlap(self):
+        tree = IntervalTree()
+        tree.add('EV1', 0, 10)
+        self.assertEqual(tree.overlapping(10, 20), [])
+        self.assertEqual(tree.overlapping(-10, 0), [])
+
+    def test_add_moves_and_remove(self):
+        tree = IntervalTree()
+        tree.add('EV1', 0, 10)
+        tree.add('EV1', 50, 60)
+        self.assertEqual(len(tree), 1)
+        self.assertEqual(tree.overlapping(0, 10), [])
+        self.assertEqual(tree.overlapping(55, 56), ['EV1'])
+        tree.remove('EV1')
+        tree.remove('EV9')
+        self.assertNotIn('EV1', tree)
+        self.assertEqual(tree.overlapping(0, 100), [])
+
+    def test_empty_interval(self):
+        tree = IntervalTree()
+        with self.assertRaises(ValueError):
+            tree.add('EV1', 10, 10)
+
+    def test_matches_a_scan(self):
+        generator = random.Random(3)
+        tree = IntervalTree()
+        intervals = {}
+        for step in range(2000):
+            key = f"EV{generator.randint(0, 200)}"
+            if generator.random() < 0.3:
+                tree.remove(key)
+                intervals.pop(key, None)
+            else:
+                start = generator.randint(0, 1000)
+                intervals[key] = (start, start + generator.randint(1, 50))
+                tree.add(key, *intervals[key])
+            if step % 50 == 0:
+                start = generator.randint(0, 1000)
+                end = start + generator.randint(1, 100)
+                expected = sorted(key for key, (low, high) in intervals.items() if low < end and high > start)
+                self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Tests for record_format.py. Run with: python -m unittest test_record_format"""
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import record_format
+from classes import Employee, Event, Guest, Venue
+from record_format import FormatError, MappedCollection
+
+
+def state(records):
+    # The attributes of every record, records have no __eq__
+    return {key: (type(record).__name__, record.__getstate__()) for key, record in records.items()}
+
+
+class FileRoundTripTest(unittest.TestCase):
+    """Class to check that collections written to a collection file are read back unchanged"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'records.emr')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_round_trip(self, records):
+        record_format.write_file(self.path, records)
+        self.assertTrue(record_format.file_is_complete(self.path))
+        self.assertEqual(state(record_format.read_file(self.path)), state(records))
+
+    def test_every_column_type(self):
+        self.check_round_trip({
+            'EP1': Employee("Ann", "Lee", "Female", "0501234567", "EP1", "Sales", "Manager", 27000.5),
+            'EP2': Employee("Bob", "Ray", "Male", "0507654321", "EP2", "IT", "Developer", 18000.0),
+        })
+        self.check_round_trip({'V1': Venue('V1', "ADNEC", 10, 300), 'V2': Venue('V2', "Café ☕", 0, 2 ** 40)})
+
+    def test_events_with_members(self):
+        event = Event('EV1', "Wedding", "2024/04/23", "8:00", "7 Hours")
+        event.add_guest('G1')
+        event.add_guest('G2')
+        event.add_venue(Venue('V1', "ADNEC", 1, 300))
+        self.check_round_trip({'EV1': event, 'EV2': Event('EV2', "Birthday", "2024/05/01", "18:00", "3 Hours")})
+
+    def test_empty_collection_and_other_keys(self):
+        self.check_round_trip({})
+        self.check_round_trip({'first': Guest("Ann", "Lee", "Female", "050", "G1")})
+
+    def test_single_column_and_record(self):
+        record_format.write_file(self.path, {f"G{number}": Guest("Guest", str(number), "Male", "050", f"G{number}")
+                                             for number in range(1, 6)})
+        self.assertEqual(record_format.read_column(self.path, '_lastName'), ['1', '2', '3', '4', '5'])
+        self.assertEqual(record_format.read_record(self.path, 'G4')._lastName, '4')
+
+    def test_records_that_cannot_be_stored(self):
+        with self.assertRaises(FormatError):
+            record_format.write_file(self.path, {'x': object()})
+        with self.assertRaises(FormatError):
+            record_format.write_file(self.path, {'G1': Guest("Ann", "Lee", "Female", "050", "G1"),
+                                                 'V1': Venue('V1', "ADNEC", 1, 300)})
+
+    def test_damaged_files(self):
+        record_format.write_file(self.path, {'G1': Guest("Ann", "Lee", "Female", "050", "G1")})
+        with open(self.path, 'rb') as inf:
+            data = inf.read()
+        with open(self.path, 'wb') as outf:
+            outf.write(data[:-3])
+        self.assertFalse(record_format.file_is_complete(self.path))
+        with self.assertRaises(FormatError):
+            record_format.read_file(self.path)
+        with open(self.path, 'wb') as outf:
+            outf.write(b'not a collection file')
+        with self.assertRaises(FormatError):
+            record_format.read_file(self.path)
+
+
+class JournalEntryTest(unittest.TestCase):
+    """Class to check that journal entries are read back and a partly written entry is detected"""
+    def test_entries(self):
+        guest = Guest("Ann", "Lee", "Female", "050", "G1")
+        entries = [['put', 'G1', guest], ['delete', 'G2', None], ['put', 'X', [1, 2.5, "three", None, True]]]
+        data = b''.join(record_format.encode_entry(entry) for entry in entries)
+        read = list(record_format.iter_entries(io.BytesIO(data)))
+        self.assertEqual(read[1], ['delete', 'G2', None])
+        self.assertEqual(read[2], ['put', 'X', [1, 2.5, "three", None, True]])
+        self.assertEqual(read[0][2].__getstate__(), guest.__getstate__())
+
+    def test_partly_written_entry(self):
+        complete = record_format.encode_entry(['delete', 'G1', None])
+        last = record_format.encode_entry(['delete', 'G2', None])
+        for cut in range(1, len(last)):
+            with self.subTest(cut=cut):
+                entries = record_format.iter_entries(io.BytesIO(complete + last[:cut]))
+                self.assertEqual(next(entries), ['delete', 'G1', None])
+                with self.assertRaises(FormatError):
+                    next(entries)
+
+
+class MappedCollectionTest(unittest.TestCase):
+    """Class to check that a memory mapped collection behaves like a dictionary and keeps few records in memory"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'guests.emr')
+        self.records = {f"G{number}": Guest("Guest", str(number), "Female", "050", f"G{number}")
+                        for number in range(1, 51)}
+        record_format.write_file(path, self.records)
+        self.mapped = MappedCollection(path, max_resident=5)
+
+    def tearDown(self):
+        self.mapped.close()
+        shutil.rmtree(self.directory)
+
+    def test_reading(self):
+        self.assertEqual(len(self.mapped), 50)
+        self.assertEqual(list(self.mapped), list(self.records))
+        self.assertEqual(state(dict(self.mapped.iter_items())), state(self.records))
+        for key in self.records:
+            self.assertEqual(self.mapped[key]._lastName, self.records[key]._lastName)
+        self.assertLessEqual(len(self.mapped.resident), 5)
+        self.assertNotIn('G99', self.mapped)
+        with self.assertRaises(KeyError):
+            self.mapped['G99']
+
+    def test_changes_on_top_of_the_file(self):
+        self.mapped['G51'] = Guest("New", "Guest", "Male", "050", "G51")
+        self.mapped['G1'] = Guest("Changed", "Guest", "Male", "050", "G1")
+        del self.mapped['G2']
+        with self.assertRaises(KeyError):
+            del self.mapped['G2']
+        self.assertEqual(len(self.mapped), 50)
+        self.assertNotIn('G2', self.mapped)
+        self.assertEqual(self.mapped['G1']._firstName, "Changed")
+        self.assertEqual(list(self.mapped)[-1], 'G51')
+        self.assertEqual(dict(self.mapped.iter_items())['G1']._firstName, "Changed")
+
+
+if __name__ == "__main__":
+    unittest.main()
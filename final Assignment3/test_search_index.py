@@ -0,0 +1,51 @@
+"""Tests for search_index.py. Run with: python -m unittest test_search_index"""
+import unittest
+
+from classes import Guest
+from search_index import SearchIndex
+
+
+class SearchIndexTest(unittest.TestCase):
+    """Class to check prefix and substring search and that the index follows changed and removed records"""
+    def setUp(self):
+        self.index = SearchIndex({'firstName': '_firstName', 'lastName': '_lastName', 'phoneNumber': '_phoneNumber'})
+        self.index.add_all([
+            ('G1', Guest("Sara", "Al Khalid", "Female", "0564453223", "G1")),
+            ('G2', Guest("Ali", "Khalifa", "Male", "0501112222", "G2")),
+            ('G3', Guest("Mona", "Saeed", "Female", "0524453000", "G3")),
+        ])
+
+    def test_prefix_of_value_or_word(self):
+        self.assertEqual(self.index.search('khali'), {'G1', 'G2'})
+        self.assertEqual(self.index.search('al kh'), {'G1'})
+        self.assertEqual(self.index.search('sa'), {'G1', 'G3'})
+        self.assertEqual(self.index.search('sa', 'lastName'), {'G3'})
+
+    def test_case_and_spaces_are_ignored(self):
+        self.assertEqual(self.index.search('  MONA '), {'G3'})
+
+    def test_substring(self):
+        self.assertEqual(self.index.search('4453', mode='substring'), {'G1', 'G3'})
+        self.assertEqual(self.index.search('if', 'lastName', 'substring'), {'G2'})
+        self.assertEqual(self.index.search('ee', 'lastName', 'substring'), {'G3'})
+        self.assertEqual(self.index.search('xyz', mode='substring'), set())
+
+    def test_update_and_remove(self):
+        self.index.update('G2', Guest("Ali", "Hassan", "Male", "0501112222", "G2"))
+        self.assertEqual(self.index.search('khali'), {'G1'})
+        self.assertEqual(self.index.search('hass'), {'G2'})
+        self.index.remove('G1')
+        self.assertEqual(self.index.search('khali'), set())
+        self.assertEqual(self.index.search('4453', mode='substring'), {'G3'})
+        self.index.add('G4', Guest("Khalid", "Omar", "Male", "0509999999", "G4"))
+        self.assertEqual(self.index.search('khal'), {'G4'})
+
+    def test_unknown_field_and_mode(self):
+        with self.assertRaises(ValueError):
+            self.index.search('x', 'gender')
+        with self.assertRaises(ValueError):
+            self.index.search('x', mode='fuzzy')
+
+
+if __name__ == "__main__":
+    unittest.main()
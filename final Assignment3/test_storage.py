@@ -0,0 +1,100 @@
+"""Regression tests for storage.py. Run with: python -m unittest test_storage"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import storage
+from classes import Guest
+
+
+class JournalCrashTest(unittest.TestCase):
+    """Class to check that the records saved after a crash in the middle of a journal append are kept"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.previous = storage.data_path, storage.backend, storage.compaction_threshold
+        storage.data_path = self.directory
+        storage.compaction_threshold = 10 ** 6
+        storage._complete_journal_ends.clear()
+        storage._checked_for_pickles.clear()
+
+    def tearDown(self):
+        storage.data_path, backend, storage.compaction_threshold = self.previous
+        storage.use_backend(backend)
+        storage._complete_journal_ends.clear()
+        shutil.rmtree(self.directory)
+
+    def check_every_cut_point(self, backend):
+        storage.use_backend(backend)
+        storage.save_collection('guests', {'G1': Guest("Ann", "Lee", "Female", "0501234567", "G1")})
+        storage.save_record('guests', 'G2', Guest("Bob", "Ray", "Male", "0507654321", "G2"))
+        journal = storage._journal_path('guests')
+        with open(journal, 'rb') as journalf:
+            complete = journalf.read()
+        storage.save_record('guests', 'G3', Guest("Cat", "Fox", "Female", "0501112222", "G3"))
+        with open(journal, 'rb') as journalf:
+            last_entry = journalf.read()[len(complete):]
+        for cut in range(1, len(last_entry)):
+            with self.subTest(backend=backend, cut=cut):
+                # The program crashed after writing part of the G3 entry
+                with open(journal, 'wb') as journalf:
+                    journalf.write(complete + last_entry[:cut])
+                storage.invalidate_cache()
+                storage._complete_journal_ends.clear()
+                self.assertEqual(set(storage.load_guest_data()), {'G1', 'G2'})
+                # The next program saves G4, which must survive replay and compaction
+                storage.invalidate_cache()
+                storage._complete_journal_ends.clear()
+                storage.save_record('guests', 'G4', Guest("Dan", "Roe", "Male", "0503334444", "G4"))
+                storage.invalidate_cache()
+                self.assertEqual(set(storage.load_guest_data()), {'G1', 'G2', 'G4'})
+                storage.compact_journal('guests')
+                storage.invalidate_cache()
+                self.assertEqual(set(storage.load_guest_data()), {'G1', 'G2', 'G4'})
+                storage.save_collection('guests', {key: record for key, record in storage.load_guest_data().items()
+                                                   if key != 'G4'})
+                storage.invalidate_cache()
+                with open(journal, 'wb') as journalf:
+                    journalf.write(complete)
+
+    def test_columnar_journal(self):
+        self.check_every_cut_point("columnar")
+
+    def test_pickle_journal(self):
+        self.check_every_cut_point("pickle")
+
+
+class OtherProgramTest(unittest.TestCase):
+    """Class to check that records saved while another program writes to the same collection are kept"""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.previous = storage.data_path, storage.backend
+        storage.data_path = self.directory
+        storage.use_backend("columnar")
+
+    def tearDown(self):
+        storage.data_path, backend = self.previous
+        storage.use_backend(backend)
+        shutil.rmtree(self.directory)
+
+    def save_in_other_program(self, key):
+        subprocess.run([sys.executable, '-c', 'import storage; from classes import Guest; '
+                        f'storage.data_path = {self.directory!r}; '
+                        f'storage.save_record("guests", {key!r}, Guest("Eve", "Kim", "Female", "050", {key!r}))'],
+                       cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+    def test_own_record_saved_after_other_program(self):
+        storage.save_collection('guests', {'G1': Guest("Ann", "Lee", "Female", "0501234567", "G1")})
+        storage.invalidate_cache()
+        storage.load_guest_data()
+        self.save_in_other_program('G10')
+        storage.save_record('guests', 'G11', Guest("Bob", "Ray", "Male", "0507654321", "G11"))
+        self.assertEqual(set(storage.load_guest_data()), {'G1', 'G10', 'G11'})
+        storage.invalidate_cache()
+        self.assertEqual(set(storage.load_guest_data()), {'G1', 'G10', 'G11'})
+
+
+if __name__ == "__main__":
+    unittest.main()
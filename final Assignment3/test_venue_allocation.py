@@ -0,0 +1,87 @@
+"""Tests for venue_allocation.py and the venue capacity checks of service.py.
+Run with: python -m unittest test_venue_allocation"""
+import unittest
+
+from classes import Event, Guest, Venue
+from service import create_services
+from venue_allocation import allocate_venues
+
+
+def make_event(event_id, date, time, guest_count):
+    event = Event(event_id, "Wedding", date, time, "2 Hours")
+    for number in range(guest_count):
+        event.add_guest(f"G{number + 1}")
+    return event
+
+
+class AllocationTest(unittest.TestCase):
+    """Class to check that events get the smallest free venue that fits their guests"""
+    def setUp(self):
+        # The records are set on the services directly, so nothing is read from or written to the data directory
+        self.services = create_services()
+        self.services['venues'].records = {
+            'V1': Venue('V1', "Small Hall", 1, 10),
+            'V2': Venue('V2', "Big Hall", 1, 100),
+            'V3': Venue('V3', "Garden", 20, 50),
+        }
+        self.services['guests'].records = {f"G{number}": Guest("Guest", str(number), "Female", "050", f"G{number}")
+                                           for number in range(1, 101)}
+
+    def allocate(self, *events):
+        self.services['events'].records = {event.event_id: event for event in events}
+        return allocate_venues(self.services['events'], self.services['venues'], save=False)
+
+    def test_smallest_fitting_venue(self):
+        result = self.allocate(make_event('EV1', "2024/04/23", "8:00", 5), make_event('EV2', "2024/04/24", "8:00", 30))
+        self.assertEqual(result.assignments, {'EV1': 'V1', 'EV2': 'V3'})
+        self.assertEqual(list(self.services['events'].get('EV2').venues), ['V3'])
+        self.assertEqual(result.unplaced, [])
+
+    def test_overlapping_events_get_different_venues(self):
+        result = self.allocate(make_event('EV1', "2024/04/23", "8:00", 5), make_event('EV2', "2024/04/23", "9:00", 8),
+                               make_event('EV3', "2024/04/23", "10:00", 5))
+        # EV2 has the most guests and takes the small hall first, EV3 starts when EV1 ends and can use the big hall
+        self.assertEqual(result.assignments, {'EV2': 'V1', 'EV1': 'V2', 'EV3': 'V2'})
+
+    def test_larger_events_are_placed_first(self):
+        result = self.allocate(make_event('EV1', "2024/04/23", "8:00", 5), make_event('EV2', "2024/04/23", "8:00", 60),
+                               make_event('EV3', "2024/04/23", "8:00", 70))
+        self.assertEqual(result.assignments, {'EV3': 'V2', 'EV1': 'V1'})
+        self.assertEqual(result.unplaced, ['EV2'])
+
+    def test_events_with_a_venue_or_unreadable_schedule(self):
+        booked = make_event('EV1', "2024/04/23", "8:00", 5)
+        booked.add_venue(self.services['venues'].get('V1'))
+        broken = make_event('EV2', "someday", "8:00", 5)
+        result = self.allocate(booked, broken, make_event('EV3', "2024/04/23", "9:00", 5))
+        self.assertEqual(result.assignments, {'EV3': 'V2'})
+        self.assertEqual([event_id for event_id, _ in result.errors], ['EV2'])
+
+
+class VenueCapacityTest(unittest.TestCase):
+    """Class to check the venue capacity index of the venue service"""
+    def setUp(self):
+        self.venues = create_services()['venues']
+        self.venues.records = {
+            'V1': Venue('V1', "Small Hall", 1, 10),
+            'V2': Venue('V2', "Big Hall", 1, 100),
+            'V3': Venue('V3', "Garden", 20, 50),
+            'V4': Venue('V4', "Unknown", "", ""),
+        }
+
+    def test_venues_for(self):
+        self.assertEqual([venue.venue_id for venue in self.venues.venues_for(5)], ['V1', 'V2'])
+        self.assertEqual([venue.venue_id for venue in self.venues.venues_for(30)], ['V3', 'V2'])
+        self.assertEqual(list(self.venues.venues_for(500)), [])
+
+    def test_index_follows_changes(self):
+        self.venues.capacity_index()
+        self.venues._record_saved('V5', Venue('V5', "Tent", 25, 35))
+        self.venues._record_deleted('V3')
+        self.venues.records['V5'] = Venue('V5', "Tent", 25, 35)
+        del self.venues.records['V3']
+        self.assertEqual([venue.venue_id for venue in self.venues.venues_for(30)], ['V5', 'V2'])
+
+
+if __name__ == "__main__":
+    unittest.main()
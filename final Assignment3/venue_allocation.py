@@ -0,0 +1,54 @@
+from schedule import ScheduleChecker, event_period
+
+
+class AllocationResult:
+    """Class to represent the outcome of a batch venue allocation"""
+    def __init__(self):
+        # Constructor for AllocationResult class
+        self.assignments = {}  # event ID -> ID of the venue it was given
+        self.unplaced = []  # IDs of the events for which no free venue fits the number of guests
+        self.errors = []  # (event ID, error message) for every event whose schedule cannot be read
+
+    def __str__(self):
+        return f"Allocated {len(self.assignments)} events, {len(self.unplaced)} could not be placed"
+
+
+def allocate_venues(event_service, venue_service, event_ids=None, save=True):
+    # Giving every event without a venue the smallest venue that fits its guests and is not booked by another
+    # event at the same time. The events with the most guests are placed first, as they have the fewest
+    # venues to choose from. The changed events are saved with a single write unless save is False
+    events = event_service.all()
+    result = AllocationResult()
+    bookings = ScheduleChecker(kinds=('venue',))
+    periods = {}
+    for event_id, event in events.items():
+        try:
+            periods[event_id] = event_period(event)
+        except ValueError as e:
+            if event_ids is None or event_id in event_ids:
+                result.errors.append((event_id, str(e)))
+            continue
+        for venue_id in event.venues:
+            bookings.book('venue', venue_id, event_id, *periods[event_id])
+
+    pending = [events[event_id] for event_id in (event_ids if event_ids is not None else events)
+               if event_id in periods and not events[event_id].venues]
+    pending.sort(key=lambda event: len(event.guests), reverse=True)
+
+    changed = {}
+    for event in pending:
+        start, end = periods[event.event_id]
+        # The fitting venues come smallest first, so usually only the first few are looked at
+        for venue in venue_service.venues_for(len(event.guests)):
+            if bookings.is_free('venue', venue.venue_id, start, end):
+                bookings.book('venue', venue.venue_id, event.event_id, start, end)
+                event.add_venue(venue)
+                result.assignments[event.event_id] = venue.venue_id
+                changed[event.event_id] = event
+                break
+        else:
+            result.unplaced.append(event.event_id)
+
+    if save and changed:
+        event_service.save_many(changed)
+    return result